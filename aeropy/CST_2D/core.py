@@ -29,6 +29,11 @@ except(ModuleNotFoundError):
     from scipy import optimize
     from scipy.optimize import differential_evolution
 
+# Gauss-Legendre rules and quadrature grids of the arc length tables, shared
+# by all calls
+_gauss_legendre_nodes = {}
+_arc_length_grids = {}
+
 
 # Bersntein Polynomial
 def K(r, n):
@@ -97,25 +102,30 @@ def ddxi_l(psi, Al, abs_output=False):
         return diff
 
 
-def calculate_c_baseline(c_L, Au_C, Au_L, deltaz):
+def calculate_c_baseline(c_L, Au_C, Au_L, deltaz, full_output=False):
     """Equations in the New_CST.pdf. Calculates the upper chord in order for
-       the cruise and landing airfoils ot have the same length."""
+       the cruise and landing airfoils ot have the same length.
+
+       The chord is found via Newton iterations with the analytic derivative
+       of the arc length with respect to the chord. If full_output is True,
+       the convergence diagnostics of solve_equal_arc_length are also
+       returned. Both lengths are integrated with the same quadrature, so
+       identical shapes give exactly c_L."""
+    L_L = calculate_arc_length_derivatives(0, 1, Au_L, deltaz, c_L)[0]
 
-    def integrand(psi, Au, delta_xi):
-        return np.sqrt(1 + dxi_u(psi, Au, delta_xi)**2)
+    def residual(c_C):
+        L_C, dL_dc, dL_dA = calculate_arc_length_derivatives(0, 1, Au_C,
+                                                             deltaz, c_C)
+        return L_C - L_L, dL_dc
 
-    def f(c_C):
-        """Function dependent of c_C and that outputs c_C."""
-        y_C, err = quad(integrand, 0, 1, args=(Au_C, deltaz/c_C))
-        y_L, err = quad(integrand, 0, 1, args=(Au_L, deltaz/c_L))
-        return c_L*y_L/y_C
-    c_C = optimize.fixed_point(f, [c_L])
+    c_C, info = solve_equal_arc_length(residual, c_L)
     # In case the calculated chord is really close to the original, but the
     # algorithm was not able to make them equal
     if abs(c_L - c_C) < 1e-7:
-        return c_L
-    # The output is an array so it needs the extra [0]
-    return c_C[0]
+        c_C = c_L
+    if full_output:
+        return c_C, info
+    return c_C
 
 
 def calculate_psi_goal(psi_baseline, Au_baseline, Au_goal, deltaz,
@@ -226,6 +236,311 @@ def calculate_arc_length(psi_initial, psi_final, A_j, deltaz, c_j):
     return L
 
 
+def _gauss_legendre_psi(psi_initial, psi_final, n_points=64):
+    """Quadrature nodes and weights in psi for the interval
+       [psi_initial, psi_final]. Gauss-Legendre is applied in t = sqrt(psi),
+       which removes the square-root singularity of the slope at the
+       leading edge."""
+    if n_points not in _gauss_legendre_nodes:
+        _gauss_legendre_nodes[n_points] = np.polynomial.legendre.leggauss(
+            n_points)
+    t, w = _gauss_legendre_nodes[n_points]
+    t_initial = np.sqrt(psi_initial)
+    t_final = np.sqrt(psi_final)
+    t = 0.5*(t_final - t_initial)*t + 0.5*(t_final + t_initial)
+    # dpsi = 2*t*dt
+    w = 0.5*(t_final - t_initial)*w*2*t
+    return t**2, w
+
+
+def _slope_basis(psi, n_coefficients):
+    """dxi_u is affine in delta_xi and in the shape coefficients, so it can
+       be written as dot(A, basis) + delta_xi*ddelta. Returns basis (one row
+       per coefficient, each with the shape of psi) and ddelta."""
+    zero = np.zeros(n_coefficients)
+    slope_0 = dxi_u(psi, zero, 0.)
+    ddelta = dxi_u(psi, zero, 1.) - slope_0
+    basis = np.zeros((n_coefficients,) + np.shape(psi))
+    for i in range(n_coefficients):
+        unit = np.zeros(n_coefficients)
+        unit[i] = 1.
+        basis[i] = dxi_u(psi, unit, 0.) - slope_0
+    return basis, ddelta
+
+
+def calculate_arc_length_derivatives(psi_initial, psi_final, A_j, deltaz,
+                                     c_j, n_points=64):
+    """Calculate arc length from psi_initial to psi_final (dimensional) and
+       its analytic derivatives with respect to the chord c_j and to each
+       shape coefficient in A_j. Output is (L, dL_dc, dL_dA), with dL_dA an
+       array of len(A_j)."""
+    psi, w = _gauss_legendre_psi(psi_initial, psi_final, n_points)
+    delta_xi = deltaz/c_j
+    slope = dxi_u(psi, A_j, delta_xi)
+    norm = np.sqrt(1 + slope**2)
+    dnorm = slope/norm
+    dslope_dA, dslope_ddelta = _slope_basis(psi, len(A_j))
+
+    length = np.dot(w, norm)
+    L = c_j*length
+    dL_dc = length - delta_xi*np.dot(w, dnorm*dslope_ddelta)
+    dL_dA = c_j*np.dot(dslope_dA, w*dnorm)
+    return L, dL_dc, dL_dA
+
+
+def _arc_length_integrand(t, A, delta_xi, c, shared=False):
+    """dL/dt for t = sqrt(psi). A is (m, n+1) and delta_xi and c are (m,).
+       t is either shared by all shapes or (m, ...) with one set of points
+       per shape."""
+    basis, ddelta = _slope_basis(t**2, A.shape[1])
+    if shared:
+        slope = np.tensordot(A, basis, axes=(1, 0))
+    else:
+        slope = np.einsum('mi,im...->m...', A, basis)
+    extra = (1,)*(slope.ndim - 1)
+    slope = slope + delta_xi.reshape((-1,) + extra)*ddelta
+    return c.reshape((-1,) + extra)*np.sqrt(1 + slope**2)*2*t
+
+
+def _arc_length_table(A, deltaz, c, n_panels=100):
+    """Cumulative arc length at the edges of n_panels uniform panels in
+       t = sqrt(psi) for every shape in A (m, n+1). The integrand is
+       evaluated once per shape on Gauss-Legendre nodes shared by all
+       shapes."""
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    c = np.ones(len(A))*c
+    delta_xi = deltaz/c
+    key = (A.shape[1], n_panels)
+    if key not in _arc_length_grids:
+        h = 1./n_panels
+        t_gl, w_gl = np.polynomial.legendre.leggauss(3)
+        t = np.linspace(0, 1, n_panels+1)[:-1, None] + 0.5*h*(t_gl + 1)
+        _arc_length_grids[key] = (t.ravel(), 0.5*h*w_gl)
+    t, w = _arc_length_grids[key]
+    f = _arc_length_integrand(t, A, delta_xi, c, shared=True)
+    panels = np.dot(f.reshape(len(A), n_panels, 3), w)
+    L_edges = np.zeros((len(A), n_panels+1))
+    L_edges[:, 1:] = np.cumsum(panels, axis=1)
+    return {'A': A, 'c': c, 'delta_xi': delta_xi, 'L': L_edges,
+            'n_panels': n_panels}
+
+
+def _evaluate_arc_length_table(table, psi):
+    """Arc length from the leading edge to psi (m, k) using the cumulative
+       table and a 3 point Gauss-Legendre rule for the partial panel."""
+    n_panels = table['n_panels']
+    t = np.sqrt(psi)
+    j = np.clip((t*n_panels).astype(int), 0, n_panels-1)
+    t_left = j/float(n_panels)
+    width = t - t_left
+    # Zero width partial panels (e.g. psi=0) are sampled anywhere inside
+    # the panel to avoid the singular slope at the leading edge
+    sample = np.where(width > 0, width, 1./n_panels)
+    t_gl, w_gl = np.polynomial.legendre.leggauss(3)
+    nodes = t_left[..., None] + 0.5*sample[..., None]*(t_gl + 1)
+    f = _arc_length_integrand(nodes, table['A'], table['delta_xi'],
+                              table['c'])
+    partial = 0.5*width*np.dot(f, w_gl)
+    return np.take_along_axis(table['L'], j, axis=1) + partial
+
+
+def calculate_cumulative_arc_length(psi, A, deltaz, c, n_panels=100):
+    """Calculate the arc length from the leading edge to psi (dimensional)
+       for one or several shapes.
+
+       A is a list of shape coefficients or an (m, n+1) array with one shape
+       per row, c a float or (m,) array and psi (k,) or (m, k). The arc
+       length is tabulated once per shape and then evaluated at all psi, so
+       it is cheap to call with many shapes and many points."""
+    single = np.ndim(A) == 1
+    table = _arc_length_table(A, deltaz, c, n_panels)
+    psi = np.asarray(psi, dtype=float)*np.ones((len(table['A']), 1))
+    L = _evaluate_arc_length_table(table, psi)
+    if single:
+        return L[0]
+    return L
+
+
+def _inverse_arc_length_table(table, L_goal, tol=1e-13, maxiter=10):
+    """psi (m, k) where the arc length of each shape in table equals
+       L_goal (m, k). The table gives the panel and a linear initial guess
+       that is refined with vectorized Newton iterations in t. Warns if
+       the steps are not below tol after maxiter iterations."""
+    n_panels = table['n_panels']
+    L_edges = table['L']
+    j = (L_edges[:, None, :] <= L_goal[:, :, None]).sum(axis=2) - 1
+    j = np.clip(j, 0, n_panels-1)
+    L_left = np.take_along_axis(L_edges, j, axis=1)
+    L_right = np.take_along_axis(L_edges, j+1, axis=1)
+    t = (j + (L_goal - L_left)/(L_right - L_left))/float(n_panels)
+    for iteration in range(maxiter):
+        residual = _evaluate_arc_length_table(table, t**2) - L_goal
+        step = residual/_arc_length_integrand(t, table['A'],
+                                              table['delta_xi'], table['c'])
+        t = t - step
+        if np.all(np.abs(step) < tol):
+            break
+    else:
+        warnings.warn('Inverse arc length did not converge in %i iterations '
+                      '(step=%e)' % (maxiter, np.max(np.abs(step))))
+    return t**2
+
+
+def calculate_c_baseline_vectorized(c_L, Au_C, Au_L, deltaz, tol=1e-12,
+                                    maxiter=20, n_points=64):
+    """calculate_c_baseline for many airfoils at once: one airfoil per row
+       of Au_C and Au_L, c_L and deltaz are floats or arrays with one value
+       per row. All the chords are found with simultaneous Newton
+       iterations on a quadrature grid shared by every airfoil."""
+    Au_C = np.atleast_2d(np.asarray(Au_C, dtype=float))
+    Au_L = np.atleast_2d(np.asarray(Au_L, dtype=float))
+    c_L = np.ones(len(Au_C))*c_L
+    deltaz = np.ones(len(Au_C))*deltaz
+    psi, w = _gauss_legendre_psi(0, 1, n_points)
+
+    def lengths(A, delta_xi):
+        # Non-dimensional length and its derivative with respect to delta_xi
+        basis, ddelta = _slope_basis(psi, A.shape[1])
+        slope = np.dot(A, basis) + delta_xi[:, None]*ddelta
+        norm = np.sqrt(1 + slope**2)
+        return np.dot(norm, w), np.dot(slope/norm*ddelta, w)
+
+    L_L = c_L*lengths(Au_L, deltaz/c_L)[0]
+    c_C = c_L.copy()
+    for iteration in range(maxiter):
+        length, dlength = lengths(Au_C, deltaz/c_C)
+        step = (c_C*length - L_L)/(length - deltaz/c_C*dlength)
+        c_C = c_C - step
+        if np.all(np.abs(step) <= tol*np.maximum(1., np.abs(c_C))):
+            break
+    else:
+        warnings.warn('Equal arc length solver did not converge in %i '
+                      'iterations' % maxiter)
+    return c_C
+
+
+def _spar_direction_vectorized(psi_spars, Au_P, delta_xi_P, Au_C,
+                               delta_xi_C, psi_children):
+    """Spar directions (s_0, s_1), each (m, p), as in
+       calculate_spar_direction for m children (rows of Au_C, delta_xi_C
+       (m,)) at the children upper locations psi_children (m, p). Au_P is a
+       single parent or one parent per child (m, n+1)."""
+    Au_P = np.asarray(Au_P, dtype=float)
+    basis, ddelta = _slope_basis(psi_spars, Au_P.shape[-1])
+    slope_P = np.dot(Au_P, basis) + np.reshape(delta_xi_P, (-1, 1))*ddelta
+    cbeta = slope_P/np.sqrt(1 + slope_P**2)
+    sbeta = np.sqrt(1-cbeta**2)
+    basis, ddelta = _slope_basis(psi_children, Au_C.shape[1])
+    t_1 = np.einsum('mi,im...->m...', Au_C, basis) + \
+        np.reshape(delta_xi_C, (-1, 1))*ddelta
+    t_norm = np.sqrt(1 + t_1**2)
+    t_0 = 1./t_norm
+    t_1 = t_1/t_norm
+    s_1 = t_1*cbeta + t_0*sbeta
+    s_0 = (cbeta - s_1*t_1)/t_0
+    return s_0, s_1
+
+
+def calculate_spar_locations_vectorized(psi_spars, Au_P, c_P, Au_C, c_C,
+                                        deltaz, l_LE=0, eps_LE=0,
+                                        n_panels=100):
+    """Spars of many children at once: calculate_psi_goal and
+       calculate_spar_direction for every spar of m children (rows of Au_C,
+       c_C (m,)). Au_P and c_P are a single parent or one parent per child
+       and deltaz a float or (m,) array. l_LE and eps_LE are the leading
+       edge length and strain of the moving leading edge formulation
+       (twist_3D).
+
+       Returns psi_children (m, p), the children upper locations with the
+       same arc length from the leading edge as psi_spars in the parent,
+       and the spar directions (s_0, s_1), each (m, p). The arc lengths are
+       tabulated once per shape and inverted with vectorized Newton
+       iterations. The parent chord is used as the baseline chord of the
+       spar directions."""
+    Au_C = np.atleast_2d(np.asarray(Au_C, dtype=float))
+    c_C = np.ones(len(Au_C))*c_C
+    psi_spars = np.asarray(psi_spars, dtype=float)
+    table_P = _arc_length_table(Au_P, deltaz, c_P, n_panels)
+    L_P = _evaluate_arc_length_table(
+        table_P, psi_spars*np.ones((len(table_P['A']), 1)))
+    L_goal = (1-eps_LE)*(L_P[:, :1] + table_P['c'][:, None]*l_LE) + \
+        L_P - L_P[:, :1]
+    table_C = _arc_length_table(Au_C, deltaz, c_C, n_panels)
+    psi_children = _inverse_arc_length_table(table_C,
+                                             L_goal*np.ones((len(Au_C), 1)))
+    s_0, s_1 = _spar_direction_vectorized(psi_spars, Au_P, deltaz/c_P, Au_C,
+                                          deltaz/c_C, psi_children)
+    return psi_children, s_0, s_1
+
+
+def calculate_strains_vectorized(Au_P, Al_P, c_P, Au_C, Al_C, c_C, deltaz,
+                                 psi_spars, spar_thicknesses, l_LE=0,
+                                 eps_LE=0, n_panels=100):
+    """Arc length based strains between spars for many children at once.
+
+       Au_C, Al_C (m, n+1), c_C (m,) and spar_thicknesses (m, p) hold one
+       child per row. Returns strains (m, p+1), one per segment of the
+       lower surface, and the average strains (m,). l_LE and eps_LE are the
+       leading edge length and strain of the moving leading edge
+       formulation (twist_3D). The arc lengths of each shape are tabulated
+       once on a shared grid instead of integrating each segment apart. The
+       parent chord is used as the baseline chord of the spar directions."""
+    Au_C = np.atleast_2d(np.asarray(Au_C, dtype=float))
+    Al_C = np.atleast_2d(np.asarray(Al_C, dtype=float))
+    c_C = np.ones(len(Au_C))*c_C
+    psi_spars = np.asarray(psi_spars, dtype=float)
+    spar_thicknesses = np.atleast_2d(spar_thicknesses)
+
+    psi_children, s_0, s_1 = calculate_spar_locations_vectorized(
+        psi_spars, Au_P, c_P, Au_C, c_C, deltaz, l_LE, eps_LE, n_panels)
+    psi_flats = psi_children*c_C[:, None] - spar_thicknesses*s_0
+
+    # Lengths of the lower surface segments
+    psi_list = np.concatenate(([0.], psi_spars, [c_P]))
+    initial_lengths = np.diff(calculate_cumulative_arc_length(
+        psi_list, Al_P, deltaz, c_P, n_panels))
+    psi_list = np.zeros((len(Au_C), len(psi_spars)+2))
+    psi_list[:, 1:-1] = psi_flats
+    psi_list[:, -1] = c_C
+    psi_list = psi_list*c_P/c_C[:, None]
+    final_lengths = np.diff(calculate_cumulative_arc_length(
+        psi_list, Al_C, deltaz, c_C, n_panels), axis=1)
+
+    strains = (final_lengths - initial_lengths)/initial_lengths
+    av_strain = (np.sum(final_lengths, axis=1) -
+                 np.sum(initial_lengths))/np.sum(initial_lengths)
+    return strains, av_strain
+
+
+def solve_equal_arc_length(residual, x0, tol=1e-12, maxiter=20):
+    """Newton solver shared by the equal arc length constraints.
+
+       residual(x) returns the arc length mismatch and its derivative with
+       respect to x. Returns the solution and a dictionary with the
+       convergence diagnostics: 'converged', 'iterations', 'residual' and
+       'history' (absolute residual at every iteration)."""
+    x = float(x0)
+    history = []
+    converged = False
+    for iteration in range(1, maxiter+1):
+        r, dr = residual(x)
+        history.append(abs(r))
+        if r == 0:
+            converged = True
+            break
+        step = r/dr
+        x -= step
+        if abs(step) <= tol*max(1., abs(x)):
+            converged = True
+            break
+    if not converged:
+        warnings.warn('Equal arc length solver did not converge in %i '
+                      'iterations (residual=%e)' % (maxiter, history[-1]))
+    info = {'converged': converged, 'iterations': iteration,
+            'residual': history[-1], 'history': history}
+    return x, info
+
+
 def find_inflection_points(Au, Al):
     """Detect how many inflections points and where are they"""
     # Find solutions for several initial estimates
@@ -1 +1,2 @@
 from .core import piecewise_linear, BernsteinPolynomial, CST3D, intersection
+from .assembly import Assembly, Node
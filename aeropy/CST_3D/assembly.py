@@ -0,0 +1,192 @@
+"""Cached assembly of CST3D components, intersections and panel networks.
+
+Every step of the construction of a mesh (parameter, interpolating
+function, CST3D component, intersection, network edge, parameter space
+mesh, network) is a node of a graph. A node is only computed when it is
+requested and its value is kept until one of the parameters it depends on
+changes, so parametric sweeps only recompute the affected nodes.
+
+Example::
+
+    model = Assembly()
+    twist = model.parameter('twist', [0.1, -0.05, -0.1, -0.1])
+    f_twist = model.node('f_twist', piecewise_linear, eta_cp, twist)
+    wing = model.component('wing', sx=..., twist=f_twist)
+    fuselage = model.component('fuselage', ...)
+    cut = model.intersection('cut', wing, fuselage, psi_w, 0.3)
+    ...
+    model['network_wing']           # builds everything needed
+    model.set('twist', new_twist)   # only the wing side is recomputed
+
+@author: Pedro
+"""
+import numpy as np
+
+from .core import CST3D, intersection
+
+
+class Node:
+    """Handle of a node of an Assembly. Pass it (also inside tuples, lists
+       or dictionaries) as argument of other nodes to create a dependency;
+       call it to get its value."""
+
+    def __init__(self, assembly, name):
+        self.assembly = assembly
+        self.name = name
+
+    def __call__(self):
+        return self.assembly[self.name]
+
+    def __repr__(self):
+        return "Node(%r)" % self.name
+
+
+class Assembly:
+    """Graph of cached nodes (see module documentation).
+
+    :attribute evaluations: number of times each node was computed
+    """
+
+    def __init__(self):
+        self._function = {}
+        self._args = {}
+        self._kwargs = {}
+        self._dependencies = {}
+        self._dependents = {}
+        self._values = {}
+        self.evaluations = {}
+
+    def parameter(self, name, value):
+        """Input of the graph that can be changed with set."""
+        self._add(name, None, (), {})
+        self._values[name] = value
+        return Node(self, name)
+
+    def node(self, name, function, *args, **kwargs):
+        """Node whose value is function(*args, **kwargs), where the Node
+           objects in args and kwargs are replaced by their values."""
+        self._add(name, function, args, kwargs)
+        return Node(self, name)
+
+    def component(self, name, **params):
+        """CST3D node (params as in CST3D, may contain nodes)."""
+        return self.node(name, CST3D, **params)
+
+    def intersection(self, name, wing, fuselage, psi_w, eta_w0, **kwargs):
+        """Intersection node between two CST3D nodes (see intersection)."""
+        return self.node(name, intersection, wing, fuselage, psi_w, eta_w0,
+                         **kwargs)
+
+    def network(self, name, surface, psi, eta=None):
+        """(n_psi, n_eta, 3) network node of the points of a CST3D node.
+           psi can also be a (psi, eta) pair such as the output of a
+           meshparameterspace node."""
+        return self.node(name, _network, surface, psi, eta)
+
+    def set(self, name, value):
+        """Changes a parameter and invalidates the nodes that depend on it
+           (nothing is invalidated if the value did not change)."""
+        if name not in self._function or self._function[name] is not None:
+            raise KeyError("%s is not a parameter" % name)
+        if _equal(self._values.get(name), value):
+            return
+        self._invalidate(name)
+        self._values[name] = value
+
+    def update(self, **values):
+        """Changes several parameters."""
+        for name, value in values.items():
+            self.set(name, value)
+
+    def __getitem__(self, name):
+        if isinstance(name, Node):
+            name = name.name
+        if name in self._values:
+            return self._values[name]
+        if name not in self._function:
+            raise KeyError(name)
+        args = self._resolve(self._args[name])
+        kwargs = self._resolve(self._kwargs[name])
+        value = self._function[name](*args, **kwargs)
+        self._values[name] = value
+        self.evaluations[name] = self.evaluations.get(name, 0) + 1
+        return value
+
+    def __contains__(self, name):
+        return name in self._function
+
+    def evaluate(self, *names):
+        """Values of several nodes."""
+        return [self[name] for name in names]
+
+    def is_cached(self, name):
+        return name in self._values
+
+    def dependents(self, name):
+        """Names of all the nodes that are recomputed when name changes."""
+        found = set()
+        stack = [name]
+        while stack:
+            for dependent in self._dependents[stack.pop()]:
+                if dependent not in found:
+                    found.add(dependent)
+                    stack.append(dependent)
+        return found
+
+    def _add(self, name, function, args, kwargs):
+        if name in self._function:
+            # redefinition: the old links and values are discarded
+            self._invalidate(name)
+            for dependency in self._dependencies[name]:
+                self._dependents[dependency].discard(name)
+        dependencies = set()
+        _find_nodes((args, kwargs), dependencies)
+        for dependency in dependencies:
+            if dependency not in self._function:
+                raise KeyError("unknown node %s" % dependency)
+            self._dependents[dependency].add(name)
+        self._function[name] = function
+        self._args[name] = args
+        self._kwargs[name] = kwargs
+        self._dependencies[name] = dependencies
+        self._dependents.setdefault(name, set())
+
+    def _invalidate(self, name):
+        self._values.pop(name, None)
+        for dependent in self.dependents(name):
+            self._values.pop(dependent, None)
+
+    def _resolve(self, value):
+        if isinstance(value, Node):
+            return self[value.name]
+        elif isinstance(value, (tuple, list)):
+            return type(value)(self._resolve(v) for v in value)
+        elif isinstance(value, dict):
+            return {k: self._resolve(v) for k, v in value.items()}
+        return value
+
+
+def _find_nodes(value, found):
+    if isinstance(value, Node):
+        found.add(value.name)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _find_nodes(v, found)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _find_nodes(v, found)
+
+
+def _equal(a, b):
+    if a is b:
+        return True
+    try:
+        return bool(np.array_equal(a, b))
+    except (TypeError, ValueError):
+        return False
+
+
+def _network(surface, psi, eta=None):
+    if eta is None:
+        psi, eta = psi
+    return surface.points(psi, eta)
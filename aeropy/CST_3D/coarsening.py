@@ -0,0 +1,104 @@
+"""Coarsening of 2D polylines (e.g. axisymmetric profiles sliced from STL
+files) before they are turned into panel networks.
+
+Both algorithms work on whole arrays at once: every pass over the data is
+vectorized and the number of passes grows like log(n) for typical
+profiles, so profiles with millions of points can be coarsened.
+
+@author: Pedro
+"""
+import numpy as np
+
+
+def _distance_to_chord(x, y, x_start, y_start, x_end, y_end):
+    """Distance of the points (x, y) to the lines between the start and end
+       points (to the start point if they coincide) and length of the
+       lines."""
+    dx = x_end - x_start
+    dy = y_end - y_start
+    px = x - x_start
+    py = y - y_start
+    length = np.hypot(dx, dy)
+    degenerate = length == 0.
+    distance = np.abs(dx*py - dy*px)/np.where(degenerate, 1., length)
+    distance[degenerate] = np.hypot(px, py)[degenerate]
+    return distance, length
+
+
+def ramer_douglas_peucker(x, y, tol, max_length=np.inf):
+    """Indices of the points kept by the Ramer-Douglas-Peucker algorithm.
+
+    Every removed point is within tol of the segment that replaces it and
+    no segment longer than max_length is created (unless there is no point
+    left to split it). All segments of one level of the recursion are
+    processed together.
+
+    :rtype: sorted array of indices (first and last points always kept)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 3:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    while True:
+        kept = np.flatnonzero(keep)
+        # segment (between consecutive kept points) of every point
+        segment = np.minimum(np.cumsum(keep) - 1, len(kept) - 2)
+        start = kept[segment]
+        end = kept[segment + 1]
+        distance, length = _distance_to_chord(x, y, x[start], y[start],
+                                              x[end], y[end])
+        distance[keep] = 0.
+        worst = np.maximum.reduceat(distance, kept[:-1])
+        length = length[kept[:-1]]
+
+        split = ((worst > tol) | (length > max_length)) & (np.diff(kept) > 1)
+        if not split.any():
+            return kept
+
+        # split at the farthest point, or at the middle if only too long
+        farthest = np.flatnonzero((distance == worst[segment]) & ~keep &
+                                  split[segment] & (worst[segment] > tol))
+        _, first = np.unique(segment[farthest], return_index=True)
+        keep[farthest[first]] = True
+        long_only = np.flatnonzero(split & (worst <= tol))
+        keep[(kept[long_only] + kept[long_only + 1])//2] = True
+
+
+def visvalingam_whyatt(x, y, tol, max_length=np.inf):
+    """Indices of the points kept by a Visvalingam-Whyatt simplification.
+
+    The significance of a point is its distance to the line between its
+    neighbours (the height of the Visvalingam triangle, so tol has units of
+    length as in ramer_douglas_peucker). Each pass removes the points less
+    significant than tol whose neighbours are kept in that pass (every
+    other point of a run of removable points), as long as the segment
+    joining the neighbours is not longer than max_length, until no point
+    can be removed. A pass removes at least half of the removable points,
+    so the number of passes grows like log(n).
+
+    :rtype: sorted array of indices (first and last points always kept)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    kept = np.arange(len(x))
+    while len(kept) > 2:
+        xk = x[kept]
+        yk = y[kept]
+        significance, length = _distance_to_chord(
+            xk[1:-1], yk[1:-1], xk[:-2], yk[:-2], xk[2:], yk[2:])
+        removable = (significance < tol) & (length <= max_length)
+        if not removable.any():
+            break
+
+        # position of every point in its run of removable points: the
+        # even ones are removed, so no two neighbours go together
+        position = np.arange(len(removable))
+        run_start = removable & ~np.concatenate(([False], removable[:-1]))
+        first = np.maximum.accumulate(np.where(run_start, position, 0))
+        remove = removable & ((position - first) % 2 == 0)
+        kept = np.concatenate(([kept[0]], kept[1:-1][~remove], [kept[-1]]))
+    return kept
@@ -1,5 +1,7 @@
+import warnings
 import numpy as np
 from scipy.interpolate import interp1d
+from scipy.spatial import cKDTree
 from scipy.optimize import minimize
 from math import factorial
 
@@ -10,15 +12,15 @@ def piecewise_linear(x, y):
 
 
 class BernsteinPolynomial:
-    """Implements Bernstein polynomial of arbitrary order"""
+    """Implements Bernstein polynomial of arbitrary order. Coefficients are
+       floats or functions of param2 (e.g. piecewise_linear of eta)"""
 
     def __init__(self, order, coefficients=None):
         self._order = order
-        if coefficients is not None:
-            self._coefficients = coefficients
-        else:
-            self._coefficients = n_coeff*[1.]
-        self._K = self._calculate_k(order+1)
+        if coefficients is None:
+            coefficients = (order+1)*[1.]
+        self._K = np.array(self._calculate_k(order+1))
+        self.set_coefficients(coefficients)
 
     @staticmethod
     def _calculate_k(number):
@@ -29,25 +31,94 @@ class BernsteinPolynomial:
 
         return K
 
+    def __setstate__(self, state):
+        # Objects pickled before the coefficients were classified
+        self.__dict__.update(state)
+        self._K = np.array(self._K)
+        self.set_coefficients(self._coefficients)
+
     def set_coefficients(self, coeff):
         self._coefficients = coeff
-
-    def __call__(self, param1, param2=None):
-
-        A = self._coefficients
-        K = self._K
+        # Changed at every call, so caches of the surfaces using this
+        # polynomial (e.g. the KD-tree of CST3D.inverse) are rebuilt
+        self._version = getattr(self, '_version', 0) + 1
+        # Coefficients are classified once: constants are stored in an array
+        # and only the callable ones are evaluated at every call
+        self._callable = [r for r, a in enumerate(coeff) if callable(a)]
+        self._constant = np.array([0. if callable(a) else a for a in coeff],
+                                  dtype=float)
+
+    def basis(self, param1):
+        """Bernstein basis at param1, with shape param1.shape + (order+1,)"""
+        return np.stack(self._terms(param1), axis=-1)
+
+    def _terms(self, param1):
+        # K*x^r*(1-x)^(n-r) with the powers built by repeated products
+        # (much cheaper than np.power)
         n = self._order
-        try:
-            F = np.zeros(param1.shape)
-        except AttributeError:
-            F = 0.
-
-        for r in range(n+1):
-            F += (try_as_func(A[r], param2)*K[r]*np.power(param1, r) *
-                  np.power(1.-param1, n-r))
-
+        param1 = np.asarray(param1, dtype=float)
+        powers = [np.ones(param1.shape)]
+        for r in range(n):
+            powers.append(powers[-1]*param1)
+        terms = (n+1)*[None]
+        complement = 1.
+        for r in range(n, -1, -1):
+            terms[r] = self._K[r]*powers[r]*complement
+            complement = complement*(1.-param1)
+        return terms
+
+    def __call__(self, param1, param2=None, unique=None):
+        """unique: optional output of _unique(param2) when it is already
+           known (shared by all the parameters of a CST3D)"""
+        A = self._sample_coefficients(param2, unique)
+        F = 0.
+        for r, term in enumerate(self._terms(param1)):
+            F = F + A[r]*term
         return F
 
+    def derivative(self, param1, param2=None, unique=None):
+        """Derivative with respect to param1:
+           n*sum((A[r+1]-A[r])*B_{r,n-1}(param1))"""
+        n = self._order
+        if n == 0:
+            return np.zeros(np.shape(param1))
+        A = self._sample_coefficients(param2, unique)
+        lower = BernsteinPolynomial(n-1)
+        dF = 0.
+        for r, term in enumerate(lower._terms(param1)):
+            dF = dF + n*(A[r+1]-A[r])*term
+        return dF
+
+    def _sample_coefficients(self, param2, unique=None):
+        A = list(self._constant)
+        if self._callable:
+            # Callable coefficients are sampled once per distinct param2
+            if unique is None:
+                unique = _unique(param2)
+            for r in self._callable:
+                A[r] = _sample_unique(self._coefficients[r], unique)
+        return A
+
+
+def _unique(x, minimum_size=64):
+    """Distinct values of x, indexes to rebuild x from them and its shape.
+       Small arrays are not worth sorting and are returned as they are."""
+    x = np.asarray(x, dtype=float)
+    if x.size < minimum_size:
+        return x, None, x.shape
+    x_unique, inverse = np.unique(x, return_inverse=True)
+    return x_unique, inverse.ravel(), x.shape
+
+
+def _sample_unique(f, unique):
+    """f(x) evaluated only once per distinct value of x (e.g. the eta of
+       every point in a column of a mesh), with unique = _unique(x)."""
+    x_unique, inverse, shape = unique
+    if inverse is None:
+        return f(x_unique)
+    fx = np.broadcast_to(f(x_unique), x_unique.shape)
+    return fx[inverse].reshape(shape)
+
 
 def try_as_func(f, x, y=None):
     """
@@ -72,6 +143,26 @@ def try_as_func(f, x, y=None):
     return fx
 
 
+def _classify(f, two_args=False):
+    """Kind of a CST3D parameter, found once instead of at every evaluation
+       as in try_as_func: 'constant', 'psi_eta' for f(psi, eta) and, for
+       f(x), 'psi' if two_args is allowed (shape function) or 'eta'."""
+    if not callable(f):
+        return 'constant'
+    if two_args:
+        try:
+            f(np.array([0.5]), np.array([0.5]))
+            return 'psi_eta'
+        except TypeError:
+            return 'psi'
+    return 'eta'
+
+
+# Parameters of CST3D that can be floats or functions
+_PARAMETERS = ('sx', 'sy', 'nx1', 'nx2', 'twist', 'xshear', 'zshear',
+               'TE_thickness')
+
+
 class CST3D:
     """Implements general Class/Shape Transformation function
 
@@ -81,7 +172,11 @@ class CST3D:
     :param sx and sy:
     :param nx and ny:
     :param XYZ:
-    :param xshear and yshear:"""
+    :param xshear and yshear:
+
+    Parameters can be floats or functions (of eta, or of psi and eta for
+    sx). They are classified once in an evaluation plan and functions of
+    eta are evaluated once per distinct eta of the points."""
 
     def __init__(self, **params):
         self.location = params.get('location', (0., 0., 0.))
@@ -97,20 +192,34 @@ class CST3D:
         self.twist = params.get('twist', 0.)
         self.TE_thickness = params.get('TE_thickness', 0.)
 
+    def __getstate__(self):
+        # Cached plan, rotation matrices and KD-tree are rebuilt when needed
+        state = self.__dict__.copy()
+        for key in ('_evaluation_plan', '_rotation_cache', '_tree_cache'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        # Parameters missing in objects pickled by older versions take
+        # their default values
+        self.__init__()
+        self.__dict__.update(state)
+
     def __call__(self, psi, eta):
+        values = self._sample(psi, eta)
         # calculate x, y, and z from the 3D CST equation
-        x_l = self._cst_x(psi, eta)
+        x_l = self._cst_x(psi, eta, values)
         y_l = self._cst_y(eta)
-        z_l = self._cst_z(psi, eta)
+        z_l = self._cst_z(psi, eta, values)
 
         # rotate
-        twist = try_as_func(self.twist, eta)*np.pi/180.
+        twist = values['twist']*np.pi/180.
         x_lr = np.cos(twist)*x_l+np.sin(twist)*z_l
         z_lr = -np.sin(twist)*x_l+np.cos(twist)*z_l
 
         # shear
-        x_lrs = x_lr + try_as_func(self.xshear, eta)
-        z_lrs = z_lr + try_as_func(self.zshear, eta)
+        x_lrs = x_lr + values['xshear']
+        z_lrs = z_lr + values['zshear']
 
         # rotate from local CST coordinate system to global
         x_g, y_g, z_g = self._local_to_global(x_lrs, y_l, z_lrs)
@@ -118,37 +227,329 @@ class CST3D:
         return x_g, y_g, z_g
         # return x_l, y_l, z_l
 
-    def inverse(self, x_g, y_g, z_g):
+    def inverse(self, x_g, y_g, z_g, method='projection', tol=1e-12,
+                maxiter=50, n_starts=3, full_output=False):
+        """psi and eta of global points (arrays of any shape).
+
+           With method='projection' the points are projected on the
+           surface: the closest (psi, eta) in [0, 1]x[0, 1] is found with
+           projected Gauss-Newton iterations for all the points at once,
+           starting from the nearest point of a pre-sampled grid of the
+           surface (KD-tree). A parameter on a bound is frozen while the
+           gradient pushes it out of the domain and a backtracking line
+           search makes every step decrease the distance. Points that stall
+           or reach maxiter are finished with a bounded minimizer
+           (L-BFGS-B); a warning is issued if some still do not converge.
+           Points that end on a bound are projected again from the next
+           n_starts-1 nearest grid points (the closest solution is kept).
+           Points on the surface are recovered exactly, whatever the twist
+           and shear. method='approximate' finds eta from y alone and
+           undoes shear and twist (closed form, only exact without them).
+
+           If full_output, a dictionary with 'converged', 'distance' and
+           'iterations' is also returned."""
+        if method == 'approximate':
+            return self._inverse_approximate(x_g, y_g, z_g)
+        points = np.stack(np.broadcast_arrays(x_g, y_g, z_g), axis=-1)
+        shape = points.shape[:-1]
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+
+        psi_grid, eta_grid, tree = self._inverse_tree()
+        # Points with nan/inf coordinates are not projected (nan output)
+        finite = np.where(np.all(np.isfinite(points), axis=1))[0]
+        u = np.full((len(points), 2), np.nan)
+        f = np.full(len(points), np.nan)
+        converged = np.zeros(len(points), dtype=bool)
+        index = tree.query(points[finite], n_starts)[1].reshape(
+            len(finite), n_starts)
+        u[finite], f[finite], converged[finite], iterations = \
+            self._project(points[finite],
+                          np.stack((psi_grid[index[:, 0]],
+                                    eta_grid[index[:, 0]]), axis=1),
+                          tol, maxiter)
+
+        # A point that ends on a bound may be in a local minimum (e.g. the
+        # leading edge of a noisy point): it is also projected from the
+        # next nearest grid points and the closest solution is kept
+        for start in range(1, index.shape[1]):
+            k = np.where(np.any((u[finite] <= 0.) | (u[finite] >= 1.),
+                                axis=1))[0]
+            u0 = np.stack((psi_grid[index[k, start]],
+                           eta_grid[index[k, start]]), axis=1)
+            u_k, f_k, converged_k, n = self._project(points[finite[k]], u0,
+                                                     tol, maxiter)
+            better = f_k < f[finite[k]]
+            k = finite[k[better]]
+            u[k], f[k], converged[k] = (u_k[better], f_k[better],
+                                        converged_k[better])
+        if not converged[finite].all():
+            warnings.warn('Projection did not converge for %i of %i points' %
+                          (len(finite) - np.sum(converged[finite]),
+                           len(finite)))
+
+        psi, eta = u[:, 0].reshape(shape), u[:, 1].reshape(shape)
+        if full_output:
+            info = {'converged': converged.reshape(shape),
+                    'distance': np.sqrt(f).reshape(shape),
+                    'iterations': iterations}
+            return psi, eta, info
+        return psi, eta
+
+    def _project(self, points, u, tol=1e-12, maxiter=50):
+        """Projected Gauss-Newton iterations (see inverse) of (n, 3) points
+           from the (n, 2) initial guesses u. Returns u, the squared
+           distances, the converged mask and the number of iterations."""
+        u = np.array(u, dtype=float)
+        f = np.sum((self.points(u[:, 0], u[:, 1]) - points)**2, axis=1)
+        active = np.ones(len(points), dtype=bool)
+        converged = np.zeros(len(points), dtype=bool)
+        iteration = 0
+        for iteration in range(1, maxiter+1):
+            if not active.any():
+                break
+            i = np.where(active)[0]
+            r = self.points(u[i, 0], u[i, 1]) - points[i]
+            J = np.stack(self.jacobian(u[i, 0], u[i, 1]), axis=-1)
+            A = np.matmul(np.swapaxes(J, 1, 2), J)
+            g = np.matmul(r[:, None, :], J)[:, 0]
+            du = _bounded_newton_step(u[i], A, g)
+
+            # Backtracking: the step is halved until the distance decreases
+            alpha = np.ones(len(i))
+            u_new = u[i].copy()
+            f_new = f[i].copy()
+            pending = np.ones(len(i), dtype=bool)
+            for halving in range(20):
+                k = np.where(pending)[0]
+                u_try = np.clip(u[i[k]] + alpha[k, None]*du[k], 0., 1.)
+                f_try = np.sum((self.points(u_try[:, 0], u_try[:, 1]) -
+                                points[i[k]])**2, axis=1)
+                better = f_try < f[i[k]]
+                u_new[k[better]] = u_try[better]
+                f_new[k[better]] = f_try[better]
+                pending[k[better]] = False
+                alpha[k] *= 0.5
+                if not pending.any():
+                    break
+            step = np.max(np.abs(u_new - u[i]), axis=1)
+            u[i] = u_new
+            f[i] = f_new
+            # Converged: the step is negligible or the projected gradient
+            # is zero (optimum on a corner or on both bounds)
+            stationary = ~np.any(du, axis=1)
+            done = stationary | (~pending & (step <= tol))
+            converged[i[done]] = True
+            # No decrease along a descent direction: the step is below the
+            # resolution of the distance (converged if it is tiny), or
+            # Gauss-Newton stalled and the point goes to the fallback
+            stalled = pending & ~stationary
+            small = stalled & (np.max(np.abs(du), axis=1) <= np.sqrt(tol))
+            converged[i[small]] = True
+            active[i[done | stalled]] = False
+
+        # Fallback for the points that stalled or reached maxiter
+        for k in np.where(~converged)[0]:
+            def objective(u_k, k=k):
+                r_k = self.points(u_k[0], u_k[1]) - points[k]
+                J_k = np.stack(self.jacobian(u_k[0], u_k[1]), axis=-1)
+                return np.sum(r_k**2), 2.*r_k.dot(J_k)
+            solution = minimize(objective, u[k], jac=True, method='L-BFGS-B',
+                                bounds=[(0., 1.), (0., 1.)])
+            if solution['fun'] <= f[k]:
+                u[k] = solution['x']
+                f[k] = solution['fun']
+            converged[k] = solution['success']
+        return u, f, converged, iteration
+
+    def _inverse_tree(self, n_psi=50, n_eta=50):
+        """Grid of the surface (cosine spacing in psi) and its KD-tree, used
+           as initial guess by inverse. Cached until a parameter (or the
+           coefficients of a BernsteinPolynomial parameter), rotation,
+           location, ref, XYZ or ny changes."""
+        plan = self._plan()
+        versions = tuple(getattr(f, '_version', None)
+                         for f in plan['parameters'])
+        geometry = (tuple(self.rotation), tuple(self.location),
+                    tuple(self.ref), tuple(self.XYZ), n_psi, n_eta, versions)
+        cache = getattr(self, '_tree_cache', None)
+        if cache is None or cache[0] is not plan or cache[1] != geometry:
+            psi = 0.5*(1. - np.cos(np.linspace(0., np.pi, n_psi)))
+            psi, eta = np.meshgrid(psi, np.linspace(0., 1., n_eta))
+            psi, eta = psi.ravel(), eta.ravel()
+            tree = cKDTree(self.points(psi, eta))
+            cache = (plan, geometry, psi, eta, tree)
+            self._tree_cache = cache
+        return cache[2], cache[3], cache[4]
+
+    def _inverse_approximate(self, x_g, y_g, z_g):
         x_lrs, y_l, z_lrs = self._global_to_local(x_g, y_g, z_g)
-        import matplotlib.pyplot as plt
 
         eta = np.array(self._inverse_y(y_l))
 
         # Correction for in case slightly above 1 or below 0
         eta[eta < 0] = 0
         eta[eta > 1] = 1
+        values = self._sample(None, eta, ('sy', 'twist', 'xshear', 'zshear'))
         # shear
-        x_lr = x_lrs - try_as_func(self.xshear, eta)
-        z_lr = z_lrs - try_as_func(self.zshear, eta)
+        x_lr = x_lrs - values['xshear']
+        z_lr = z_lrs - values['zshear']
 
         # rotate
-        twist = try_as_func(self.twist, eta)*np.pi/180.
+        twist = values['twist']*np.pi/180.
         x_l = np.cos(twist)*x_lr-np.sin(twist)*z_lr
         z_l = np.sin(twist)*x_lr+np.cos(twist)*z_lr
 
-        psi = self._inverse_x(x_l, eta)
-        # plt.figure()
-        # plt.scatter(psi, eta)
-        # plt.title('check')
-        # plt.show()
+        psi = self._inverse_x(x_l, eta, values)
         return psi, eta
 
-    def _cst_x(self, psi, eta):
+    def points(self, psi, eta):
+        """Global coordinates as a (..., 3) array"""
+        return np.stack(np.broadcast_arrays(*self(psi, eta)), axis=-1)
+
+    def jacobian(self, psi, eta, step=1e-7):
+        """Derivatives of the global coordinates with respect to psi and to
+           eta ((..., 3) arrays) at all the points at once. The derivative
+           with respect to psi is analytic when sx is a constant or a
+           BernsteinPolynomial (see _psi_derivative). The parameters of eta
+           can be any callable (e.g. interp1d), so the other derivatives are
+           found with central differences, one sided at the borders of the
+           domain."""
+        psi, eta = np.broadcast_arrays(np.asarray(psi, dtype=float),
+                                       np.asarray(eta, dtype=float))
+        eta_p = np.minimum(eta + step, 1.)
+        eta_m = np.maximum(eta - step, 0.)
+        dpsi = self._psi_derivative(psi, eta)
+        if dpsi is None:
+            # Not finite anywhere: differences at every point
+            finite = np.zeros(psi.shape, dtype=bool)
+        else:
+            # e.g. round leading edge (nx1 < 1) at psi = 0
+            finite = np.all(np.isfinite(dpsi), axis=-1)
+        i = ~finite
+        psi_p = np.minimum(psi[i] + step, 1.)
+        psi_m = np.maximum(psi[i] - step, 0.)
+        # All perturbed points in a single evaluation
+        P = self.points(np.concatenate((psi_p, psi_m, psi.ravel(),
+                                        psi.ravel())),
+                        np.concatenate((eta[i], eta[i], eta_p.ravel(),
+                                        eta_m.ravel())))
+        n, m = len(psi_p), psi.size
+        if dpsi is None:
+            dpsi = np.empty(psi.shape + (3,))
+        dpsi[i] = (P[:n] - P[n:2*n])/(psi_p - psi_m)[:, None]
+        deta = ((P[2*n:2*n+m] - P[2*n+m:]) /
+                (eta_p - eta_m).reshape(-1, 1)).reshape(psi.shape + (3,))
+        return dpsi, deta
+
+    def _psi_derivative(self, psi, eta):
+        """Analytic derivative of the global coordinates with respect to
+           psi ((..., 3) array, not finite where the class function in x
+           is singular), or None if sx is not a constant or a
+           BernsteinPolynomial. Only sx depends on psi."""
+        kind = self._plan()['kinds']['sx']
+        if kind != 'constant' and not isinstance(self.sx, BernsteinPolynomial):
+            return None
+        values = self._sample(psi, eta)
+        if kind == 'constant':
+            dsx = 0.
+        elif kind == 'psi':
+            dsx = self.sx.derivative(psi)
+        else:
+            dsx = self.sx.derivative(psi, eta)
+        nx1, nx2 = values['nx1'], values['nx2']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dcx = nx1*np.power(psi, nx1-1.)*np.power(1.-psi, nx2) - \
+                nx2*np.power(psi, nx1)*np.power(1.-psi, nx2-1.)
+            sc_y = values['sy']*values['cy']
+            dx_l = sc_y*self.XYZ[0]
+            dz_l = ((dsx*self._cx(psi, eta, values) + values['sx']*dcx)*sc_y +
+                    values['TE_thickness'])*self.XYZ[2]
+
+            twist = values['twist']*np.pi/180.
+            dP = np.stack(np.broadcast_arrays(
+                np.cos(twist)*dx_l + np.sin(twist)*dz_l, 0.*psi,
+                -np.sin(twist)*dx_l + np.cos(twist)*dz_l), axis=-1)
+            R, R_inv = self._rotation_matrices()
+            return np.matmul(dP, R.T)
+
+    def sx_jacobian(self, psi, eta):
+        """The surface is affine in the shape function sx:
+           points(psi, eta) = P0 + dP_dsx*sx(psi, eta). Returns P0 and dP_dsx
+           ((..., 3) arrays), so shape coefficients can be fitted with
+           linear least squares."""
+        psi, eta = np.broadcast_arrays(np.asarray(psi, dtype=float),
+                                       np.asarray(eta, dtype=float))
+        values = self._sample(psi, eta, _PARAMETERS[1:])
+        values['sx'] = 0.
+        x_l = self._cst_x(psi, eta, values)
+        y_l = self._cst_y(eta)
+        z_l = self._cst_z(psi, eta, values)
+        dz_l = values['sy']*values['cy']*self._cx(psi, eta, values) * \
+            self.XYZ[2]
+
+        twist = values['twist']*np.pi/180.
+        x_lrs = np.cos(twist)*x_l + np.sin(twist)*z_l + values['xshear']
+        z_lrs = -np.sin(twist)*x_l + np.cos(twist)*z_l + values['zshear']
+        P0 = self._local_to_global_points(
+            np.stack(np.broadcast_arrays(x_lrs, y_l, z_lrs), axis=-1))
+        R, R_inv = self._rotation_matrices()
+        dP_dsx = np.stack(np.broadcast_arrays(np.sin(twist)*dz_l, 0.,
+                                              np.cos(twist)*dz_l), axis=-1)
+        return P0, np.matmul(dP_dsx, R.T)
+
+    def _parameter(self, name):
+        if name == 'nx1':
+            return self.nx[0]
+        elif name == 'nx2':
+            return self.nx[1]
+        return getattr(self, name)
+
+    def _plan(self):
+        """Compiled evaluation plan: the kind of every parameter (see
+           _classify) and the constant of the class function in y. It is
+           only rebuilt when a parameter is replaced."""
+        parameters = [self._parameter(name) for name in _PARAMETERS]
+        plan = getattr(self, '_evaluation_plan', None)
+        if plan is None or plan['ny'] != tuple(self.ny) or \
+                any(a is not b for a, b in zip(plan['parameters'],
+                                               parameters)):
+            kinds = {}
+            for name, f in zip(_PARAMETERS, parameters):
+                kinds[name] = _classify(f, name == 'sx')
+            plan = {'parameters': parameters, 'kinds': kinds,
+                    'ny': tuple(self.ny), 'ky': self._k(*self.ny)}
+            self._evaluation_plan = plan
+        return plan
+
+    def _sample(self, psi, eta, names=_PARAMETERS):
+        """Values of the parameters in names at the (psi, eta) points"""
+        kinds = self._plan()['kinds']
+        unique = _unique(eta)
+        # class function in y
+        values = {'cy': _sample_unique(self._cy, unique)}
+        for name in names:
+            f = self._parameter(name)
+            kind = kinds[name]
+            if kind == 'constant':
+                values[name] = f
+            elif kind == 'eta':
+                values[name] = _sample_unique(f, unique)
+            elif kind == 'psi':
+                values[name] = f(psi)
+            elif isinstance(f, BernsteinPolynomial):
+                values[name] = f(psi, eta, unique=unique)
+            else:
+                values[name] = f(psi, eta)
+        return values
+
+    def _cst_x(self, psi, eta, values=None):
+        if values is None:
+            values = self._sample(psi, eta, ('sy',))
         psi0 = self.ref[0]
         X = self.XYZ[0]
 
-        sc_y = try_as_func(self.sy, eta)*self._cy(eta)
-        x = sc_y*(psi-psi0)*X  # +try_as_func(self.xshear, eta)
+        sc_y = values['sy']*values['cy']
+        x = sc_y*(psi-psi0)*X
 
         return x
 
@@ -160,29 +561,30 @@ class CST3D:
 
         return y
 
-    def _cst_z(self, psi, eta):
+    def _cst_z(self, psi, eta, values=None):
+        if values is None:
+            values = self._sample(psi, eta)
         zeta0 = self.ref[2]
         Z = self.XYZ[2]
 
-        sc_x = try_as_func(self.sx, psi, eta)*self._cx(psi, eta)
-        sc_y = try_as_func(self.sy, eta)*self._cy(eta)
-        z = (sc_x*sc_y-zeta0 + psi*self.TE_thickness(eta))*Z  # +try_as_func(self.zshear, eta)
+        sc_x = values['sx']*self._cx(psi, eta, values)
+        sc_y = values['sy']*values['cy']
+        z = (sc_x*sc_y-zeta0 + psi*values['TE_thickness'])*Z
 
         return z
 
-    def _cx(self, psi, eta):
+    def _cx(self, psi, eta, values=None):
         # class function in x
-        nx1 = try_as_func(self.nx[0], eta)
-        nx2 = try_as_func(self.nx[1], eta)
-        # kx = self._k(nx1, nx2)
-        c = np.power(psi, nx1)*np.power(1.-psi, nx2)
+        if values is None:
+            values = self._sample(psi, eta, ('nx1', 'nx2'))
+        c = np.power(psi, values['nx1'])*np.power(1.-psi, values['nx2'])
 
         return c
 
     def _cy(self, eta):
         # class function in y
         ny1, ny2 = self.ny
-        ky = self._k(ny1, ny2)
+        ky = self._plan()['ky']
         c = ky*np.power(eta, ny1)*np.power(1.-eta, ny2)
 
         return c
@@ -199,78 +601,156 @@ class CST3D:
 
         return eta
 
-    def _inverse_x(self, x_l, eta):
+    def _inverse_x(self, x_l, eta, values=None):
+        if values is None:
+            values = self._sample(None, eta, ('sy',))
         psi0, eta0, zeta0 = self.ref
         X, Y, Z = self.XYZ
 
-        sc_y = try_as_func(self.sy, eta)*self._cy(eta)
-        # psi = (x_l-try_as_func(self.xshear, eta))/(sc_y*X)+psi0
+        sc_y = values['sy']*values['cy']
         psi = (x_l)/(sc_y*X)+psi0
 
         return psi
 
-    def _local_to_global(self, x_l, y_l, z_l):
-        q = Euler2Quat(self.rotation)
-        q = NormalizeQuaternion(q)
-        x_g, y_g, z_g = Body2Fixed((x_l, y_l, z_l), q)
-        dx, dy, dz = self.location
-
-        x_g += dx
-        y_g += dy
-        z_g += dz
+    def _rotation_matrices(self):
+        """Rotation matrix from local to global coordinates and its inverse.
+           Only the matrices of the current rotation are kept: they are
+           replaced when rotation changes."""
+        key = tuple(self.rotation)
+        cache = getattr(self, '_rotation_cache', None)
+        if cache is None or cache[0] != key:
+            q = NormalizeQuaternion(Euler2Quat(self.rotation))
+            cache = (key, Quat2Matrix(q),
+                     Quat2Matrix([q[0], -q[1], -q[2], -q[3]]))
+            self._rotation_cache = cache
+        return cache[1], cache[2]
+
+    def _local_to_global_points(self, points):
+        """Local (..., 3) points to global with a single matrix product"""
+        R, R_inv = self._rotation_matrices()
+        return np.matmul(points, R.T) + np.asarray(self.location)
+
+    def _global_to_local_points(self, points):
+        """Global (..., 3) points to local with a single matrix product"""
+        R, R_inv = self._rotation_matrices()
+        return np.matmul(points - np.asarray(self.location), R_inv.T)
 
-        return x_g, y_g, z_g
+    def _local_to_global(self, x_l, y_l, z_l):
+        points = np.stack(np.broadcast_arrays(x_l, y_l, z_l), axis=-1)
+        points = self._local_to_global_points(points)
+        return points[..., 0][()], points[..., 1][()], points[..., 2][()]
 
     def _global_to_local(self, x_g, y_g, z_g):
-        q = Euler2Quat(self.rotation)
-        q = NormalizeQuaternion(q)
-
-        dx, dy, dz = self.location
-
-        x_l, y_l, z_l = Fixed2Body((x_g-dx, y_g-dy, z_g-dz), q)
-
-        return x_l, y_l, z_l
-
-
-def intersection(wing, fuselage, psi_w, eta_w0):
-    x_intersect = np.zeros(len(psi_w))
-    y_intersect = np.zeros(len(psi_w))
-    z_intersect = np.zeros(len(psi_w))
-    for i, psi in enumerate(psi_w):
-        eta = eta_w0
-        # x_w, y_w, z_w = 1., 1., 1.,
-        # x_f, y_f, z_f = 0., 0., 0.,
-        error = 1.  # np.sqrt((x_w-x_f)**2+(y_w-y_f)**2+(z_w-z_f)**2)
-        count = 0
-        while np.abs(error) > 1.e-13 and count < 30:
-            count += 1
-            # print("psi, eta", psi, eta)
-            x_w, y_w, z_w = wing(psi, eta)
-            # print("psi, eta", psi, eta)
-            # print("wing point:", x_w, y_w, z_w)
-            # x_history.append(x_w)
-            # y_history.append(y_w)
-            # z_history.append(z_w)
-            psi_f, eta_f = fuselage.inverse(x_w, y_w, z_w)
-            x_f, y_f, z_f = fuselage(psi_f, eta_f)
-            # print("fuselage point:", x_f, y_f, z_f)
-            # x_history.append(x_f)
-            # y_history.append(y_f)
-            # z_history.append(z_f)
-            toss, eta = wing.inverse(x_f, y_f, z_f)
-            # print(psi, "psi_error", psi-toss)
-            error = np.sqrt((x_w-x_f)**2+(y_w-y_f)**2+(z_w-z_f)**2)
-            # print(psi, "error", error)
-            # print("error: ", error)
-            # input("Press Enter to continue....")
-        # history = np.array([x_history, y_history, z_history]).T
-        # np.savetxt("history"+str(i)+".csv", history, delimiter=',')
-        x_w, y_w, z_w = wing(psi, eta)
-
-        x_intersect[i] = x_w
-        y_intersect[i] = y_w
-        z_intersect[i] = z_w
-
+        points = np.stack(np.broadcast_arrays(x_g, y_g, z_g), axis=-1)
+        points = self._global_to_local_points(points)
+        return points[..., 0][()], points[..., 1][()], points[..., 2][()]
+
+
+def _bounded_newton_step(u, A, g):
+    """Gauss-Newton step of (n, 2) parameters in [0, 1]x[0, 1] for the
+       normal matrices A (n, 2, 2) and gradients g (n, 2). A parameter on a
+       bound whose gradient points out of the domain is kept fixed and the
+       other one is solved alone (active set). A small Levenberg-Marquardt
+       damping keeps the step finite where the Jacobian is singular (e.g.
+       at the leading edge)."""
+    blocked = ((u <= 0.) & (g > 0.)) | ((u >= 1.) & (g < 0.))
+    du = np.zeros_like(u)
+    damping = 1e-12*np.trace(A, axis1=1, axis2=2) + 1e-300
+    diagonal = A[:, [0, 1], [0, 1]] + damping[:, None]
+
+    both = ~blocked.any(axis=1)
+    A_both = A[both] + damping[both, None, None]*np.eye(2)
+    det = A_both[:, 0, 0]*A_both[:, 1, 1] - A_both[:, 0, 1]*A_both[:, 1, 0]
+    g_both = g[both]
+    du[both, 0] = -(A_both[:, 1, 1]*g_both[:, 0] -
+                    A_both[:, 0, 1]*g_both[:, 1])/det
+    du[both, 1] = -(A_both[:, 0, 0]*g_both[:, 1] -
+                    A_both[:, 1, 0]*g_both[:, 0])/det
+    for j in range(2):
+        alone = blocked[:, 1-j] & ~blocked[:, j]
+        du[alone, j] = -g[alone, j]/diagonal[alone, j]
+    # A Gauss-Newton step is always a descent direction; anything else
+    # (round-off of an ill conditioned system) is replaced by the steepest
+    # descent step of the free parameters
+    uphill = np.sum(du*g, axis=1) > 0.
+    du[uphill] = -np.where(blocked[uphill], 0., g[uphill] /
+                           diagonal[uphill])
+    return du
+
+
+def intersection(wing, fuselage, psi_w, eta_w0, tol=1.e-13, maxiter=30,
+                 fixed='psi', full_output=False, psi_w0=0.5):
+    """Intersection curve between two CST3D components (wing-fuselage,
+       tail-fuselage, pylon-wing...).
+
+       For each value in psi_w, the eta of the first component (initial
+       guess eta_w0, a float or an array) and the (psi, eta) of the second
+       one are found such that both surfaces meet. If fixed='eta', psi_w
+       holds fixed values of eta and the psi of the first component is
+       solved instead, starting from psi_w0 (eta_w0 is then unused). All
+       points are advanced simultaneously with Newton iterations on the
+       surface Jacobians; converged points are masked out of the following
+       iterations. Returns the x, y, z of the curve and, if full_output, a
+       dictionary with 'psi_w', 'eta_w', 'psi_f', 'eta_f', 'converged',
+       'error' and 'iterations'."""
+    psi_w = np.atleast_1d(np.asarray(psi_w, dtype=float))
+    n = len(psi_w)
+    if fixed not in ('psi', 'eta'):
+        raise ValueError("fixed must be 'psi' or 'eta'")
+    fixed_index = 0 if fixed == 'psi' else 1
+
+    def wing_parameters(free, i):
+        if fixed_index == 0:
+            return psi_w[i], free
+        return free, psi_w[i]
+
+    # Unknowns: free parameter of the wing and (psi, eta) of the fuselage.
+    # The fuselage guess comes from its approximate inverse
+    u = np.zeros((n, 3))
+    u[:, 0] = eta_w0 if fixed_index == 0 else psi_w0
+    all_points = np.arange(n)
+    x, y, z = wing(*wing_parameters(u[:, 0], all_points))
+    u[:, 1], u[:, 2] = fuselage.inverse(x, y, z)
+    u = np.clip(u, 0., 1.)
+
+    active = np.ones(n, dtype=bool)
+    error = np.full(n, np.inf)
+    iteration = 0
+    for iteration in range(1, maxiter+1):
+        i = all_points[active]
+        psi, eta = wing_parameters(u[i, 0], i)
+        P_w = wing.points(psi, eta)
+        r = P_w - fuselage.points(u[i, 1], u[i, 2])
+        error[i] = np.linalg.norm(r, axis=1)
+        done = error[i] <= tol*(1. + np.linalg.norm(P_w, axis=1))
+        active[i[done]] = False
+        if not active.any():
+            break
+        i, r = i[~done], r[~done]
+        psi, eta = psi[~done], eta[~done]
+
+        J = np.empty((len(i), 3, 3))
+        J[:, :, 0] = wing.jacobian(psi, eta)[1-fixed_index]
+        dF_dpsi, dF_deta = fuselage.jacobian(u[i, 1], u[i, 2])
+        J[:, :, 1] = -dF_dpsi
+        J[:, :, 2] = -dF_deta
+        try:
+            du = np.linalg.solve(J, -r[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            du = -np.matmul(np.linalg.pinv(J), r[..., None])[..., 0]
+        u[i] = np.clip(u[i] + du, 0., 1.)
+    converged = ~active
+    if not converged.all():
+        warnings.warn('Intersection did not converge for %i of %i points' %
+                      (np.sum(~converged), n))
+
+    psi, eta = wing_parameters(u[:, 0], all_points)
+    x_intersect, y_intersect, z_intersect = wing(psi, eta)
+    if full_output:
+        info = {'psi_w': psi, 'eta_w': eta, 'psi_f': u[:, 1],
+                'eta_f': u[:, 2], 'converged': converged, 'error': error,
+                'iterations': iteration}
+        return x_intersect, y_intersect, z_intersect, info
     return x_intersect, y_intersect, z_intersect
 
 
@@ -292,6 +772,20 @@ def NormalizeQuaternion(q):
     return [x*(1.5 - 0.5*(q[0]**2 + q[1]**2 + q[2]**2 + q[3]**2)) for x in q]
 
 
+def Quat2Matrix(q):
+    """Matrix of the transformation v -> q*v*conj(q) (as in Body2Fixed)"""
+    e0, ex, ey, ez = q
+    return np.array([[e0**2 + ex**2 - ey**2 - ez**2,
+                      2.0*(ex*ey - e0*ez),
+                      2.0*(ex*ez + e0*ey)],
+                     [2.0*(ex*ey + e0*ez),
+                      e0**2 - ex**2 + ey**2 - ez**2,
+                      2.0*(ey*ez - e0*ex)],
+                     [2.0*(ex*ez - e0*ey),
+                      2.0*(ey*ez + e0*ex),
+                      e0**2 - ex**2 - ey**2 + ez**2]])
+
+
 def local_to_assembly(x, y, z, q):
     q_mat = [[q[1]**2 - q[2]**2 - q[3]**2,
               2.0*(q[1]*q[2]),
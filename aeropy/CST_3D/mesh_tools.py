@@ -1,48 +1,83 @@
 """Turns a surface description into a panair network"""
 import numpy as np
-import sys
-from math import sin, cos, sqrt
 
+from .coarsening import ramer_douglas_peucker, visvalingam_whyatt
 
-def axisymmetric_surf(data_x, data_r, N_theta):
 
-    theta_start = np.pi  # radians
-    theta_end = np.pi/2.  # radians
+def axisymmetric_surf(data_x, data_r, N_theta, theta_limits=(np.pi, np.pi/2.),
+                      full=False, max_axial=200):
+    """Revolves the profile (data_x, data_r) around the x axis and splits
+       the surface in networks of at most max_axial axial points.
 
-    data_t = np.linspace(theta_start, theta_end, N_theta)
+    :param N_theta: number of angular stations between theta_limits, or
+           an array with the angles (radians) to use directly
+    :param theta_limits: first and last angle (radians, measured from +z
+           towards +y). Default is the quarter from the bottom to the side.
+    :param full: if True the full revolution is meshed (theta_limits[0]
+           to theta_limits[0] - 2*pi) and the network closes on itself.
 
-    surf_coords = np.zeros([len(data_t), len(data_x), 3])
-
-    for i, t in enumerate(data_t):
-        for j, x in enumerate(data_x):
-            surf_coords[i, j, 0] = x
-            surf_coords[i, j, 1] = data_r[j]*sin(t)
-            surf_coords[i, j, 2] = data_r[j]*cos(t)
-
-    num_points = len(data_x)
-
-    max_axial = 200
+    :rtype: list of (N_theta, N_x, 3) arrays (views of a single array)
+    """
+    if np.ndim(N_theta) == 0:
+        theta_start, theta_end = theta_limits
+        if full:
+            theta_end = theta_start - 2*np.pi
+        data_t = np.linspace(theta_start, theta_end, N_theta)
+    else:
+        data_t = np.asarray(N_theta, dtype=float)
+    data_x = np.asarray(data_x, dtype=float)
+    data_r = np.asarray(data_r, dtype=float)
+
+    surf_coords = np.empty((len(data_t), len(data_x), 3))
+    surf_coords[:, :, 0] = data_x
+    np.multiply.outer(np.sin(data_t), data_r, out=surf_coords[:, :, 1])
+    np.multiply.outer(np.cos(data_t), data_r, out=surf_coords[:, :, 2])
+    if full and np.ndim(N_theta) == 0:
+        # the seam is the same set of points
+        surf_coords[-1] = surf_coords[0]
+
+    return split_network(surf_coords, max_axial)
+
+
+def split_network(network, max_axial=200, axis=1):
+    """Splits a network in consecutive networks of about max_axial points
+       along axis. Neighbouring networks share their boundary row and all
+       of them are views of network (no data is copied)."""
+    num_points = network.shape[axis]
     num_network = int(num_points/max_axial)
     if not (num_points % max_axial) == 0:
         num_network += 1
+    if num_network <= 1:
+        return [network]
     nn = int(num_points/num_network)
 
     network_list = []
-    if num_network > 1:
-        for i in range(num_network):
-            if i == num_network-1:
-                network_list.append(surf_coords[:, i*nn:])
-            else:
-                network_list.append(surf_coords[:, i*nn:(i+1)*nn+1])
-
-    else:
-        network_list.append(surf_coords)
+    for i in range(num_network):
+        if i == num_network-1:
+            index = slice(i*nn, None)
+        else:
+            index = slice(i*nn, (i+1)*nn+1)
+        network_list.append(network[(slice(None),)*axis + (index,)])
 
     return network_list
 
 
 def generate_wake(te_points, x_end, n_points=10, angle_of_attack=0.,
-                  user_spacing=None):
+                  user_spacing=None, sideslip=0., out=None):
+    """Wake network trailing from the trailing edge points to x_end.
+
+    :param te_points: (Ny, 3) trailing edge points
+    :param angle_of_attack, sideslip: wake direction in degrees, either
+           one value or one value per trailing edge point
+    :param user_spacing: spacing function (start, stop, num), evaluated
+           once and scaled to the length of every wake line (linear by
+           default)
+    :param out: optional (n_points, Ny, 3) array where the network is
+           written (e.g. a slice of a larger buffer)
+
+    :rtype: (n_points, Ny, 3) array
+    """
+    te_points = np.asarray(te_points, dtype=float)
     # check that x_end is downstream of all trailing edge points
     if not np.all(te_points[:, 0] < x_end):
         raise RuntimeError("wake must terminate downstream of trailing edge")
@@ -51,21 +86,27 @@ def generate_wake(te_points, x_end, n_points=10, angle_of_attack=0.,
         spacing = np.linspace
     else:
         spacing = user_spacing
+    spacing = _normalized_spacing(spacing, n_points)
 
     Ny = te_points.shape[0]
-    wake = np.zeros((n_points, Ny, 3))
-    aoa_r = angle_of_attack*np.pi/180.
-    for j, p in enumerate(te_points):
-        x_te, y_te, z_te = p
-        length = (x_end-x_te)/np.cos(aoa_r)
-        X_0 = spacing(0., length, n_points)
-        X_r = X_0*np.cos(aoa_r)
-        Z_r = X_0*np.sin(aoa_r)
-        wake[:, j, 0] = x_te+X_r
-        wake[:, j, 1] = y_te
-        wake[:, j, 2] = z_te+Z_r
+    if out is None:
+        out = np.empty((n_points, Ny, 3))
+    elif out.shape != (n_points, Ny, 3):
+        raise ValueError("out must have shape (%i, %i, 3)" % (n_points, Ny))
+
+    aoa_r = np.radians(angle_of_attack)
+    beta_r = np.radians(sideslip)
+    direction = np.empty((Ny, 3))
+    direction[:, 0] = np.cos(aoa_r)*np.cos(beta_r)
+    direction[:, 1] = np.cos(aoa_r)*np.sin(beta_r)
+    direction[:, 2] = np.sin(aoa_r)
+    # every line ends at x_end
+    direction *= ((x_end - te_points[:, 0])/direction[:, 0])[:, None]
 
-    return wake
+    np.multiply(spacing[:, None, None], direction, out=out)
+    out += te_points
+
+    return out
 
 
 def constant_eta_edge(eta, n_points):  # , cos_spacing=True):
@@ -180,6 +221,14 @@ class _uniform_spacing:
             raise RuntimeError("must specify edge to use uniform spacing")
 
 
+def _normalized_spacing(spacing, n):
+    """Spacing function evaluated once on [0, 1] (rescaled so that it goes
+       exactly from 0 to 1, also for spacings that return absolute values
+       such as _uniform_spacing)."""
+    s = np.asarray(spacing(0., 1., n), dtype=float)
+    return (s - s[0])/(s[-1] - s[0])
+
+
 def meshparameterspace(shape=(20, 20), psi_limits=(None, None),
                        eta_limits=(None, None),
                        psi_spacing="linear",
@@ -195,6 +244,8 @@ def meshparameterspace(shape=(20, 20), psi_limits=(None, None),
 
     :param psi_limits and eta_limits: only define if 'uniform'. Should be
            points where intersection is located.
+
+    :rtype: psi and eta arrays of the given shape
     """
     if psi_spacing == "cosine":
         x_spacing = cosine_spacing()
@@ -225,33 +276,31 @@ def meshparameterspace(shape=(20, 20), psi_limits=(None, None),
         raise RuntimeError("specified spacing not recognized")
 
     n_psi, n_eta = shape
+    u = _normalized_spacing(x_spacing, n_psi)
+    v = _normalized_spacing(y_spacing, n_eta)
     psi_lower, psi_upper = psi_limits
     eta_lower, eta_upper = eta_limits
 
-    # if limits aren't specified, set lower to 0 and upper to 1
+    # if limits aren't specified, set lower to 0 and upper to 1 and space
+    # the other parameter between the corners of the given limits
+    def corner(limits, index, k, default):
+        return default if limits is None else limits[index, k]
+
     if psi_lower is None:
-        psi_lower = np.full((n_eta, 2), 0.)
-        eta_min = eta_lower[0, 1] if eta_lower is not None else 0.
-        eta_max = eta_upper[0, 1] if eta_upper is not None else 1.
-        psi_lower[:, 1] = y_spacing(eta_min, eta_max, n_eta)
+        psi_lower = _straight_edge(0., corner(eta_lower, 0, 1, 0.),
+                                   corner(eta_upper, 0, 1, 1.), v, 1)
     if psi_upper is None:
-        psi_upper = np.full((n_eta, 2), 1.)
-        eta_min = eta_lower[-1, 1] if eta_lower is not None else 0.
-        eta_max = eta_upper[-1, 1] if eta_upper is not None else 1.
-        psi_upper[:, 1] = y_spacing(eta_min, eta_max, n_eta)
+        psi_upper = _straight_edge(1., corner(eta_lower, -1, 1, 0.),
+                                   corner(eta_upper, -1, 1, 1.), v, 1)
     if eta_lower is None:
-        eta_lower = np.full((n_psi, 2), 0.)
-        psi_min = psi_lower[0, 0] if psi_lower is not None else 0.
-        psi_max = psi_upper[0, 0] if psi_upper is not None else 1.
-        eta_lower[:, 0] = x_spacing(psi_min, psi_max, n_psi)
+        eta_lower = _straight_edge(0., psi_lower[0, 0], psi_upper[0, 0],
+                                   u, 0)
     if eta_upper is None:
-        eta_upper = np.full((n_psi, 2), 1.)
-        psi_min = psi_lower[-1, 0] if psi_lower is not None else 0.
-        psi_max = psi_upper[-1, 0] if psi_upper is not None else 1.
-        eta_upper[:, 0] = x_spacing(psi_min, psi_max, n_psi)
+        eta_upper = _straight_edge(1., psi_lower[-1, 0], psi_upper[-1, 0],
+                                   u, 0)
 
     grid = mesh_curvilinear(psi_lower, psi_upper, eta_lower, eta_upper,
-                            x_spacing, y_spacing)
+                            u, v)
 
     # TODO: the following probably belongs outside the scope of this class
     # if flip:
@@ -260,7 +309,25 @@ def meshparameterspace(shape=(20, 20), psi_limits=(None, None),
     return grid[:, :, 0], grid[:, :, 1]
 
 
+def _straight_edge(value, start, stop, spacing, index):
+    """Edge where one parameter is constant (value) and the other (index)
+       goes from start to stop with the normalized spacing."""
+    edge = np.full((len(spacing), 2), value)
+    edge[:, index] = start + spacing*(stop - start)
+    return edge
+
+
 def mesh_curvilinear(x_lower, x_upper, y_lower, y_upper, x_spacing, y_spacing):
+    """Transfinite interpolation (Coons patch) between four edges.
+
+    :param x_lower, x_upper: (n_y, 2) edges at the first and last x index
+    :param y_lower, y_upper: (n_x, 2) edges at the first and last y index
+    :param x_spacing, y_spacing: spacing functions (start, stop, num) or
+           arrays with the normalized spacing (0 to 1) used to blend the
+           edges. Functions are evaluated once.
+
+    :rtype: (n_x, n_y, 2) grid that matches the edges exactly
+    """
     # verify that corner points match
     xlyl = np.allclose(x_lower[0], y_lower[0], atol=1e-13, rtol=0.)
     xlyu = np.allclose(x_lower[-1], y_upper[0], atol=1e-13, rtol=0.)
@@ -277,8 +344,18 @@ def mesh_curvilinear(x_lower, x_upper, y_lower, y_upper, x_spacing, y_spacing):
 
     n_x = y_lower.shape[0]
     n_y = x_lower.shape[0]
-
-    grid = np.zeros((n_x, n_y, 2))
+    if callable(x_spacing):
+        x_spacing = _normalized_spacing(x_spacing, n_x)
+    if callable(y_spacing):
+        y_spacing = _normalized_spacing(y_spacing, n_y)
+    u = np.asarray(x_spacing, dtype=float)[:, None, None]
+    v = np.asarray(y_spacing, dtype=float)[:, None]
+
+    # x edges minus their bilinear part (which is already in the y blend)
+    lower = x_lower - (x_lower[0] + v*(x_lower[-1] - x_lower[0]))
+    upper = x_upper - (x_upper[0] + v*(x_upper[-1] - x_upper[0]))
+    grid = lower + u*(upper - lower)
+    grid += y_lower[:, None] + v*(y_upper - y_lower)[:, None]
 
     # boundary points are set to match limits exactly
     grid[0, :] = x_lower
@@ -286,12 +363,6 @@ def mesh_curvilinear(x_lower, x_upper, y_lower, y_upper, x_spacing, y_spacing):
     grid[:, 0] = y_lower
     grid[:, -1] = y_upper
 
-    # inner points are evenly spaced between corresponding limits in x and y
-    for i in range(1, n_x-1):
-        grid[i, 1:-1, 1] = y_spacing(y_lower[i, 1], y_upper[i, 1], n_y)[1:-1]
-    for j in range(1, n_y-1):
-        grid[1:-1, j, 0] = x_spacing(x_lower[j, 0], x_upper[j, 0], n_x)[1:-1]
-
     return grid
 
 
@@ -323,84 +394,20 @@ class cosine_spacing:
 #     return points
 
 
-def _distance_point_to_line(P1, P2, PQ):
-    x0, y0 = PQ
-    x1, y1 = P1
-    x2, y2 = P2
-    dy = y2-y1
-    dx = x2-x1
-
-    return abs(dy*x0-dx*y0+x2*y1-y2*x1)/sqrt(dy*dy+dx*dx)
-
-
-def _calc_error(point_list):
-    # calculates error if all points between endpoints of point_list
-    # were removed.
-    error = 0.
-    front = point_list[0]
-    back = point_list[-1]
-    for i in range(1, len(point_list)-1):
-        error += _distance_point_to_line(front, back, point_list[i])
-
-    return error
-
-
-def _calc_length(point_list):
-    # calculates error if all points between endpoints of point_list
-    # were removed.
-    x_f, y_f = point_list[0]
-    x_b, y_b = point_list[-1]
+def coarsen_axi(data_x, data_r, tol, max_length, method='rdp'):
+    """Coarsens an axisymmetric profile.
 
-    length = sqrt((x_b-x_f)**2+(y_b-y_f)**2)
-
-    return length
-
-
-def coarsen_axi(data_x, data_r, tol, max_length):
-    # move x and r data into a list of "points"
-    point_list = []
-    for i in range(len(data_x)):
-        point_list.append(np.array([data_x[i], data_r[i]]))
-
-    # ITERATIVE ALGORITHM
-    # Indices for the start and end points of the algorithm
-    Pstart = 0
-    Pend = len(point_list)-1
-    # Indices for 2 pointers that define current range being examined
-    P1 = Pstart
-    P2 = Pstart+2
-
-    new_point_list = [point_list[Pstart]]
-
-    while P2 <= Pend:
-        error = _calc_error(point_list[P1:P2+1])
+    :param tol: maximum distance of the removed points to the coarse
+           profile
+    :param max_length: maximum length of the coarse segments
+    :param method: 'rdp' (Ramer-Douglas-Peucker) or 'vw'
+           (Visvalingam-Whyatt), see aeropy.CST_3D.coarsening
+    """
+    if method == 'rdp':
+        kept = ramer_douglas_peucker(data_x, data_r, tol, max_length)
+    elif method == 'vw':
+        kept = visvalingam_whyatt(data_x, data_r, tol, max_length)
+    else:
+        raise RuntimeError("specified coarsening method not recognized")
 
-        if error > tol:
-            new_point_list.extend(point_list[P1+1:P2+1])
-            P1 = P2
-            P2 = P1 + 2
-        else:
-            while error < tol and P2 <= Pend:
-                P2 += 1
-                error = _calc_error(point_list[P1:P2+1])
-                cell_length = _calc_length(point_list[P1:P2+1])
-                # print(cell_length)
-                if cell_length > max_length:
-                    error += tol*10.
-            P2 -= 1
-            new_point_list.append(point_list[P2])
-            P1 = P2
-            P2 = P1 + 2
-
-    if not (new_point_list[-1][0] == point_list[-1][0]):
-        new_point_list.append(point_list[-1])
-
-    # print("size of new list", len(new_point_list))
-    sys.stdout.flush()
-    new_x = np.zeros(len(new_point_list))
-    new_r = np.zeros(len(new_point_list))
-    for i in range(0, len(new_point_list)):
-        new_x[i] = new_point_list[i][0]
-        new_r[i] = new_point_list[i][1]
-
-    return new_x, new_r
+    return np.asarray(data_x)[kept], np.asarray(data_r)[kept]
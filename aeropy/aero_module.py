@@ -315,7 +315,8 @@ def force_shell(Data, chord, half_span, height, Velocity, thickness=0,
 
 def pressure_shell(Data, half_span, chord = 'MAX', air_density = 0, Velocity = 0,
                    N = 10, thickness = 0, txt=False, llt_distribution=False,
-                   distribution='Uniform', amplifier = 1):
+                   distribution='Uniform', amplifier = 1,
+                   filename='Pressure_shell.txt', file_format='txt'):
     """Converts pressure coefficient data, usually 2D, into a 3D presurre field
        that Abaqus understands. Can be used for shells (considers thicknesses),
        but also for any surface. Can do Lifting Line Theory (LLT), Elliptical,
@@ -324,82 +325,89 @@ def pressure_shell(Data, half_span, chord = 'MAX', air_density = 0, Velocity = 0
        If chord='MAX', the maximum value for vector 'x' is used as chord. If
        data in non-dimensional, use a numerical value.
 
-       If txt==True, an output textfile is generated."""
-
-    # If data is in the form of pressure coefficients, convert to pressure
-    if 'Cp' in Data.keys():
-        Data['Pressure'] = map(lambda Cp: Cp*0.5*air_density* Velocity**2 *chord,
-                                Data['Cp'])
+       If txt==True, an output file is generated (see write_pressure_field
+       for filename and file_format). Otherwise the field is returned as a
+       tuple of (x, y, z, pressure) tuples (all the chordwise points of each
+       spanwise station in sequence); pressure_field gives it as an array."""
     if chord == 'MAX':
         chord = max(Data['x'])
+    # If data is in the form of pressure coefficients, convert to pressure
+    if 'Cp' in Data.keys():
+        Data['Pressure'] = (np.asarray(Data['Cp'])*0.5*air_density *
+                            Velocity**2*chord)
 
-    Data['x'] = map(lambda x: (chord - 2.*thickness)*x + thickness, Data['x'])
-    Data['y'] = map(lambda x: (chord - 2.*thickness)*x, Data['y'])
-    DataFile = open('Pressure_shell.txt', 'w')
-    DataFile.close()
+    Data['x'] = (chord - 2.*thickness)*np.asarray(Data['x']) + thickness
+    Data['y'] = (chord - 2.*thickness)*np.asarray(Data['y'])
+    Data['z'] = np.linspace(0, half_span, N)
     if distribution == 'Elliptical':
-        Data['z'] = np.linspace(0, half_span, N)
         distribution = amplifier*np.sqrt(1. - (Data['z']/half_span)**2)
     elif distribution == 'LLT':
-        Data['z'] = np.linspace(0, half_span, N)
-        distribution = amplifier*llt_distribution
+        distribution = amplifier*np.asarray(llt_distribution)
     elif distribution == 'Uniform':
-        Data['z'] = np.linspace(0, half_span, N)
-        distribution = amplifier*np.ones((N,1))
+        distribution = amplifier*np.ones(N)
+
+    field = pressure_field(Data['x'], Data['y'], Data['z'], Data['Pressure'],
+                           distribution)
     if txt == True:
-        for j in range(N):
-            for i in range(len(Data['x'])):
-                DataFile = open('Pressure_shell.txt','a')
-                DataFile.write('%f\t%f\t%f\t%f\n' % (
-                    Data['x'][i],
-                    Data['y'][i],
-                    Data['z'][j],
-                    distribution[j]*Data['Pressure'][i]))
-                DataFile.close()
+        write_pressure_field(field, filename, file_format)
         return 0
     else:
-        PressureDistribution = ()
-        for j in range(N):
-            for i in range(len(Data['x'])):
-                    PressureDistribution = PressureDistribution + (
-                                             (Data['x'][i], Data['y'][i],
-                                              Data['z'][j], distribution[j]*
-                                              Data['Pressure'][i]), )
-        return PressureDistribution
+        return tuple(map(tuple, field.tolist()))
 
 def pressure_shell_2D(Data, chord, thickness, half_span, height, Velocity, N,
-                      txt=False):
-    """Calculate pressure field for a 2D Shell."""
+                      txt=False, filename='Pressure_shell.txt',
+                      file_format='txt'):
+    """Calculate pressure field for a 2D Shell (same outputs as
+       pressure_shell)."""
     Air_properties = air_properties(height, unit='feet')
     air_density = Air_properties['Density']
 
-    Data['Pressure'] = map(lambda Cp: Cp*0.5*air_density* Velocity**2 *chord,
-                            Data['Cp'])
-    Data['x'] = map(lambda x: (chord - 2.*thickness)*x + thickness, Data['x'])
-    Data['y'] = map(lambda x: (chord - 2.*thickness)*x, Data['y'])
-    DataFile = open('Pressure_shell.txt', 'w')
-    DataFile.close()
+    Data['Pressure'] = (np.asarray(Data['Cp'])*0.5*air_density *
+                        Velocity**2*chord)
+    Data['x'] = (chord - 2.*thickness)*np.asarray(Data['x']) + thickness
+    Data['y'] = (chord - 2.*thickness)*np.asarray(Data['y'])
     Data['z'] = np.linspace(0, half_span, N)
+
+    field = pressure_field(Data['x'], Data['y'], Data['z'], Data['Pressure'])
     if txt == True:
-        for j in range(N):
-            for i in range(len(Data['x'])):
-                    DataFile = open('Pressure_shell.txt', 'a')
-                    DataFile.write('%f\t%f\t%f\t%f\n' % (
-                        Data['x'][i],
-                        Data['y'][i],
-                        Data['z'][j],
-                        Data['Pressure'][i]))
-                    DataFile.close()
+        write_pressure_field(field, filename, file_format)
         return 0
     else:
-        PressureDistribution = ()
-        for j in range(N):
-            for i in range(len(Data['x'])):
-                    PressureDistribution = PressureDistribution + (
-                                            (Data['x'][i], Data['y'][i],
-                                             Data['z'][j],
-                                             Data['Pressure'][i]), )
-        return PressureDistribution
+        return tuple(map(tuple, field.tolist()))
+
+def pressure_field(x, y, z, pressure, distribution=1.):
+    """Pressure of a section extruded along z as a (len(z)*len(x), 4)
+       array of x, y, z and pressure*distribution (distribution is a
+       scalar or one value per z)."""
+    x = np.asarray(x, dtype=float)
+    z = np.asarray(z, dtype=float)
+    field = np.empty((len(z), len(x), 4))
+    field[:, :, 0] = x
+    field[:, :, 1] = y
+    field[:, :, 2] = z[:, None]
+    field[:, :, 3] = (np.reshape(distribution, (-1, 1)) *
+                      np.asarray(pressure, dtype=float))
+    return field.reshape(-1, 4)
+
+def write_pressure_field(field, filename='Pressure_shell.txt',
+                         file_format='txt'):
+    """Writes a (n, 4) pressure field in one operation.
+
+       - 'txt': tab separated, six decimals (previous Pressure_shell.txt)
+       - 'abaqus': comma separated X, Y, Z, value lines in full precision,
+         for the point cloud import of Abaqus/CAE mapped fields
+       - 'npy': NumPy binary file (np.load to read it)"""
+    field = np.asarray(field, dtype=float)
+    if file_format == 'npy':
+        np.save(filename, field)
+        return
+    elif file_format == 'txt':
+        line = '%f\t%f\t%f\t%f'
+    elif file_format == 'abaqus':
+        line = '%.9e, %.9e, %.9e, %.9e'
+    else:
+        raise ValueError("file_format must be 'txt', 'abaqus' or 'npy'")
+    np.savetxt(filename, field.reshape(-1, 4), fmt=line)
 
 def air_properties(height, unit='feet'):
     """ Function to calculate air properties for a given height (m or ft).
@@ -0,0 +1,118 @@
+"""Readers of airfoil coordinate files (.dat) in Selig and Lednicer formats.
+
+- Selig: name line followed by the points from the trailing edge along the
+  upper surface to the leading edge and back along the lower surface.
+- Lednicer: name line, a line with the number of upper and lower points
+  and then both surfaces from the leading edge to the trailing edge
+  (usually separated by blank lines).
+
+Files are parsed in one pass: the lines before the coordinates that are
+not pairs of numbers (titles, comments) and blank lines are skipped, and
+the coordinates end at the first other line of text (trailing notes or a
+second airfoil in the same file, which is not read). Whole folders or zip
+archives are streamed without extracting them.
+
+@author: Pedro
+"""
+import os
+import zipfile
+import numpy as np
+
+
+def read_airfoil(filename, encoding='latin1'):
+    """Reads a Selig or Lednicer file (see parse_airfoil)."""
+    with open(filename, 'rb') as f:
+        text = f.read().decode(encoding)
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return parse_airfoil(text, name)
+
+
+def parse_airfoil(text, name=None):
+    """Parses the contents of an airfoil file.
+
+    :rtype: dictionary with 'name', 'title' (first line), 'format'
+            ('selig' or 'lednicer'), 'upper' and 'lower' ((n, 2) arrays
+            from the leading to the trailing edge) and 'coordinates' (all
+            the points in Selig order)
+    """
+    lines = text.splitlines()
+    title = lines[0].strip() if lines else ''
+    points = []
+    for line in lines:
+        point = _pair(line)
+        if point is not None:
+            points.append(point)
+        elif points and line.strip():
+            # end of the (first) airfoil of the file
+            break
+    if not points:
+        raise ValueError("no coordinates found in %s" % name)
+    points = np.array(points)
+
+    n_upper, n_lower = points[0]
+    if (n_upper >= 2 and n_lower >= 2 and n_upper == int(n_upper) and
+            n_lower == int(n_lower) and
+            len(points) - 1 >= n_upper + n_lower):
+        kind = 'lednicer'
+        n_upper = int(n_upper)
+        upper = points[1:n_upper+1]
+        lower = points[n_upper+1:n_upper+1+int(n_lower)]
+        if np.array_equal(upper[0], lower[0]):
+            coordinates = np.concatenate((upper[::-1], lower[1:]))
+        else:
+            coordinates = np.concatenate((upper[::-1], lower))
+    else:
+        kind = 'selig'
+        coordinates = points
+        i_LE = np.argmin(points[:, 0])
+        upper = points[:i_LE+1][::-1]
+        lower = points[i_LE:]
+    return {'name': name, 'title': title, 'format': kind, 'upper': upper,
+            'lower': lower, 'coordinates': coordinates}
+
+
+def iter_airfoils(source, extension='.dat', encoding='latin1'):
+    """Generator of (name, airfoil) for all the files with the given
+       extension in a folder or in a zip archive (read in memory, nothing
+       is extracted). Files that cannot be parsed are skipped.
+
+    :param source: folder or .zip file
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.namelist():
+                if not member.lower().endswith(extension):
+                    continue
+                name = os.path.splitext(os.path.basename(member))[0]
+                text = archive.read(member).decode(encoding)
+                airfoil = _try_parse(text, name)
+                if airfoil is not None:
+                    yield name, airfoil
+    else:
+        for filename in sorted(os.listdir(source)):
+            if not filename.lower().endswith(extension):
+                continue
+            name = os.path.splitext(filename)[0]
+            with open(os.path.join(source, filename), 'rb') as f:
+                airfoil = _try_parse(f.read().decode(encoding), name)
+            if airfoil is not None:
+                yield name, airfoil
+
+
+def _try_parse(text, name):
+    try:
+        return parse_airfoil(text, name)
+    except ValueError:
+        return None
+
+
+def _pair(line):
+    """First two numbers of a line (None if the line does not start with
+       two numbers)."""
+    tokens = line.replace(',', ' ').split()
+    if len(tokens) < 2:
+        return None
+    try:
+        return float(tokens[0]), float(tokens[1])
+    except ValueError:
+        return None
@@ -0,0 +1,135 @@
+"""Downsampling and spatial index of point clouds (e.g. from STL files) for
+the 3D fitting.
+
+Fitting objectives compare the surface with the raw points at every
+evaluation, so a fixed, much smaller sample that keeps the shape (voxel
+grid or Poisson disk, refined near the leading and trailing edges) is
+used instead. The full cloud is kept in a KD-tree index, saved once with
+pickle, to measure the distance of a fitted surface to the geometry.
+
+@author: Pedro
+"""
+import pickle
+import numpy as np
+from scipy.spatial import cKDTree
+
+from aeropy.filehandling.stl_io import unique_rows
+
+
+def edge_refinement(x, x_le, x_te, ratio=4., width=0.1):
+    """Spacing factor of every point: 1/ratio at the leading and trailing
+       edges, growing linearly to 1 over width (fraction of the chord).
+
+    :param x: chordwise coordinates of the points
+    :param x_le: leading edge coordinate (scalar or one per point, e.g.
+           interpolated from stl_processing.edge_points)
+    :param x_te: trailing edge coordinate (same)
+    """
+    s = (np.asarray(x, dtype=float) - x_le)/(np.asarray(x_te) - x_le)
+    d = np.clip(np.minimum(s, 1. - s), 0., None)
+    return 1./ratio + (1. - 1./ratio)*np.minimum(d/width, 1.)
+
+
+def voxel_downsample(points, voxel_size, refinement=None,
+                     return_index=False):
+    """One point per cell of a grid: the point closest to the centroid of
+       the points in the cell (so the sample lies on the surface).
+
+    :param points: (n, 3) array
+    :param voxel_size: size of the cells
+    :param refinement: spacing factor of every point (see
+           edge_refinement) or function of points returning it. Points
+           with factor f use cells of size voxel_size/2**k, where 2**k is
+           the power of 2 closest to 1/f.
+    :param return_index: also return the indices of the sample in points
+
+    :rtype: (m, 3) sample (in the order of points)
+    """
+    points = np.asarray(points)
+    size = np.full(len(points), float(voxel_size))
+    level = np.zeros(len(points), dtype=np.int64)
+    if refinement is not None:
+        if callable(refinement):
+            refinement = refinement(points)
+        level = np.maximum(np.round(-np.log2(refinement)), 0).astype(np.int64)
+        size = size/2.**level
+    cells = np.floor(points/size[:, None]).astype(np.int64)
+    cell = unique_rows((level,) + tuple(cells.T))[1]
+
+    # point closest to the centroid of every cell
+    count = np.bincount(cell)
+    centroid = np.stack([np.bincount(cell, points[:, i])/count
+                         for i in range(points.shape[1])], axis=-1)
+    distance = np.sum((points - centroid[cell])**2, axis=1)
+    order = np.lexsort((distance, cell))
+    first = np.searchsorted(cell[order], np.arange(len(count)))
+    index = np.sort(order[first])
+    if return_index:
+        return points[index], index
+    return points[index]
+
+
+def poisson_disk_downsample(points, radius, refinement=None, seed=None,
+                            return_index=False):
+    """Subset of the points in which no two points are closer than the
+       radius (greedy sample elimination in random order).
+
+    :param radius: minimum distance between samples
+    :param refinement: spacing factor of every point (see
+           edge_refinement) or function of points returning it; the radius
+           around a sample is radius*factor
+    :param seed: seed of the random order (same sample for the same seed)
+
+    :rtype: (m, 3) sample (in the order of points)
+    """
+    points = np.asarray(points)
+    radii = np.full(len(points), float(radius))
+    if refinement is not None:
+        if callable(refinement):
+            refinement = refinement(points)
+        radii = radii*refinement
+    tree = cKDTree(points)
+    order = np.random.default_rng(seed).permutation(len(points))
+    removed = np.zeros(len(points), dtype=bool)
+    index = []
+    for i in order.tolist():
+        if removed[i]:
+            continue
+        index.append(i)
+        removed[tree.query_ball_point(points[i], radii[i])] = True
+    index = np.sort(np.array(index, dtype=np.int64))
+    if return_index:
+        return points[index], index
+    return points[index]
+
+
+class PointIndex:
+    """KD-tree of a point cloud. It is pickled with the tree, so load does
+       not build it again.
+
+    :param points: (n, 3) array
+    """
+
+    def __init__(self, points):
+        self.points = np.ascontiguousarray(points, dtype=float)
+        self.tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, points, k=1):
+        """Distances and indices of the k nearest points of the cloud."""
+        return self.tree.query(points, k)
+
+    def distance(self, points):
+        """Distance of every point to the cloud."""
+        return self.tree.query(points)[0]
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
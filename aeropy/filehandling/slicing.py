@@ -0,0 +1,167 @@
+"""Cross sections of triangulated surfaces (e.g. STL files) with NumPy only.
+
+Replaces the ParaView based paraview_tools.get_slices: all the planes are
+intersected with the mesh at once and the sections are returned in memory
+as ordered polylines instead of one csv file per station.
+
+@author: Pedro
+"""
+import numpy as np
+
+from aeropy.filehandling.stl_io import unique_rows
+
+
+def rotation_matrix(rotation):
+    """Rotation matrix for the angles (degrees) of a ParaView/VTK Transform
+       (rotation about y, then about x, then about z). A (3, 3) matrix is
+       returned as is."""
+    rotation = np.asarray(rotation, dtype=float)
+    if rotation.shape == (3, 3):
+        return rotation
+    rx, ry, rz = np.radians(rotation)
+    Rx = np.array([[1., 0., 0.],
+                   [0., np.cos(rx), -np.sin(rx)],
+                   [0., np.sin(rx), np.cos(rx)]])
+    Ry = np.array([[np.cos(ry), 0., np.sin(ry)],
+                   [0., 1., 0.],
+                   [-np.sin(ry), 0., np.cos(ry)]])
+    Rz = np.array([[np.cos(rz), -np.sin(rz), 0.],
+                   [np.sin(rz), np.cos(rz), 0.],
+                   [0., 0., 1.]])
+    return Rz.dot(Rx).dot(Ry)
+
+
+def slice_mesh(vertices, positions, faces=None, rotation=(0., 0., 0.),
+               axis=0):
+    """Sections of a triangulated surface by the planes
+       coordinate[axis] = position (after rotating the surface).
+
+    :param vertices: (n_vertices, 3) array with faces, or (n_triangles, 3,
+           3) array of triangles (vertices are then merged when they are
+           identical)
+    :param positions: coordinates of the planes along axis
+    :param faces: (n_triangles, 3) vertex indices (e.g. from
+           stl_io.mesh_from_stl)
+    :param rotation: ParaView-like angles in degrees or rotation matrix
+           applied to the surface before slicing
+    :param axis: 0, 1 or 2 (x, y or z of the rotated surface)
+
+    :rtype: list with, for each position, a list of (n, 3) polylines in
+            the rotated frame. Closed sections repeat their first point at
+            the end.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    if faces is None:
+        vertices = vertices.reshape(-1, 3)
+        first, faces = unique_rows(vertices.T)
+        vertices = vertices[first]
+        faces = faces.reshape(-1, 3)
+    faces = np.asarray(faces)
+    vertices = vertices.dot(rotation_matrix(rotation).T)
+    positions = np.atleast_1d(np.asarray(positions, dtype=float))
+
+    # Bin the triangles by their extent: each triangle is only paired with
+    # the planes between its lowest and highest vertex
+    order = np.argsort(positions)
+    sorted_positions = positions[order]
+    height = vertices[:, axis][faces]
+    first = np.searchsorted(sorted_positions, height.min(axis=1), 'left')
+    last = np.searchsorted(sorted_positions, height.max(axis=1), 'right')
+    count = last - first
+    triangle = np.repeat(np.arange(len(faces)), count)
+    plane = (np.arange(count.sum()) -
+             np.repeat(np.cumsum(count) - count, count) +
+             np.repeat(first, count))
+
+    # Edges that cross the plane (a vertex on the plane counts as above it)
+    above = height[triangle] >= sorted_positions[plane][:, None]
+    edges = np.array([[0, 1], [1, 2], [2, 0]])
+    crossing = above[:, edges[:, 0]] != above[:, edges[:, 1]]
+    cut = crossing.any(axis=1)
+    triangle = triangle[cut]
+    plane = plane[cut]
+    crossing = crossing[cut]
+    if not len(triangle):
+        return [[] for position in positions]
+    # every cut triangle has exactly two crossing edges
+    edge = np.nonzero(crossing)[1].reshape(-1, 2)
+    a = faces[triangle[:, None], edges[edge, 0]]
+    b = faces[triangle[:, None], edges[edge, 1]]
+    # same orientation of an edge for both of its triangles so that the
+    # shared intersection point is bitwise identical
+    a, b = np.minimum(a, b), np.maximum(a, b)
+
+    # nodes of the sections: (plane, edge) pairs, or (plane, vertex) if
+    # the edge meets the plane at one of its vertices, so that all the
+    # edges through that vertex share the same node
+    plane = np.repeat(plane, 2)
+    a = a.ravel()
+    b = b.ravel()
+    a_on = vertices[a, axis] == sorted_positions[plane]
+    b_on = ~a_on & (vertices[b, axis] == sorted_positions[plane])
+    b[a_on] = a[a_on]
+    a[b_on] = b[b_on]
+    keys = (plane, a, b)
+    first, node = unique_rows(keys)
+    node = node.reshape(-1, 2)
+    k_plane, k_a, k_b = [key[first] for key in keys]
+    h_a = vertices[k_a, axis] - sorted_positions[k_plane]
+    h_b = vertices[k_b, axis] - sorted_positions[k_plane]
+    t = h_a/np.where(k_a == k_b, 1., h_a - h_b)
+    points = vertices[k_a] + t[:, None]*(vertices[k_b] - vertices[k_a])
+    points[:, axis] = sorted_positions[k_plane]
+
+    # a triangle that only touches the plane at a vertex has no segment
+    segment_plane = plane[::2]
+    touching = node[:, 0] == node[:, 1]
+    node = node[~touching]
+    segment_plane = segment_plane[~touching]
+
+    # segments of each plane are chained into polylines
+    sections = len(positions)*[None]
+    segment_order = np.argsort(segment_plane, kind='stable')
+    bounds = np.searchsorted(segment_plane[segment_order],
+                             np.arange(len(positions) + 1))
+    for i in range(len(positions)):
+        segments = node[segment_order[bounds[i]:bounds[i+1]]]
+        sections[order[i]] = [points[chain] for chain in _chain(segments)]
+    return sections
+
+
+def _chain(segments):
+    """Orders segments (pairs of node indices) into chains of nodes."""
+    if not len(segments):
+        return []
+    nodes, local = np.unique(segments, return_inverse=True)
+    local = local.reshape(-1, 2)
+    n = len(nodes)
+    # node -> incident segments (CSR)
+    incident = np.argsort(local.ravel(), kind='stable')//2
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(local.ravel(),
+                                                         minlength=n))))
+    degree = np.diff(offsets)
+    incident = incident.tolist()
+    offsets = offsets.tolist()
+    local = local.tolist()
+    used = len(local)*[False]
+
+    chains = []
+    # open chains start at the ends, then the closed loops
+    starts = np.flatnonzero(degree % 2 == 1).tolist() + list(range(n))
+    for start in starts:
+        current = start
+        chain = [current]
+        while True:
+            for k in range(offsets[current], offsets[current+1]):
+                s = incident[k]
+                if not used[s]:
+                    break
+            else:
+                break
+            used[s] = True
+            p, q = local[s]
+            current = q if p == current else p
+            chain.append(current)
+        if len(chain) > 1:
+            chains.append(nodes[chain])
+    return chains
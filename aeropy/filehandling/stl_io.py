@@ -0,0 +1,102 @@
+"""Reading of STL files without numpy-stl.
+
+Binary files are memory-mapped as a structured array (one 50 byte record
+per triangle), so only the parts that are used are read from disk.
+
+@author: Pedro
+"""
+import os
+import numpy as np
+
+STL_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                      ('vertices', '<f4', (3, 3)),
+                      ('attribute', '<u2')])
+
+
+def read_stl(filename, mmap=True):
+    """Triangles of an STL file.
+
+    :param mmap: if True binary files are memory-mapped (read only)
+
+    :rtype: structured array with fields 'normal' (3), 'vertices' (3, 3)
+            and 'attribute'
+    """
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        header = f.read(84)
+    if len(header) == 84:
+        n = int(np.frombuffer(header, '<u4', 1, 80)[0])
+        if size == 84 + n*STL_DTYPE.itemsize:
+            if mmap:
+                if n == 0:
+                    return np.zeros(0, STL_DTYPE)
+                return np.memmap(filename, STL_DTYPE, 'r', 84, (n,))
+            return np.fromfile(filename, STL_DTYPE, n, offset=84)
+    return _read_ascii_stl(filename)
+
+
+def _read_ascii_stl(filename):
+    with open(filename, 'r') as f:
+        lines = [line.split() for line in f
+                 if line.lstrip().startswith(('vertex', 'facet'))]
+    vertices = np.array([line[1:4] for line in lines
+                         if line[0] == 'vertex'], dtype='<f4')
+    normals = np.array([line[2:5] for line in lines
+                        if line[0] == 'facet'], dtype='<f4')
+    triangles = np.zeros(len(normals), STL_DTYPE)
+    triangles['normal'] = normals.reshape(-1, 3)
+    triangles['vertices'] = vertices.reshape(-1, 3, 3)
+    return triangles
+
+
+def merge_vertices(points, tol=0.):
+    """Unique points and the index of the unique point of every point.
+
+    :param tol: points are snapped to a grid of cells of size tol and
+           merged when they fall in the same cell (exact comparison if 0;
+           close points on both sides of a cell boundary are not merged)
+
+    :rtype: (n_unique, 3) array sorted lexicographically (as
+            np.unique(points, axis=0)) and (n,) index map
+    """
+    points = np.asarray(points)
+    if tol > 0.:
+        columns = np.floor(points/tol).astype(np.int64).T
+    else:
+        columns = points.T
+    first, inverse = unique_rows(columns)
+    return points[first], inverse
+
+
+def unique_rows(columns):
+    """Unique rows of the given columns with a lexsort (much faster than
+       np.unique(..., axis=0)).
+
+    :rtype: index of the first occurrence of each unique row (rows sorted)
+            and index of the unique row of every row
+    """
+    if len(columns[0]) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    order = np.lexsort(columns[::-1])
+    new = np.ones(len(order), dtype=bool)
+    for column in columns:
+        column = column[order]
+        new[1:] &= column[1:] == column[:-1]
+    new = ~new
+    new[0] = True
+    inverse = np.empty(len(order), dtype=int)
+    inverse[order] = np.cumsum(new) - 1
+    return order[new], inverse
+
+
+def mesh_from_stl(filename, tol=0.):
+    """Vertices and connectivity of an STL file.
+
+    :rtype: (n_vertices, 3) float32 vertices and (n_triangles, 3) faces
+            (indices of the vertices of each triangle)
+    """
+    triangles = read_stl(filename)
+    # contiguous (3N, 3) copy of the vertices only
+    points = np.ascontiguousarray(triangles['vertices']).reshape(-1, 3)
+    vertices, index = merge_vertices(points, tol)
+    return vertices, index.reshape(-1, 3)
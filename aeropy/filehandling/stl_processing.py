@@ -2,11 +2,11 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
 import math
-import stl
 import pickle
 import os
 
 from aeropy.xfoil_module import output_reader
+from aeropy.filehandling.stl_io import mesh_from_stl
 import aeropy.geometry.airfoil as am
 
 
@@ -28,20 +28,17 @@ def process_data(data, invert=False, filename=None):
     return processed_data
 
 
-def points_from_stl(filename):
+def points_from_stl(filename, tol=0., return_faces=False):
     '''Takes the path to the file as string input
-    Returns an array of points'''
-    mesh = stl.mesh.Mesh.from_file(filename)
-    list_points = []
-
-    for p in mesh.v0:
-        list_points.append(list(p))
-    for p in mesh.v1:
-        list_points.append(list(p))
-    for p in mesh.v2:
-        list_points.append(list(p))
-
-    return np.unique(list_points, axis=0)
+    Returns an array of unique points (and the vertex indices of every
+    triangle if return_faces, e.g. for filehandling.slicing.slice_mesh).
+    If tol > 0 the points are snapped to a grid of cells of size tol and
+    the points in the same cell are merged (two close points on both
+    sides of a cell boundary are kept).'''
+    points, faces = mesh_from_stl(filename, tol)
+    if return_faces:
+        return points, faces
+    return points
 
 
 def extract_stl(directory="JAXA_files",
@@ -72,52 +69,63 @@ def filter_geometry(data, parts, min_repetitions=5, tol=1e-1,
                     store_output=False, directory='./'):
     '''Filter part points to only select y-wise regions with considerable
        number of points'''
-    def _high_density_eta(data, min_repetitions=100, tol=1e-3):
-        '''Find values of eta with high density to use for leading edge'''
-
-        a = data[:, 1]
-        b = a.copy()
-        b.sort()
-        d = np.append(True, np.diff(b))
-        eta_unique = b[d > tol]
-
-        # Find values that have multiple repetitions
-        eta_dense = []
-        for eta in eta_unique:
-            c = np.abs(a - eta)
-            r = c[c <= tol]
-            if len(r) >= min_repetitions:
-                eta_dense.append(eta)
-
-        return eta_dense
-
     data_sampled = {}
     eta_sampled = {}
 
     for part in parts:
         # Getting airfoil data for certain spanwise locations with high
         # density of points
-        eta_sampled[part] = _high_density_eta(data[part], min_repetitions,
-                                              tol)
-        data_sampled[part] = {}
-        for eta in eta_sampled[part]:
-            data_sampled[part][eta] = []
-        for i in range(len(data[part])):
-            diff = min(np.abs(np.array(eta_sampled[part])-data[part][i][1]))
-            index_sampled = np.where(np.abs(np.array(eta_sampled[part]) -
-                                            data[part][i][1]) == diff)[0][0]
-            if diff < tol:
-                data_sampled[part][eta_sampled[part][index_sampled]].append(
-                    data[part][i])
-        # convert to numpy arrays
-        for eta in eta_sampled[part]:
-            data_sampled[part][eta] = np.array(data_sampled[part][eta])
+        eta_sampled[part] = high_density_eta(data[part][:, 1],
+                                             min_repetitions, tol)
+        data_sampled[part] = dict(zip(eta_sampled[part], group_by_station(
+            data[part], eta_sampled[part], tol)))
 
     if store_output:
         pickle.dump(data_sampled, open(directory+'filtered_data.p', "wb"))
     return data_sampled, eta_sampled
 
 
+def high_density_eta(eta, min_repetitions=100, tol=1e-3):
+    '''Find values of eta with high density to use for leading edge: the
+       sorted values further than tol from the previous one that have at
+       least min_repetitions values within tol'''
+    b = np.sort(eta)
+    d = np.append(True, np.diff(b))
+    eta_unique = b[d > tol]
+
+    # Number of values within tol of each candidate (binary searches in
+    # the sorted values)
+    count = (np.searchsorted(b, eta_unique + tol, 'right') -
+             np.searchsorted(b, eta_unique - tol, 'left'))
+    return list(eta_unique[count >= min_repetitions])
+
+
+def group_by_station(data, stations, tol, axis=1):
+    '''Assign every point to its nearest station (if closer than tol).
+
+    :param stations: sorted station coordinates
+    :rtype: list with an array of points per station (original order of
+            the points is kept)'''
+    data = np.asarray(data)
+    stations = np.asarray(stations, dtype=float)
+    if not len(stations):
+        return []
+    y = data[:, axis]
+    right = np.clip(np.searchsorted(stations, y), 1, len(stations) - 1)
+    left = right - 1
+    if len(stations) == 1:
+        right = left = np.zeros(len(y), dtype=int)
+    # nearest station (the lower one in case of a tie)
+    nearest = np.where(np.abs(stations[right] - y) <
+                       np.abs(stations[left] - y), right, left)
+    inside = np.abs(stations[nearest] - y) < tol
+
+    order = np.flatnonzero(inside)
+    order = order[np.argsort(nearest[order], kind='stable')]
+    offsets = np.searchsorted(nearest[order], np.arange(1, len(stations)))
+    return np.split(data[order], offsets)
+
+
 def clean_edges(eta_dense, LE, TE):
     '''Based on the dervative, remove points that make edges look bad'''
 
@@ -153,20 +161,16 @@ def clean_edges(eta_dense, LE, TE):
 def edge_points(data_sampled, eta_sampled, parts, directory=None):
     LE = {}
     TE = {}
-    LE_list = []
-    TE_list = []
-    theta_list = []
-    chord_list = []
 
     for part in parts:
-        for eta in eta_sampled[part]:
-            x, y, z = data_sampled[part][eta].T
-            [LE_i, TE_i, theta, chord] = am.find_edges(list(x), list(z))
-            LE_list.append([LE_i['x'], eta, LE_i['y'], ])
-            TE_list.append([TE_i['x'], eta, TE_i['y'], ])
-
-            theta_list.append(theta)
-            chord_list.append(chord)
+        # All the sections of a part are processed at once
+        sections = [data_sampled[part][eta] for eta in eta_sampled[part]]
+        offsets = np.cumsum([0] + [len(section) for section in sections])
+        x, y, z = np.concatenate(sections).T
+        LE_i, TE_i, theta, chord = am.find_edges_sections(x, z, offsets[:-1])
+        eta = np.array(eta_sampled[part])
+        LE_list = np.stack((LE_i[:, 0], eta, LE_i[:, 1]), axis=-1)
+        TE_list = np.stack((TE_i[:, 0], eta, TE_i[:, 1]), axis=-1)
         [LE[part], TE[part], eta_sampled[part]] = clean_edges(
             eta_sampled[part], LE_list, TE_list)
     if directory is not None:
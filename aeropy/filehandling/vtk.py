@@ -1,74 +1,267 @@
+"""Writers of VTK XML files (structured grids, points and multiblock sets of
+panel networks) without external dependencies.
+
+Arrays are written as appended binary data (raw or base64, optionally
+zlib compressed) and streamed to disk in blocks, so large networks are
+not duplicated in memory.
+
+@author: Pedro
+"""
+import os
+import base64
+import struct
+import zlib
 import numpy as np
 
+_VTK_TYPES = {'float32': 'Float32', 'float64': 'Float64',
+              'int8': 'Int8', 'uint8': 'UInt8', 'int16': 'Int16',
+              'uint16': 'UInt16', 'int32': 'Int32', 'uint32': 'UInt32',
+              'int64': 'Int64', 'uint64': 'UInt64'}
+
+# multiple of 3 (base64) and of 8 (8 byte values)
+BLOCK_SIZE = 3*2**18
 
-def generate_surface(data, filename='panair'):
+
+def generate_surface(data, filename='panair', **kwargs):
     '''
     Function to generate vtk files from a panair input mesh
     INPUT :
-    - data is a list of networks which are 3D arrays with the dimensions being
-    columns, rows, and coordinates)
+    - data is a network (3D array with the dimensions being columns, rows
+    and coordinates) or a list/dictionary of networks (they can have
+    different sizes)
     - 'filename' is a string to use in filenames.
-    For example 'panair' will result in files called 'panair_network_1', etc.
+    - kwargs are passed to write_structured_grid (encoding, compress,
+    point_data)
 
     OUTPUT :
-    The function will produce one or several files, one for each network,
-    in the folder it's run from.
+    A single network is written to 'filename_network.vts'. Several
+    networks are written to the multiblock file 'filename.vtm' (one .vts
+    file per network in the folder 'filename').
     '''
-    from evtk.hl import gridToVTK
-    # TODO: Currently not working when meshes seeds are not the same
-
-    # X, Y, Z = data
-    X = np.ascontiguousarray(data[:, :, 0])
-    Y = np.ascontiguousarray(data[:, :, 1])
-    Z = np.ascontiguousarray(data[:, :, 2])
-    gridToVTK(filename+'_network', X[:, :, None], Y[:, :, None], Z[:, :, None],
-              cellData={'test': Z[:, :, None]})
-    # def _write_network(points_array, multiple_networks=False):
-    #     n_columns = int(points_array.shape[0])
-    #     n_rows = int(points_array.shape[1])
-
-    #     X = np.zeros((n_rows, n_columns, 1))
-    #     Y = np.zeros((n_rows, n_columns, 1))
-    #     Z = np.zeros((n_rows, n_columns, 1))
-
-    #     for i in range(n_columns):
-    #         for j in range(n_rows):
-    #             X[j, i, 0] = points_array[i, j, 0]
-    #             Y[j, i, 0] = points_array[i, j, 1]
-    #             Z[j, i, 0] = points_array[i, j, 2]
-
-    #     if multiple_networks:
-    #         gridToVTK(filename+'_network'+str(n+1), X, Y, Z)
-    #     else:
-    #         gridToVTK(filename+'_network', X, Y, Z)
-
-    # if type(data) == dict:
-    #     networks = len(data.keys())
-    # else:
-    #     networks = len(data)
-
-    # if type(data) != dict:
-    #     try:
-    #         # check to see if list of networks or just a single one
-    #         check = data[0][0][0][0]
-    #         for n in range(networks):
-    #             points_array = data[n]
-    #         _write_network(points_array, multiple_networks=True)
-    #     except:
-    #         _write_network(data, multiple_networks=False)
-    # else:
-    #     for n in range(networks):
-    #         points_array = data[list(data.keys())[n]]
-    #         _write_network(points_array, multiple_networks=True)
-
-
-def generate_points(data, filename):
-    # TODO: Still cannot visualize points well
-    from evtk.hl import pointsToVTK
-    x, y, z = data.T
-    # Sometimes np.arrays could have manipulated to no longer
-    # be c-continuous os we have to impose it
-    x = np.ascontiguousarray(x)
-    y = np.ascontiguousarray(y)
-    z = np.ascontiguousarray(z)
-    pointsToVTK(filename, x, y, z)
+    if isinstance(data, (dict, list, tuple)):
+        return write_multiblock(filename, data, **kwargs)
+    return write_structured_grid(filename+'_network.vts', data, **kwargs)
+
+
+def generate_points(data, filename, **kwargs):
+    '''Write (n, 3) points as vertices of an unstructured grid
+       ('filename.vtu')'''
+    data = np.asarray(data)
+    n = len(data)
+    arrays = [('Points', 'Points', data, 3),
+              ('Cells', 'connectivity', np.arange(n, dtype=np.int64), 1),
+              ('Cells', 'offsets', np.arange(1, n+1, dtype=np.int64), 1),
+              ('Cells', 'types', np.ones(n, dtype=np.uint8), 1)]
+    piece = ('<Piece NumberOfPoints="%i" NumberOfCells="%i">' % (n, n))
+    filename = _extension(filename, '.vtu')
+    _write_xml(filename, 'UnstructuredGrid', '<UnstructuredGrid>',
+               piece, arrays, **kwargs)
+    return filename
+
+
+def write_structured_grid(filename, points, point_data=None,
+                          cell_data=None, encoding='raw', compress=False):
+    '''VTK XML structured grid (.vts).
+
+    :param points: (n_i, n_j, 3) network or (n_i, n_j, n_k, 3) grid
+    :param point_data: dictionary of arrays of shape (n_i, n_j[, n_k]) or
+           (n_i, n_j[, n_k], n_components)
+    :param cell_data: same with one less point in each direction
+    :param encoding: 'raw' (smallest and fastest) or 'base64'
+    :param compress: zlib compression of the data
+    '''
+    points = np.asarray(points)
+    dims = points.shape[:-1]
+    extent = ' '.join('0 %i' % (n-1) for n in dims + (1,)*(3-len(dims)))
+    arrays = []
+    for section, data in (('PointData', point_data),
+                          ('CellData', cell_data)):
+        for name, values in (data or {}).items():
+            values = np.asarray(values)
+            components = 1 if values.ndim == len(dims) else values.shape[-1]
+            arrays.append((section, name, values, components))
+    arrays.append(('Points', 'Points', points, 3))
+    filename = _extension(filename, '.vts')
+    _write_xml(filename, 'StructuredGrid',
+               '<StructuredGrid WholeExtent="%s">' % extent,
+               '<Piece Extent="%s">' % extent, arrays, encoding, compress)
+    return filename
+
+
+def write_multiblock(filename, networks, **kwargs):
+    '''All networks of a geometry in one multiblock file (.vtm). Each
+       network is written to a .vts file in the folder filename.
+
+    :param networks: dictionary (names are used as block names) or list of
+           networks
+    '''
+    if not isinstance(networks, dict):
+        networks = dict(('network_%i' % (i+1), network)
+                        for i, network in enumerate(networks))
+    filename = _extension(filename, '.vtm')
+    folder = filename[:-4]
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="vtkMultiBlockDataSet" version="1.0" '
+             'byte_order="LittleEndian" header_type="UInt64">',
+             '  <vtkMultiBlockDataSet>']
+    for i, (name, network) in enumerate(networks.items()):
+        piece = write_structured_grid(os.path.join(folder, name + '.vts'),
+                                      network, **kwargs)
+        relative = os.path.relpath(piece, os.path.dirname(filename) or '.')
+        lines.append('    <DataSet index="%i" name="%s" file="%s"/>' %
+                     (i, name, relative.replace(os.sep, '/')))
+    lines += ['  </vtkMultiBlockDataSet>', '</VTKFile>', '']
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines))
+    return filename
+
+
+def _extension(filename, extension):
+    if not filename.endswith(extension):
+        filename += extension
+    return filename
+
+
+def _write_xml(filename, kind, opening, piece, arrays, encoding='raw',
+               compress=False):
+    '''Write the xml header with placeholder offsets, stream the arrays in
+       the appended data section and then fill in the offsets.'''
+    if encoding not in ('raw', 'base64'):
+        raise ValueError("encoding must be 'raw' or 'base64'")
+    compressor = (' compressor="vtkZLibDataCompressor"' if compress else '')
+    placeholder = '%020i' % 0
+    with open(filename, 'wb') as f:
+        def write(text):
+            f.write(text.encode('ascii'))
+
+        write('<?xml version="1.0"?>\n'
+              '<VTKFile type="%s" version="1.0" byte_order="LittleEndian" '
+              'header_type="UInt64"%s>\n  %s\n    %s\n' %
+              (kind, compressor, opening, piece))
+        positions = []
+        sections = []
+        for section, name, values, components in arrays:
+            if section not in sections:
+                if sections:
+                    write('      </%s>\n' % sections[-1])
+                sections.append(section)
+                write('      <%s>\n' % section)
+            dtype = values.dtype
+            if dtype == bool:
+                dtype = np.dtype('uint8')
+            write('        <DataArray type="%s" Name="%s" '
+                  'NumberOfComponents="%i" format="appended" offset="' %
+                  (_VTK_TYPES[dtype.name], name, components))
+            positions.append(f.tell())
+            write(placeholder + '"/>\n')
+        write('      </%s>\n    </Piece>\n  </%s>\n' % (sections[-1], kind))
+        write('  <AppendedData encoding="%s">\n   _' % encoding)
+
+        start = f.tell()
+        stream = _AppendedStream(f, encoding, compress)
+        offsets = []
+        for section, name, values, components in arrays:
+            offsets.append(f.tell() - start)
+            stream.write_array(values, components)
+        write('\n  </AppendedData>\n</VTKFile>\n')
+
+        for position, offset in zip(positions, offsets):
+            f.seek(position)
+            write('%020i' % offset)
+
+
+def _vtk_chunks(values, components):
+    '''Bytes of values in VTK order (first index fastest), one slice of the
+       last grid index at a time.'''
+    dtype = values.dtype.newbyteorder('<')
+    if values.dtype == bool:
+        dtype = np.dtype('uint8')
+    grid = values.ndim - (components > 1)
+    if grid <= 1:
+        yield np.ascontiguousarray(values, dtype).tobytes()
+        return
+    axes = tuple(range(grid-2, -1, -1)) + tuple(range(grid-1, values.ndim-1))
+    for k in range(values.shape[grid-1]):
+        block = values[(slice(None),)*(grid-1) + (k,)]
+        yield np.ascontiguousarray(block.transpose(axes), dtype).tobytes()
+
+
+class _AppendedStream:
+    '''Writes arrays to the appended data section: UInt64 header followed
+       by the data (split in zlib blocks when compressing).'''
+
+    def __init__(self, f, encoding, compress, block_size=BLOCK_SIZE):
+        self.f = f
+        self.encoding = encoding
+        self.compress = compress
+        self.block_size = block_size
+
+    def write_array(self, values, components):
+        nbytes = values.size*max(values.dtype.itemsize, 1)
+        chunks = _vtk_chunks(values, components)
+        if not self.compress:
+            self._write_header(struct.pack('<Q', nbytes))
+            encoder = _Encoder(self.f, self.encoding)
+            for chunk in chunks:
+                encoder.write(chunk)
+            encoder.close()
+            return
+
+        n_blocks = max(1, -(-nbytes//self.block_size))
+        last = nbytes - (n_blocks-1)*self.block_size
+        header = [n_blocks, self.block_size, last]
+        # header space is reserved and filled once the sizes are known
+        header_position = self.f.tell()
+        self._write_header(struct.pack('<%iQ' % (3+n_blocks),
+                                       *(header + n_blocks*[0])))
+        encoder = _Encoder(self.f, self.encoding)
+        sizes = []
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            while len(buffer) >= self.block_size:
+                block = zlib.compress(bytes(buffer[:self.block_size]))
+                del buffer[:self.block_size]
+                sizes.append(len(block))
+                encoder.write(block)
+        if buffer or not sizes:
+            block = zlib.compress(bytes(buffer))
+            sizes.append(len(block))
+            encoder.write(block)
+        encoder.close()
+        end = self.f.tell()
+        self.f.seek(header_position)
+        self._write_header(struct.pack('<%iQ' % (3+n_blocks),
+                                       *(header + sizes)))
+        self.f.seek(end)
+
+    def _write_header(self, header):
+        if self.encoding == 'base64':
+            header = base64.b64encode(header)
+        self.f.write(header)
+
+
+class _Encoder:
+    '''Stream writer (base64 is encoded in multiples of 3 bytes so that
+       the chunks can be concatenated).'''
+
+    def __init__(self, f, encoding):
+        self.f = f
+        self.base64 = encoding == 'base64'
+        self.rest = b''
+
+    def write(self, data):
+        if not self.base64:
+            self.f.write(data)
+            return
+        data = self.rest + data
+        n = len(data) - len(data) % 3
+        self.f.write(base64.b64encode(data[:n]))
+        self.rest = data[n:]
+
+    def close(self):
+        if self.base64 and self.rest:
+            self.f.write(base64.b64encode(self.rest))
+        self.rest = b''
@@ -66,9 +66,9 @@ def create_x(c, n=230, distribution='linear'):
         nose_tip = 0.003*c
 
         # Amount of points for each part (this distribution is empirical)
-        N_tip = 10*n/230
-        N_middle = 180*n/230
-        N_endbody = 40*n/230
+        N_tip = 10*n//230
+        N_middle = 180*n//230
+        N_endbody = 40*n//230
 
         x_endbody = np.linspace(c, limit, N_endbody)
         x_middle = np.linspace(limit, nose_tip, N_middle)
@@ -526,30 +526,80 @@ def find_flap(data, hinge, extra_points=None):
 def find_edges(x, y, both_surfaces=False):
     '''Defining chord as the greatest distance from the trailing edge,
        find the leading edge'''
-
-    x = list(x)
-    y = list(y)
-    # The Trailing edge will always be the point with greatest x for small angles
-    if both_surfaces == True:
-        TE_x = (x[0]+x[-1])/2
-        TE_y = (y[0]+y[-1])/2
+    LE, TE, theta, chord = find_edges_sections(x, y, [0], both_surfaces)
+    return ({'x': LE[0, 0].item(), 'y': LE[0, 1].item()},
+            {'x': TE[0, 0].item(), 'y': TE[0, 1].item()},
+            theta[0].item(), chord[0].item())
+
+
+def _first_argmax(values, offsets):
+    """Index of the first maximum of each segment values[offsets[i]:
+       offsets[i+1]] (segments must not be empty)."""
+    segment = np.repeat(np.arange(len(offsets)),
+                        np.diff(np.append(offsets, len(values))))
+    maximum = np.maximum.reduceat(values, offsets)
+    candidates = np.flatnonzero(values == maximum[segment])
+    return candidates[np.searchsorted(segment[candidates],
+                                      np.arange(len(offsets)))]
+
+
+def find_edges_sections(x, y, offsets, both_surfaces=False):
+    '''find_edges for many sections at once.
+
+    :param x, y: coordinates of all the sections concatenated
+    :param offsets: index of the first point of each section
+    :param both_surfaces: if True the trailing edge is the middle of the
+           first and last points of each section, otherwise the point with
+           the greatest x
+
+    :rtype: LE and TE (n_sections, 2) arrays, theta and chord arrays
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = np.asarray(offsets, dtype=int)
+    ends = np.append(offsets[1:], len(x)) - 1
+    segment = np.repeat(np.arange(len(offsets)), ends - offsets + 1)
+
+    # The Trailing edge will always be the point with greatest x for small
+    # angles
+    if both_surfaces:
+        TE = np.stack(((x[offsets] + x[ends])/2, (y[offsets] + y[ends])/2),
+                      axis=-1)
     else:
-        TE_x = max(x)
-        TE_index = x.index(TE_x)
-        TE_y = y[TE_index]
-    chord = 0
-    LE_index = 0
-
-    for i in range(len(x)):
-        distance = math.sqrt((x[i]-TE_x)**2+(y[i]-TE_y)**2)
-        if distance > chord:
-            LE_index = i
-            chord = distance
-    theta = math.atan2(TE_y - y[LE_index],
-                       TE_x - x[LE_index])
-    return ({'x': x[LE_index], 'y': y[LE_index]},
-            {'x': TE_x, 'y': TE_y},
-            theta, chord)
+        TE_index = _first_argmax(x, offsets)
+        TE = np.stack((x[TE_index], y[TE_index]), axis=-1)
+    distance = np.hypot(x - TE[segment, 0], y - TE[segment, 1])
+    LE_index = _first_argmax(distance, offsets)
+    LE = np.stack((x[LE_index], y[LE_index]), axis=-1)
+    chord = distance[LE_index]
+    theta = np.arctan2(TE[:, 1] - LE[:, 1], TE[:, 0] - LE[:, 0])
+    return LE, TE, theta, chord
+
+
+def normalize_sections(x, y, offsets, LE, theta, chord,
+                       move_to_origin=True):
+    '''rotate for many sections at once: every section is rotated by
+       theta around its LE and divided by its chord (arrays as returned by
+       find_edges_sections).
+
+    :rtype: normalized x and y of all the sections concatenated
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    segment = np.repeat(np.arange(len(offsets)),
+                        np.diff(np.append(offsets, len(x))))
+    origin = np.asarray(LE)[segment]
+    cos = np.cos(theta)[segment]
+    sin = np.sin(theta)[segment]
+    chord = np.asarray(chord)[segment]
+    cx = x - origin[:, 0]
+    cy = y - origin[:, 1]
+    rot_x = (cos*cx + sin*cy)/chord
+    rot_y = (-sin*cx + cos*cy)/chord
+    if not move_to_origin:
+        rot_x += origin[:, 0]
+        rot_y += origin[:, 1]
+    return rot_x, rot_y
 
 
 def rotate(upper, lower={'x': [], 'y': []}, origin={'x': 0, 'y': 0},
@@ -573,40 +623,20 @@ def rotate(upper, lower={'x': [], 'y': []}, origin={'x': 0, 'y': 0},
     if theta == None:
         origin, TE, theta, chord = find_edges(upper['x'], upper['y'],
                                               both_surfaces)
-        # print('theta', theta)
-        # theta = - theta
     output = []
 
     # For trigonometric relations in numpy, theta must be in radians
     if unit_theta == 'deg':
         theta = theta * np.pi/180.
-    # Rotation transformation Matrix
-
-    T = [[np.cos(theta), np.sin(theta)],
-         [-np.sin(theta), np.cos(theta)]]
 
     for coordinates in [upper, lower]:
-        rotated_coordinates = {'x': [], 'y': []}
-        for i in range(len(coordinates['x'])):
-            # The rotation must take place with the center of rotation
-            # as the origin
-            cx = coordinates['x'][i] - origin['x']
-            cy = coordinates['y'][i] - origin['y']
-            # Rotate
-            rot_x = (T[0][0]*cx + T[0][1]*cy)/chord
-            rot_y = (T[1][0]*cx + T[1][1]*cy)/chord
-            # Store and add back the values of the origin
-            if move_to_origin:
-                rotated_coordinates['x'].append(rot_x)
-                rotated_coordinates['y'].append(rot_y)
-            else:
-                rotated_coordinates['x'].append(rot_x + origin['x'])
-                rotated_coordinates['y'].append(rot_y + origin['y'])
-        output.append(rotated_coordinates)
-        # import matplotlib.pyplot as plt
-        # plt.figure()
-        # plt.scatter(coordinates['x'],coordinates['y'])
-        # plt.show()
+        # The rotation must take place with the center of rotation as the
+        # origin (all points at once)
+        rot_x, rot_y = normalize_sections(
+            coordinates['x'], coordinates['y'], [0],
+            [[origin['x'], origin['y']]], np.array([theta]),
+            np.array([chord]), move_to_origin)
+        output.append({'x': rot_x.tolist(), 'y': rot_y.tolist()})
 
     # In case only one surface is of interest
 
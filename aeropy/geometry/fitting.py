@@ -4,16 +4,161 @@ import numpy as np
 import math
 from scipy.optimize import minimize, differential_evolution
 from scipy.spatial.distance import directed_hausdorff
-from multiprocessing import Pool
+from multiprocessing import Pool, cpu_count
+import os
+import copy
 import time
+import pickle
+import tempfile
 
 from aeropy.xfoil_module import output_reader
+from aeropy.CST_3D import BernsteinPolynomial, piecewise_linear
+
+# Fitting object of each convergence study worker. It is sent once per
+# worker (not with every task) and its raw points are memory-mapped
+_worker_study = None
+
+
+def _init_worker(study, raw_file):
+    global _worker_study
+    study.raw = np.load(raw_file, mmap_mode='r')
+    _worker_study = study
+
+
+def _find_worker(param_i):
+    return param_i, _worker_study.find(param_i)
+
+
+def _load_solutions(filename):
+    """Solutions stored by convergence_study. A record interrupted while
+       being written (end of file) is ignored."""
+    solutions = {}
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            while True:
+                try:
+                    param_i, solution = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    break
+                solutions[tuple(param_i)] = solution
+    return solutions
+
+
+def _eta_basis(eta, Ny):
+    """Basis of the shape coefficients in eta: Bernstein polynomials of
+       order Ny or, if Ny is a list of control points, piecewise linear
+       functions"""
+    if np.ndim(Ny) == 0:
+        return BernsteinPolynomial(Ny).basis(eta)
+    identity = np.eye(len(Ny))
+    return np.stack([np.interp(eta, Ny, identity[j]) for j in
+                     range(len(Ny))], axis=-1)
+
+
+def shape_function(A, Ny):
+    """sx (Bernstein polynomial in psi) for the shape coefficients A
+       (one row per psi coefficient, one column per eta basis function)"""
+    if np.ndim(Ny) == 0:
+        coefficients = [BernsteinPolynomial(Ny, list(A_i)) for A_i in A]
+    else:
+        coefficients = [piecewise_linear(Ny, A_i) for A_i in A]
+    return BernsteinPolynomial(len(A)-1, coefficients)
+
+
+def shape_coefficients_least_squares(surface, raw, Nx, Ny, psi, eta):
+    """Shape coefficients (Nx+1, number of eta basis functions) of the sx
+       of surface (CST3D) that minimize the distance between the points
+       surface(psi, eta) and raw (N, 3). The surface is affine in the
+       coefficients (CST3D.sx_jacobian), so the problem is solved exactly
+       with linear least squares."""
+    P0, dP_dsx = surface.sx_jacobian(psi, eta)
+    basis = BernsteinPolynomial(Nx).basis(psi)[:, :, None] * \
+        _eta_basis(eta, Ny)[:, None, :]
+    basis = basis.reshape(len(psi), -1)
+    M = (dP_dsx[:, :, None]*basis[:, None, :]).reshape(-1, basis.shape[1])
+    A = np.linalg.lstsq(M, (raw - P0).ravel(), rcond=None)[0]
+    return A.reshape(Nx+1, -1)
+
+
+def fit_shape_coefficients(surface, raw, Nx, Ny, update=None, x0=None,
+                           tol=1e-10, maxiter=50, **kwargs):
+    """Fit the CST3D surface to raw points (N, 3).
+
+    The shape coefficients of sx (order Nx in psi, and order Ny in eta or
+    piecewise linear if Ny is a list of eta control points) are found with
+    exact linear least squares, alternated with the projection of the raw
+    points on the surface (CST3D.inverse) until they stop changing. Only
+    the nonlinear parameters (class coefficients, shear, twist...), set by
+    update(surface, x), are optimized by minimize from x0 (kwargs are
+    passed to minimize). Their gradient is exact up to the differences of
+    the surface: at the optimal coefficients and projections the error
+    only changes through the explicit dependence of the surface on x, so
+    it is found at fixed (psi, eta) and coefficients with central
+    differences of the surface (no inner solves).
+
+    Returns a dictionary with 'x' (nonlinear parameters), 'A' (shape
+    coefficients), 'fun' (mean squared distance) and 'nit' (projections
+    in the last linear fit). surface is left with the fitted sx."""
+    raw = np.asarray(raw, dtype=float).reshape(-1, 3)
+    if update is None and x0 is not None and len(x0):
+        raise ValueError('update is needed to optimize the parameters x0')
+
+    def linear_fit(x):
+        if update is not None:
+            update(surface, x)
+        A = None
+        for iteration in range(1, maxiter+1):
+            psi, eta = surface.inverse(raw[:, 0], raw[:, 1], raw[:, 2])
+            A_new = shape_coefficients_least_squares(surface, raw, Nx, Ny,
+                                                     psi, eta)
+            surface.sx = shape_function(A_new, Ny)
+            converged = A is not None and \
+                np.max(np.abs(A_new - A)) <= tol*max(1., np.max(np.abs(A)))
+            A = A_new
+            if converged:
+                break
+        psi, eta = surface.inverse(raw[:, 0], raw[:, 1], raw[:, 2])
+        error = np.sum((surface.points(psi, eta) - raw)**2)/len(raw)
+        return {'x': x, 'A': A, 'fun': error, 'nit': iteration, 'psi': psi,
+                'eta': eta}
+
+    # The objective is normalized by its initial value so the default
+    # tolerances of minimize are meaningful whatever the units of raw
+    scale = []
+
+    def objective(x, step=1e-6):
+        solution = linear_fit(x)
+        if not scale:
+            scale.append(1./max(solution['fun'], 1e-300))
+        psi, eta = solution['psi'], solution['eta']
+        r = surface.points(psi, eta) - raw
+        gradient = np.zeros(len(x))
+        for k in range(len(x)):
+            h = step*max(1., abs(x[k]))
+            x_k = np.array(x, dtype=float)
+            x_k[k] = x[k] + h
+            update(surface, x_k)
+            P_plus = surface.points(psi, eta)
+            x_k[k] = x[k] - h
+            update(surface, x_k)
+            P_minus = surface.points(psi, eta)
+            gradient[k] = np.sum(r*(P_plus - P_minus))/(h*len(raw))
+        update(surface, x)
+        return scale[0]*solution['fun'], scale[0]*gradient
+
+    if x0 is None or len(x0) == 0:
+        solution = linear_fit(x0)
+    else:
+        x = minimize(objective, x0, jac=True, **kwargs)['x']
+        # Leave the surface with the optimal parameters
+        solution = linear_fit(x)
+    del solution['psi'], solution['eta']
+    return solution
 
 
 class fitting():
     def __init__(self, **params):
-        def _callback(*args):
-            return params.get('callback', None)(self.object, *args)
+        self.callback_function = params.get('callback', None)
         self.object = params.get('object', np.linspace(10, 50, 9))
         self.update = params.get('update', np.linspace(10, 50, 9))
         self.x0 = params.get('x0', np.linspace(10, 50, 9))
@@ -23,29 +168,108 @@ class fitting():
         self.p2_name = params.get('p2_name', 'Parameter 2')
         self.calculate_points = params.get('calculate_points', 0)
         self.raw = params.get('raw', 0)
-        self.callback = _callback
+        # Function of (p1, p2) returning the orders (Nx, Ny) of the shape
+        # coefficients of a CST3D object. If given, they are found with
+        # fit_shape_coefficients and update/x0 only handle the nonlinear
+        # parameters
+        self.orders = params.get('orders', None)
 
-    def convergence_study(self, parallel=True):
+    def callback(self, *args):
+        """Calls the callback given to the constructor with the fitted
+           object and args (nothing if there is none)"""
+        if self.callback_function is not None:
+            return self.callback_function(self.object, *args)
+
+    def convergence_study(self, parallel=True, workers=None, filename=None):
+        """Find the fit for every pair of parameters in the p1 x p2 grid.
+
+        :param workers: number of processes (number of CPUs by default,
+               never more than the points left to solve).
+
+        :param filename: each solution is appended to this file as soon as
+               it is found. If the file exists, the grid points already in
+               it are not solved again (resumes an interrupted study)."""
         P1_f, P2_f = self._format_parameters()
-        if parallel:
-            p = Pool(len(P1_f))
-        else:
-            p = Pool(1)
+        grid = list(zip(P1_f.tolist(), P2_f.tolist()))
+        solutions = {}
+        if filename is not None:
+            solutions = _load_solutions(filename)
+            # Rewrite the valid records (drops an interrupted last one)
+            with open(filename, 'wb') as f:
+                for param_i in solutions:
+                    pickle.dump((param_i, solutions[param_i]), f)
+        pending = [param_i for param_i in grid if param_i not in solutions]
 
-        input = np.vstack([P1_f, P2_f]).T
-        self.solutions = p.map(self.find, input)
+        if filename is not None:
+            f = open(filename, 'ab')
+        results = self._solve(pending, parallel, workers)
+        try:
+            for param_i, solution in results:
+                solutions[param_i] = solution
+                if filename is not None:
+                    pickle.dump((param_i, solution), f)
+                    f.flush()
+        finally:
+            # Stops the workers and removes the shared raw points even if
+            # a solution could not be stored
+            results.close()
+            if filename is not None:
+                f.close()
+
+        self.solutions = [solutions[param_i] for param_i in grid]
         self.error = np.array([self.solutions[i]['fun'] for i in
                                range(len(self.solutions))])
         self.error = self.error.reshape(self.P1.shape)
         self.rel_error = self.error/self.error[0][0]
 
+    def _solve(self, pending, parallel, workers):
+        """Yield (param_i, solution) for the pending grid points as they
+           are found. The pool is bounded by workers and only the
+           parameters are sent with each task: the fitting object is sent
+           once per worker and the raw points are shared through a
+           memory-mapped file."""
+        if workers is None:
+            workers = cpu_count()
+        workers = min(workers, len(pending))
+        if not parallel or workers <= 1:
+            for param_i in pending:
+                yield param_i, self.find(param_i)
+            return
+
+        raw_file = tempfile.NamedTemporaryFile(suffix='.npy', delete=False)
+        raw_file.close()
+        p = None
+        try:
+            np.save(raw_file.name, np.asarray(self.raw))
+            study = copy.copy(self)
+            study.raw = None
+            p = Pool(workers, _init_worker, (study, raw_file.name))
+            for result in p.imap_unordered(_find_worker, pending):
+                yield result
+        finally:
+            if p is not None:
+                p.terminate()
+                p.join()
+            os.remove(raw_file.name)
+
     def find(self, param_i=[None, None]):
         '''
         inputs: [location, XYZ, sy, ny, xshear]'''
         p1_i, p2_i = param_i
-        x0 = self.x0(p1_i, p2_i)
         start = time.time()
-        solution = minimize(self.shape_difference, x0, args=param_i)
+        if self.orders is not None:
+            Nx, Ny = self.orders(p1_i, p2_i)
+            if callable(self.update) and callable(self.x0):
+                def update(surface, x):
+                    self.update(surface, x, p1_i, p2_i)
+                x0 = self.x0(p1_i, p2_i)
+            else:
+                update, x0 = None, None
+            solution = fit_shape_coefficients(self.object, self.raw, Nx, Ny,
+                                              update, x0)
+        else:
+            x0 = self.x0(p1_i, p2_i)
+            solution = minimize(self.shape_difference, x0, args=(param_i,))
         end = time.time()
         error = solution['fun']
         if p1_i is None:
@@ -53,11 +277,10 @@ class fitting():
         else:
             print('p1=%i\t p2=%i\t error=%f\t time=%f' % (p1_i, p2_i, error,
                                                           end-start))
-        if self.callback is not None:
-            if p1_i is None:
-                self.callback()
-            else:
-                self.callback(p1_i, p2_i)
+        if p1_i is None:
+            self.callback()
+        else:
+            self.callback(p1_i, p2_i)
         return solution
 
     def shape_difference(self, x, param_i):
@@ -0,0 +1 @@
+from .explorer import explore, clear_cache
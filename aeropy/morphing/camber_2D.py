@@ -210,41 +210,12 @@ def calculate_shape_coefficients_tracing(A0, x, y, N1, N2, chord=1., EndThicknes
 
 
 def calculate_strains(Au_P, Al_P, c_P, Au_C, Al_C, c_C, deltaz, psi_spars, spar_thicknesses):
-    # Calculate psi_flats (non-dimensional location of the itersection of
-    # the spars with the lower surface
-    psi_flats = []
-    for j in range(len(psi_spars)):
-        psi_parent_j = psi_spars[j]
-        # Calculate psi at landing
-        # psi_baseline, Au_baseline, Au_goal, deltaz, c_baseline, c_goal
-        psi_children_j = calculate_psi_goal(psi_parent_j, Au_P, Au_C, deltaz, c_P, c_C)
-        x_children_j = psi_children_j*c_C
-        s = calculate_spar_direction(psi_spars[j], Au_P, Au_C, deltaz, c_C)
-        psi_flats.append(x_children_j - spar_thicknesses[j]*s[0])
-
-    # Calculate initial lengths
-    initial_lengths = []
-    psi_list = [0.] + psi_spars + [c_P]
-    for i in range(len(psi_list)-1):
-        initial_lengths.append(calculate_arc_length(psi_list[i], psi_list[i+1], Al_P, deltaz, c_P))
-
-    # Calculate final lengths
-    final_lengths = []
-    psi_list = [0.] + psi_flats + [c_C]  # In P configuration
-    for i in range(len(psi_list)-1):
-        final_lengths.append(calculate_arc_length(
-            psi_list[i]*c_P/c_C, psi_list[i+1]*c_P/c_C, Al_C, deltaz, c_C))
-
-    # Calculate strains
-    strains = []
-
-    for i in range(len(final_lengths)):
-        strains.append((final_lengths[i]-initial_lengths[i])/initial_lengths[i])
-    av_strain = (sum(final_lengths)-sum(initial_lengths))/sum(initial_lengths)
-    # for i in range(len(strains)):
-    # print 'Initial length: ' + str(initial_lengths[i]) + ', final length: ' + str(final_lengths[i]) + ', strains: ' + str(strains[i])
-
-    return strains, av_strain
+    """Arc length based strains between spars for one child (see
+    calculate_strains_vectorized to evaluate many children at once)."""
+    strains, av_strain = calculate_strains_vectorized(
+        Au_P, Al_P, c_P, [Au_C], [Al_C], [c_C], deltaz, psi_spars,
+        [spar_thicknesses])
+    return list(strains[0]), av_strain[0]
 
 
 def plot_airfoil(AC, psi_spars, c_P, deltaz, Au_P, Al_P, image='plot',
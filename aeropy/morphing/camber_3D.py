@@ -8,17 +8,15 @@ Created on Mon Oct 17 10:36:34 2016
 @author: Pedro
 """
 from __future__ import print_function
-import os
-import math
+import warnings
 import numpy as np
-from numpy.linalg import inv
+from multiprocessing import Pool
 
 from aeropy.geometry.airfoil import CST
-# from aeropy.CST_2D.module import CST_3D
-from aeropy.CST_3D.module import CST_3D, calculate_c_baseline, \
-    calculate_psi_goal, calculate_spar_direction
+from aeropy.CST_2D import K
+from aeropy.CST_2D.core import calculate_c_baseline_vectorized, \
+    calculate_spar_locations_vectorized
 
-# TODO: Redo this for new 3D CST
 # TODO: Make this object-oriented
 # Just as quick trick, to make upper morph I just mirror in regards to x
 inverted = False
@@ -30,195 +28,156 @@ morphing_direction = 'forwards'
 # ==============================================================================
 
 
-def calculate_dependent_shape_coefficients(BP_p, BA_p, BP_c, chord_p, sweep_p,
-                                           twist_p, delta_TE_p, sweep_c,
-                                           twist_c, eta_sampling, psi_spars,
-                                           morphing='camber'):
-    """Calculate  dependent shape coefficients for children configuration for a
-       4 order Bernstein polynomial and return the children upper, lower shape
-       coefficients, children chord and spar thicknesses. _P denotes parent
-       parameters"""
-    def calculate_BP_c0(BP_c0, c_P, deltaz, j):
-        Au_C = extract_A(BP_c, j)
-        Au_P = extract_A(BP_p, j)
-        c_C = calculate_c_baseline(c_P, Au_C, Au_P, deltaz)
-        BP_c[0][j] = np.sqrt(c_P/c_C)*Au_P[0]
-        return BP_c[0][j], c_C
-
-    def extract_A(B, j):
-        # Extracting shape coefficient data for column j
-        A = []
-        for i in range(n+1):
-            A.append(B[i][j])
-        return A
-    # Bersntein Polynomial
-
-    def K(r, n):
-        K = math.factorial(n)/(math.factorial(r)*math.factorial(n-r))
-        return K
+def _bernstein(x, n):
+    """Bernstein basis of order n evaluated at x. Output has shape
+       x.shape + (n+1,)."""
+    x = np.asarray(x, dtype=float)[..., None]
+    i = np.arange(n+1)
+    coefficients = np.array([K(r, n) for r in i])
+    return coefficients*x**i*(1-x)**(n-i)
+
 
+def calculate_dependent_shape_coefficients(BP_p, BA_p, BP_c, chord_p,
+                                           delta_TE_p, eta_sampling,
+                                           psi_spars, morphing='camber',
+                                           tol=1e-9, maxiter=100,
+                                           n_panels=100, full_output=False):
+    """Calculate  dependent shape coefficients for children configuration for a
+       Bernstein polynomial and return the children lower shape coefficients
+       (BA_c, (n+1, m+1) array) and children chord at each station. _p
+       denotes parent parameters.
+
+       Station l in eta_sampling uses column l of the Bernstein-in-eta
+       matrices as its 2D shape coefficients. All stations are solved
+       simultaneously: the equal arc length chords with vectorized Newton
+       iterations, the spar locations with arc length tables shared by all
+       stations and the lower surface coefficients with one linear system
+       stacking every station and spar. The first row of BP_c (leading
+       edge) is updated in place.
+
+       The leading edge coefficients are found with fixed point iterations
+       (at most maxiter); a warning is issued if they do not converge. If
+       full_output is True, a dictionary with 'converged', 'iterations',
+       'residual' and 'history' (largest change at every iteration) is also
+       returned. Sweep and twist do not change the arc lengths of the
+       sections, so they are not needed."""
+    BP_p = np.asarray(BP_p, dtype=float)
+    BA_p = np.asarray(BA_p, dtype=float)
+    eta_sampling = np.asarray(eta_sampling, dtype=float)
+    psi_spars = np.asarray(psi_spars, dtype=float)
     # Bernstein Polynomial orders (n is for psi, and m for eta)
     n = len(BP_p) - 1
     m = len(BP_p[0]) - 1
     p = len(psi_spars)
     q = len(eta_sampling)
-    # print p,q,n,m
-    # Define chord, sweep, and twist functions for parent
+    if q > m+1:
+        raise ValueError('Each station needs a column of shape coefficients '
+                         '(at most %i stations)' % (m+1))
+    # Chord and trailing edge thickness of the parent at the stations
     chord_p = CST(eta_sampling, chord_p['eta'][1], chord_p['initial'],
                   Au=chord_p['A'], N1=chord_p['N1'], N2=chord_p['N2'],
                   deltasLE=chord_p['final'])
-    sweep_p = CST(eta_sampling, sweep_p['eta'][1], deltasz=sweep_p['final'],
-                  Au=sweep_p['A'], N1=sweep_p['N1'], N2=sweep_p['N2'])
-    chord_p = chord_p[::-1]
-    sweep_p = sweep_p
-    twist_p = CST(eta_sampling, twist_p['eta'][1], twist_p['initial'],
-                  Au=twist_p['A'], N1=twist_p['N1'], N2=twist_p['N2'],
-                  deltasLE=twist_p['final'])
+    chord_p = np.asarray(chord_p, dtype=float)[::-1]
     delta_TE_p = CST(eta_sampling, delta_TE_p['eta'][1], delta_TE_p['initial'],
                      Au=delta_TE_p['A'], N1=delta_TE_p['N1'],
                      N2=delta_TE_p['N2'], deltasLE=delta_TE_p['final'])
-    # Initialize chord, sweep, and twist functions for child
-    chord_c = []
-    # Initialize child active matrix
-    BA_c = []
-    for i in range(n+1):
-        temp = []
-        for j in range(m+1):
-            temp.append(0)
-        BA_c.append(temp,)
+    c_P = chord_p*np.ones(q)
+    deltaz = np.asarray(delta_TE_p, dtype=float)*np.ones(q)
+
+    # Converting everything from 3D to 2D framework: one row per station
+    Au_P = BP_p[:, :q].T
+    Al_P = BA_p[:, :q].T
+    Au_C = np.array([[BP_c[i][k] for i in range(n+1)] for k in range(q)],
+                    dtype=float)
+
     # Find upper shape coefficient though iterative method since Au_0 is
-    # unknown via fixed point iteration
+    # unknown via fixed point iteration (all stations at once)
+    history = []
+    converged = False
+    for iteration in range(1, maxiter+1):
+        before = Au_C[:, 0].copy()
+        c_C = calculate_c_baseline_vectorized(c_P, Au_C, Au_P, deltaz)
+        Au_C[:, 0] = np.sqrt(c_P/c_C)*Au_P[:, 0]
+        history.append(np.max(np.abs(Au_C[:, 0] - before)))
+        if history[-1] <= tol:
+            converged = True
+            break
+        if not np.isfinite(history[-1]):
+            break
+    if not converged:
+        warnings.warn('Leading edge coefficients did not converge in %i '
+                      'iterations (change=%e)' % (iteration, history[-1]))
+    info = {'converged': converged, 'iterations': iteration,
+            'residual': history[-1], 'history': history}
+    c_C = calculate_c_baseline_vectorized(c_P, Au_C, Au_P, deltaz)
     for k in range(q):
-        error = 9999
-        BP_c0 = BP_p[0][k]
-        while error > 1e-9:
-            before = BP_c0
-            c_P = chord_p[k]
-            deltaz = delta_TE_p[k]
-            [BP_c0, c_c] = calculate_BP_c0(BP_c0, c_P, deltaz, k)
-            error = abs(BP_c0 - before)
-        BP_c[0][k] = BP_c0
-        BA_c[0][k] = np.sqrt(c_P/c_c)*BA_p[0][k]
-        chord_c.append(c_c)
-        print(c_c, BP_c0, np.sqrt(c_P/c_c)*BA_p[0][k])
-    # Calculate thickness and tensor C for the constraint linear system problem
-    psi_A_c = []
+        BP_c[0][k] = Au_C[k, 0]
+    BA_c = np.zeros((n+1, m+1))
+    BA_c[0, :q] = np.sqrt(c_P/c_C)*BA_p[0, :q]
 
     if morphing == 'camber':
-        f = np.zeros((q, p))
-        for l in range(q):
-            # Converting everything from 3D to 2D framework
-            Au_P = extract_A(BP_p, l)
-            Al_P = extract_A(BA_p, l)
-            Au_C = extract_A(BP_c, l)
-            c_P = chord_p[l]
-            c_C = chord_c[l]
-            deltaz = delta_TE_p[l]
-
-            # psi/xi coordinates for lower surface of children configuration
-            psi_lower_children = []
-            xi_upper_children = []
-
-            # psi_baseline, Au_baseline, Au_goal, deltaz, c_baseline, c_goal
-            psi_upper_children = []
-            for j in range(len(psi_spars)):
-                psi_i = calculate_psi_goal(psi_spars[j], Au_P, Au_C, deltaz,
-                                           c_P, c_C)
-                psi_upper_children.append(psi_i)
-            # Calculate xi for upper children. Do not care about lower so just
-            # gave it random shape coefficients
-            xi_upper_children = CST(psi_upper_children, 1., deltasz=[
-                                    deltaz/2./c_C, deltaz/2./c_C], Al=Au_C,
-                                    Au=Au_C)
-            xi_upper_children = xi_upper_children['u']
-
-            # print xi_upper_children
-
-            # Debugging section
-            # x = np.linspace(0, 1)
-            # y = CST(x, 1., deltasz=[deltaz/2./c_C, deltaz/2./c_C],
-            #         Al=Au_C, Au=Au_C)
-            # plt.plot(x,y['u'])
-            # plt.scatter(psi_upper_children, xi_upper_children)
-            # plt.grid()
-            # plt.show()
-            # BREAK
-            for k in range(len(psi_spars)):
-                xi_parent = CST(psi_spars, 1., deltasz=[
-                                deltaz/2./c_P, deltaz/2./c_P], Al=Al_P,
-                                Au=Au_P)
-                delta_k_P = xi_parent['u'][k]-xi_parent['l'][k]
-                # t_k = c_P*(delta_k_P)
-                # Claculate orientation for children
-                s_k = calculate_spar_direction(psi_spars[k], Au_P, Au_C,
-                                               deltaz, c_C)
-                psi_l_k = psi_upper_children[k]-delta_k_P/c_C*s_k[0]
-                xi_l_k = xi_upper_children[k]-delta_k_P/c_C*s_k[1]
-
-                psi_lower_children.append(psi_l_k)
-
-                f_y = 0
-                for j in range(m+1):
-                    f_y += BA_c[0][j]*(1-psi_l_k)**n \
-                        * (K(j, m)*eta_sampling[l]**j
-                           * (1-eta_sampling[l])**(m-j))
-
-                f[l][k] = (2*xi_l_k + psi_l_k*deltaz/c_C) / \
-                          (2*(psi_l_k**0.5) * (psi_l_k-1)) - f_y
-
-                # print 'f_y',f_y, eta_sampling[l],m,j
-            # Store new children psi values
-            psi_A_c.append(psi_lower_children)
-
-        # Initialize F (avoiding using numpy)
-        F = np.zeros([q, p, m+1, n])
-        # F = []
-        # for l in range(q):
-        # tempk = []
-        # for k in range(p):
-        # tempj = []
-        # for j in range(m+1):
-        # tempi = []
-        # for i in range(n):
-        # tempi.append(0.0)
-        # tempj.append(tempi)
-        # tempk.append(tempj)
-        # F.append(tempk)
-
-        # j is the row dimension and i the column dimension in this case
-        for l in range(q):
-            for k in range(p):
-                for j in range(m+1):
-                    for i in range(n):
-                        # Because in Python counting starts at 0,
-                        # need to add 1 to be coherent for equations
-                        ii = i + 1
-                        Sx = K(ii, n)*(psi_A_c[l][k]**ii) * \
-                            (1-psi_A_c[l][k])**(n-ii)
-                        Sy = K(j, m)*(eta_sampling[l]**j) * \
-                            (1-eta_sampling[l])**(m-j)
-                        F[l][k][j][i] = Sx*Sy
-
-        # print len(F), len(F[0]), len(F[0][0]), len(F[0][0][0])
-
-        # Unfolding tensor
-        F_matrix = np.zeros((n**2, n**2))
-        f_vector = np.zeros((n**2, 1))
-        for l in range(q):
-            for k in range(p):
-                for j in range(m+1):
-                    for i in range(n):
-                        ii = n*(l) + k
-                        jj = n*(j) + i
-
-                        F_matrix[ii][jj] = F[l][k][j][i]
-                        f_vector[ii] = f[l][k]
-
-        solution = np.linalg.solve(F_matrix, f_vector)
-
-        for j in range(m+1):
-            for i in range(n):
-                jj = n*(j) + i
-                BA_c[i+1][j] = solution[jj][0]
-        print(BA_c)
-    return BA_c, chord_c
+        # Children upper spar locations (same arc length as the parent) and
+        # spar directions
+        psi_upper_children, s_0, s_1 = calculate_spar_locations_vectorized(
+            psi_spars, Au_P, c_P, Au_C, c_C, deltaz, n_panels=n_panels)
+        C = np.sqrt(psi_upper_children)*(1-psi_upper_children)
+        xi_upper_children = C*np.einsum('lki,li->lk', _bernstein(
+            psi_upper_children, n), Au_C) + \
+            psi_upper_children*(deltaz/2./c_C)[:, None]
+
+        # Parent thickness at the spars
+        C = np.sqrt(psi_spars)*(1-psi_spars)
+        delta_P = C*np.dot(Au_P + Al_P, _bernstein(psi_spars, n).T) + \
+            psi_spars*(deltaz/c_P)[:, None]
+
+        # psi/xi coordinates for lower surface of children configuration
+        psi_A_c = psi_upper_children - delta_P/c_C[:, None]*s_0
+        xi_lower_children = xi_upper_children - delta_P/c_C[:, None]*s_1
+
+        # Linear system for the lower surface coefficients. Rows are the
+        # (station, spar) pairs and columns the unknowns BA_c[i+1][j]
+        S_eta = _bernstein(eta_sampling, m)
+        f_y = (1-psi_A_c)**n*np.dot(S_eta, BA_c[0])[:, None]
+        f = (2*xi_lower_children + psi_A_c*(deltaz/c_C)[:, None]) / \
+            (2*np.sqrt(psi_A_c)*(psi_A_c-1)) - f_y
+        S_psi = _bernstein(psi_A_c, n)[..., 1:]
+        F = np.einsum('lki,lj->lkji', S_psi, S_eta).reshape(q*p, (m+1)*n)
+        f = f.ravel()
+        if F.shape[0] == F.shape[1]:
+            solution = np.linalg.solve(F, f)
+        else:
+            solution = np.linalg.lstsq(F, f, rcond=None)[0]
+        BA_c[1:] = solution.reshape(m+1, n).T
+    if full_output:
+        return BA_c, list(c_C), info
+    return BA_c, list(c_C)
+
+
+def _solve_candidate(args):
+    """Worker: dependent shape coefficients of one candidate."""
+    BP_c, args, kwargs = args
+    BA_c, chord_c = calculate_dependent_shape_coefficients(
+        args[0], args[1], BP_c, *args[2:], **kwargs)
+    return BP_c, BA_c, chord_c
+
+
+def calculate_candidates(BP_p, BA_p, candidates, chord_p, delta_TE_p,
+                         eta_sampling, psi_spars, morphing='camber',
+                         workers=1, maxiter=100):
+    """calculate_dependent_shape_coefficients for several children passive
+       matrices (candidates) of the same parent. With workers > 1 the
+       candidates are spread over a process pool. Returns a list with
+       (BP_c, BA_c, chord_c) per candidate, BP_c with the updated leading
+       edge row."""
+    args = (BP_p, BA_p, chord_p, delta_TE_p, eta_sampling, psi_spars)
+    tasks = [([list(row) for row in BP_c], args,
+              {'morphing': morphing, 'maxiter': maxiter})
+             for BP_c in candidates]
+    if workers > 1 and len(tasks) > 1:
+        pool = Pool(min(workers, len(tasks)))
+        try:
+            return pool.map(_solve_candidate, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    return [_solve_candidate(task) for task in tasks]
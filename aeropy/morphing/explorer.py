@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Design-space exploration of morphing airfoils: for each candidate child the
+dependent shape coefficients are solved (camber_2D), the airfoil is built
+with CST and analyzed with XFOIL for every flight condition.
+
+Identical geometries are only solved and analyzed once, morphing solutions
+and aerodynamic results are memoized between calls and the work is spread
+over a process pool.
+
+@author: Pedro
+"""
+from __future__ import print_function
+import os
+import csv
+import hashlib
+import numpy as np
+from multiprocessing import Pool
+
+import aeropy.xfoil_module as xf
+from aeropy.aero_module import Reynolds
+from aeropy.geometry.airfoil import CST, create_x
+from aeropy.morphing.camber_2D import calculate_dependent_shape_coefficients
+
+# Memoized results shared by all calls to explore (see clear_cache)
+_morphing_cache = {}
+_aerodynamic_cache = {}
+
+
+def clear_cache():
+    """Forget the morphing solutions and aerodynamic results memoized by
+       previous calls to explore."""
+    _morphing_cache.clear()
+    _aerodynamic_cache.clear()
+
+
+def _key(values, decimals=12):
+    """Hashable key for a list of floats (rounded so that geometries that
+       only differ by round-off are treated as identical)."""
+    return tuple(np.round(np.asarray(values, dtype=float).ravel(), decimals))
+
+
+def _parent_key(parent):
+    return (_key(parent['Au']), _key(parent['Al']), float(parent['c']),
+            float(parent.get('deltaz', 0.)), _key(parent['psi_spars']))
+
+
+def _geometry_key(geometry, deltaz):
+    return (_key(geometry['Au']), _key(geometry['Al']),
+            round(geometry['c'], 12), deltaz)
+
+
+def _condition_key(condition):
+    return tuple(sorted(condition.items()))
+
+
+def _solve_morphing(task):
+    """Worker: dependent shape coefficients for one candidate."""
+    parent, AC_u, morphing = task
+    Au_C, Al_C, c_C, spar_thicknesses = calculate_dependent_shape_coefficients(
+        list(AC_u), list(parent['psi_spars']), list(parent['Au']),
+        list(parent['Al']), parent.get('deltaz', 0.), parent['c'],
+        morphing=morphing)
+    return {'Au': list(Au_C), 'Al': list(Al_C), 'c': c_C,
+            'spar_thicknesses': list(spar_thicknesses)}
+
+
+def xfoil_analysis(airfoil, chord, condition, iteration=100):
+    """Default aerodynamic analysis: XFOIL polar at condition['alpha'] for
+       the Reynolds number of condition['velocity'] at
+       condition['altitude'] (feet, 10000 by default). If XFOIL does not
+       converge, the average of two slightly perturbed angles is used."""
+    alpha = condition['alpha']
+    reynolds = Reynolds(condition.get('altitude', 10000),
+                        condition['velocity'], chord)
+    Data = xf.find_coefficients(airfoil, alpha, Reynolds=reynolds,
+                                iteration=iteration, NACA=False, delete=True)
+    deviation = 0.001
+    while Data['CL'] is None and deviation < 1.:
+        Data_aft = xf.find_coefficients(airfoil, alpha*deviation,
+                                        Reynolds=reynolds, iteration=iteration,
+                                        NACA=False, delete=True)
+        Data_fwd = xf.find_coefficients(airfoil, alpha*(1-deviation),
+                                        Reynolds=reynolds, iteration=iteration,
+                                        NACA=False, delete=True)
+        try:
+            for key in Data:
+                Data[key] = (Data_aft[key] + Data_fwd[key])/2.
+        except TypeError:
+            deviation += deviation
+    return Data
+
+
+def _analyze(task):
+    """Worker: aerodynamic analysis of one geometry at several conditions.
+       Each geometry gets its own XFOIL input file so workers do not
+       overwrite each other."""
+    geometry_key, geometry, conditions, analysis, deltaz = task
+    airfoil = 'explore_' + hashlib.md5(
+        repr(geometry_key).encode()).hexdigest()[:12]
+    x = create_x(1., distribution='linear')
+    y = CST(x, 1., [deltaz/2., deltaz/2.], Al=geometry['Al'],
+            Au=geometry['Au'])
+    xf.create_input(x, y['u'], y['l'], airfoil, different_x_upper_lower=False)
+    try:
+        results = [analysis(airfoil, geometry['c'], condition)
+                   for condition in conditions]
+    finally:
+        os.remove(airfoil)
+    return results
+
+
+def _map(function, tasks, workers):
+    if workers > 1 and len(tasks) > 1:
+        p = Pool(min(workers, len(tasks)))
+        try:
+            return p.map(function, tasks)
+        finally:
+            p.close()
+            p.join()
+    return [function(task) for task in tasks]
+
+
+def explore(parent, candidates, conditions, workers=1, morphing='forwards',
+            analysis=xfoil_analysis, paired=False, filename=None):
+    """Evaluate many morphing children of one parent airfoil.
+
+    :param parent: dictionary with the parent 'Au', 'Al', chord 'c',
+           trailing edge thickness 'deltaz' (0 by default) and 'psi_spars'.
+
+    :param candidates: list of children upper shape coefficients
+           (Au_C_1_to_n, as in calculate_dependent_shape_coefficients).
+
+    :param conditions: list of dictionaries with the flight conditions
+           passed to analysis (for the default XFOIL analysis: 'alpha',
+           'velocity' and optionally 'altitude').
+
+    :param workers: number of processes. With 1 everything runs serially.
+
+    :param analysis: function(airfoil, chord, condition) returning a
+           dictionary of coefficients. Must be picklable (module level)
+           when workers > 1.
+
+    :param paired: if False every candidate is evaluated at every
+           condition; if True candidates[i] is only evaluated at
+           conditions[i].
+
+    :param filename: if given, the table is also written as a csv file.
+
+    :rtype: dictionary of numpy arrays (one entry per column, one row per
+            candidate/condition pair): 'candidate', 'AC_u1'...'AC_un',
+            'chord', the condition keys and the analysis outputs.
+    """
+    if paired and len(candidates) != len(conditions):
+        raise ValueError('paired exploration needs as many conditions as '
+                         'candidates')
+    parent_key = _parent_key(parent)
+    deltaz = parent.get('deltaz', 0.)
+
+    # Morphing solves for the unique candidates that were never solved
+    candidate_keys = [_key(AC_u) for AC_u in candidates]
+    pending = []
+    for key in candidate_keys:
+        full_key = (parent_key, morphing, key)
+        if full_key not in _morphing_cache and key not in pending:
+            pending.append(key)
+    solutions = _map(_solve_morphing,
+                     [(parent, key, morphing) for key in pending], workers)
+    for key, solution in zip(pending, solutions):
+        _morphing_cache[(parent_key, morphing, key)] = solution
+
+    # Pairs of geometry and condition to evaluate
+    rows = []
+    if paired:
+        for i, key in enumerate(candidate_keys):
+            rows.append((i, key, conditions[i]))
+    else:
+        for i, key in enumerate(candidate_keys):
+            for condition in conditions:
+                rows.append((i, key, condition))
+
+    # Group missing aerodynamic results by geometry so each XFOIL input file
+    # is written once
+    geometries = {}
+    pending = {}
+    for i, key, condition in rows:
+        geometry = _morphing_cache[(parent_key, morphing, key)]
+        geometry_key = _geometry_key(geometry, deltaz)
+        condition_key = _condition_key(condition)
+        if (geometry_key, analysis, condition_key) in _aerodynamic_cache:
+            continue
+        geometries[geometry_key] = geometry
+        pending.setdefault(geometry_key, {})[condition_key] = condition
+    tasks = [(geometry_key, geometries[geometry_key],
+              list(pending[geometry_key].values()), analysis, deltaz)
+             for geometry_key in pending]
+    results = _map(_analyze, tasks, workers)
+    for task, task_results in zip(tasks, results):
+        geometry_key, geometry, task_conditions = task[:3]
+        for condition, result in zip(task_conditions, task_results):
+            _aerodynamic_cache[(geometry_key, analysis,
+                                _condition_key(condition))] = result
+
+    # Columnar results table
+    n_active = len(candidates[0]) if len(candidates) else 0
+    condition_names = sorted(set().union(*[c.keys() for c in conditions]))
+    table = {'candidate': [], 'chord': []}
+    for j in range(n_active):
+        table['AC_u%i' % (j+1)] = []
+    for name in condition_names:
+        table[name] = []
+    outputs = []
+    for i, key, condition in rows:
+        geometry = _morphing_cache[(parent_key, morphing, key)]
+        geometry_key = _geometry_key(geometry, deltaz)
+        result = _aerodynamic_cache[(geometry_key, analysis,
+                                     _condition_key(condition))]
+        table['candidate'].append(i)
+        table['chord'].append(geometry['c'])
+        for j in range(n_active):
+            table['AC_u%i' % (j+1)].append(key[j])
+        for name in condition_names:
+            table[name].append(condition.get(name, np.nan))
+        outputs.append(result)
+    output_names = []
+    for result in outputs:
+        for name in result:
+            if name not in output_names and name not in table:
+                output_names.append(name)
+    for name in output_names:
+        table[name] = [np.nan if result.get(name) is None else result[name]
+                       for result in outputs]
+    for name in table:
+        table[name] = np.array(table[name])
+
+    if filename is not None:
+        _write_csv(filename, table)
+    return table
+
+
+def _write_csv(filename, table):
+    """Writes the table with one column per entry (numbers with 12
+       significant digits, anything else as text)."""
+    def cell(value):
+        if isinstance(value, (float, np.floating)):
+            return '%.12g' % value
+        return str(value)
+
+    names = list(table.keys())
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in zip(*[table[name] for name in names]):
+            writer.writerow([cell(value) for value in row])
@@ -13,8 +13,8 @@ import math
 import numpy as np
 from numpy.linalg import inv
 
-from aeropy.airfoil_module import CST
-from aeropy.CST.module_2D import *
+from aeropy.geometry.airfoil import CST
+from aeropy.CST_2D import *
 
 # Just as quick trick, to make upper morph I just mirror the image in regards to x
 inverted = False
@@ -22,26 +22,26 @@ inverted = False
 morphing_direction = 'forwards'
 
 
-def calculate_c_baseline(c_L, Au_C, Au_L, deltaz, l_LE=0, eps_LE=0, psi_P_u1=0):
+def calculate_c_baseline(c_L, Au_C, Au_L, deltaz, l_LE=0, eps_LE=0, psi_P_u1=0,
+                         full_output=False):
     """Equations in the New_CST.pdf. Calculates the upper chord in order for
-       the cruise and landing airfoils ot have the same length."""
-
-    def integrand(psi, Au, delta_xi):
-        return np.sqrt(1 + dxi_u(psi, Au, delta_xi)**2)
-
-    def f(c_C):
-        """Function dependent of c_C and that outputs c_C."""
-        y_C, err = quad(integrand, 0, 1, args=(Au_C, deltaz/c_C))
-        y_L, err = quad(integrand, psi_P_u1, 1, args=(Au_L, deltaz/c_L))
-        y_LE, err = quad(integrand, 0, psi_P_u1, args=(Au_L, deltaz/c_L))
-        return c_L*((1-eps_LE)*(l_LE+y_LE)+y_L)/y_C
-    c_C = optimize.fixed_point(f, [c_L])
-    # In case the calculated chord is really close to the original, but the
-    # algorithm was not able to make them equal
-    if abs(c_L - c_C) < 1e-7:
-        return c_L
-    # The output is an array so it needs the extra [0]
-    return c_C[0]
+       the cruise and landing airfoils ot have the same length.
+
+       Solved via Newton iterations with the analytic derivative of the arc
+       length with respect to the chord (see solve_equal_arc_length)."""
+    L_LE = calculate_arc_length(0, psi_P_u1, Au_L, deltaz, c_L)
+    L_L = calculate_arc_length(psi_P_u1, 1, Au_L, deltaz, c_L)
+    L_goal = (1-eps_LE)*(c_L*l_LE + L_LE) + L_L
+
+    def residual(c_C):
+        L_C, dL_dc, dL_dA = calculate_arc_length_derivatives(0, 1, Au_C,
+                                                             deltaz, c_C)
+        return L_C - L_goal, dL_dc
+
+    c_C, info = solve_equal_arc_length(residual, c_L)
+    if full_output:
+        return c_C, info
+    return c_C
 
 
 def calculate_psi_goal(psi_baseline, Au_baseline, Au_goal, deltaz,
@@ -72,26 +72,36 @@ def calculate_psi_goal(psi_baseline, Au_baseline, Au_goal, deltaz,
 
 
 def calculate_A0_moving_LE(psi_baseline, psi_goal_0, Au_baseline, Au_goal, deltaz,
-                           c_baseline, l_LE, eps_LE):
+                           c_baseline, l_LE, eps_LE, full_output=False):
     """Find the value for A_P0^c that has the same arc length for the first bay
-       as for the parent."""
+       as for the parent.
 
-    def integrand(psi_baseline, Al, deltaz, c):
-        return c*np.sqrt(1 + dxi_u(psi_baseline, Al, deltaz/c)**2)
+       Solved via Newton iterations. The chord depends on A0 through the
+       total length constraint, so its sensitivity is found by implicit
+       differentiation of that constraint."""
+    Au_goal = list(Au_goal)
+    L_baseline = calculate_arc_length(0, psi_baseline[0], Au_baseline, deltaz,
+                                      c_baseline)
 
-    def equation(A0, L_baseline, Au_goal, deltaz):
+    def residual(A0):
         Au_goal[0] = A0
-        c = calculate_c_baseline(c_P, Au_goal, Au_baseline, deltaz/c_P, l_LE, eps_LE, psi_spars[0])
-        y, err = quad(integrand, 0, psi_goal_0, args=(Au_goal, deltaz, c))
-        print('y', y, y - (1-eps_LE)*L_baseline, A0, c)
-        return y - (1-eps_LE)*(L_baseline - c*l_LE)
-    L_baseline, err = quad(integrand, 0, psi_baseline[0], args=(Au_baseline, deltaz,
-                                                                c_baseline))
+        c = calculate_c_baseline(c_baseline, Au_goal, Au_baseline,
+                                 deltaz/c_baseline, l_LE, eps_LE,
+                                 psi_baseline[0])
+        L_C, dLC_dc, dLC_dA = calculate_arc_length_derivatives(
+            0, 1, Au_goal, deltaz/c_baseline, c)
+        dc_dA0 = -dLC_dA[0]/dLC_dc
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        y = fsolve(equation, Au_goal[0], args=(L_baseline, Au_goal, deltaz))
-    return y[0]
+        y, dy_dc, dy_dA = calculate_arc_length_derivatives(0, psi_goal_0,
+                                                           Au_goal, deltaz, c)
+        r = y - (1-eps_LE)*(L_baseline - c*l_LE)
+        dr = dy_dA[0] + (dy_dc + (1-eps_LE)*l_LE)*dc_dA0
+        return r, dr
+
+    A0, info = solve_equal_arc_length(residual, Au_goal[0])
+    if full_output:
+        return A0, info
+    return A0
 
 
 def calculate_spar_direction(psi_baseline, Au_baseline, Au_goal, deltaz, c_goal, l_LE, eps_LE, psi_spars):
@@ -289,43 +299,14 @@ def calculate_shape_coefficients_tracing(A0, x, y, N1, N2, chord=1., EndThicknes
     return A
 
 
-def calculate_strains(Au_P, Al_P, c_P, Au_C, Al_C, c_C, deltaz, psi_spars, spar_thicknesses):
-    # Calculate psi_flats (non-dimensional location of the itersection of
-    # the spars with the lower surface
-    psi_flats = []
-    for j in range(len(psi_spars)):
-        psi_parent_j = psi_spars[j]
-        # Calculate psi at landing
-        # psi_baseline, Au_baseline, Au_goal, deltaz, c_baseline, c_goal
-        psi_children_j = calculate_psi_goal(
-            psi_parent_j, Au_P, Au_C, deltaz, c_P, c_C, l_LE, eps_LE, psi_spars[0])
-        x_children_j = psi_children_j*c_C
-        s = calculate_spar_direction(psi_spars[j], Au_P, Au_C, deltaz, c_C, l_LE, eps_LE, psi_spars)
-        psi_flats.append(x_children_j - spar_thicknesses[j]*s[0])
-
-    # Calculate initial lengths
-    initial_lengths = []
-    psi_list = [0.] + psi_spars + [c_P]
-    for i in range(len(psi_list)-1):
-        initial_lengths.append(calculate_arc_length(psi_list[i], psi_list[i+1], Al_P, deltaz, c_P))
-
-    # Calculate final lengths
-    final_lengths = []
-    psi_list = [0.] + psi_flats + [c_C]  # In P configuration
-    for i in range(len(psi_list)-1):
-        final_lengths.append(calculate_arc_length(
-            psi_list[i]*c_P/c_C, psi_list[i+1]*c_P/c_C, Al_C, deltaz, c_C))
-
-    # Calculate strains
-    strains = []
-
-    for i in range(len(final_lengths)):
-        strains.append((final_lengths[i]-initial_lengths[i])/initial_lengths[i])
-    av_strain = (sum(final_lengths)-sum(initial_lengths))/sum(initial_lengths)
-    # for i in range(len(strains)):
-    # print 'Initial length: ' + str(initial_lengths[i]) + ', final length: ' + str(final_lengths[i]) + ', strains: ' + str(strains[i])
-
-    return strains, av_strain
+def calculate_strains(Au_P, Al_P, c_P, Au_C, Al_C, c_C, deltaz, psi_spars, spar_thicknesses,
+                      l_LE=0, eps_LE=0):
+    """Arc length based strains between spars for one child (see
+    calculate_strains_vectorized to evaluate many children at once)."""
+    strains, av_strain = calculate_strains_vectorized(
+        Au_P, Al_P, c_P, [Au_C], [Al_C], [c_C], deltaz, psi_spars,
+        [spar_thicknesses], l_LE, eps_LE)
+    return list(strains[0]), av_strain[0]
 
 
 def plot_airfoil(AC, psi_spars, c_L, deltaz, Au_L, Al_L, image='plot',
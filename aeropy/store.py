@@ -0,0 +1,291 @@
+"""Append-only, memory-mappable storage of geometry and analysis results.
+
+A store is a folder with one raw binary file per dataset and a small json
+file with the metadata (dtype, shape, number of records, keys, attributes
+and schema version). Datasets are only read when they are accessed, as
+memory maps, so a single airfoil out of a database of thousands is loaded
+without reading the rest. Records are appended at the end of the files and
+the metadata is replaced atomically afterwards, so an interrupted run
+leaves the store as it was after the last complete append.
+
+Example::
+
+    store = Store('aerodynamics', schema_version=1)
+    if 'L/D' not in store:
+        store.create_dataset('L/D', float, ragged=True)
+    store['L/D'].append(lift_to_drag, key=name)
+    ...
+    Store('aerodynamics', 'r')['L/D'][name]   # only reads this record
+
+@author: Pedro
+"""
+import os
+import json
+import numpy as np
+
+FORMAT_VERSION = 1
+_META = 'meta.json'
+
+
+class Store:
+    """Folder of datasets.
+
+    :param path: folder of the store
+    :param mode: 'r' (read only), 'a' (read and append, created if needed)
+           or 'w' (new empty store, existing datasets are deleted)
+    :param schema_version: version of the contents. A new store records
+           it; opening an existing store with a different version raises
+           a ValueError (None accepts any version).
+    """
+
+    def __init__(self, path, mode='a', schema_version=None):
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError("mode must be 'r', 'a' or 'w'")
+        self.path = path
+        self.mode = mode
+        meta_file = os.path.join(path, _META)
+        if mode == 'w' and os.path.exists(meta_file):
+            old = _read_json(meta_file)
+            for name in old['datasets']:
+                for filename in _files(path, name):
+                    if os.path.exists(filename):
+                        os.remove(filename)
+            os.remove(meta_file)
+        if os.path.exists(meta_file):
+            self._meta = _read_json(meta_file)
+            if self._meta['format_version'] > FORMAT_VERSION:
+                raise ValueError("store written by a newer version of aeropy")
+            if (schema_version is not None and
+                    self._meta['schema_version'] != schema_version):
+                raise ValueError("store has schema version %s, expected %s" %
+                                 (self._meta['schema_version'],
+                                  schema_version))
+        elif mode == 'r':
+            raise IOError("no store at %s" % path)
+        else:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self._meta = {'format_version': FORMAT_VERSION,
+                          'schema_version': (0 if schema_version is None
+                                             else schema_version),
+                          'attrs': {}, 'datasets': {}}
+            self.flush()
+        self._datasets = {}
+
+    @property
+    def schema_version(self):
+        return self._meta['schema_version']
+
+    @property
+    def attrs(self):
+        """Json serializable attributes of the store (saved by flush and
+           by every append)."""
+        return self._meta['attrs']
+
+    def keys(self):
+        return list(self._meta['datasets'])
+
+    def __contains__(self, name):
+        return name in self._meta['datasets']
+
+    def __getitem__(self, name):
+        if name not in self._meta['datasets']:
+            raise KeyError(name)
+        if name not in self._datasets:
+            self._datasets[name] = Dataset(self, name)
+        return self._datasets[name]
+
+    def create_dataset(self, name, dtype, shape=(), ragged=False, attrs=None):
+        """New empty dataset.
+
+        :param dtype: numpy dtype (structured dtypes are allowed)
+        :param shape: shape of each row
+        :param ragged: if True every append is one record with any number
+               of rows (e.g. the coordinates of one airfoil); otherwise
+               appends add rows to a single array
+        """
+        self._check_writable()
+        if name in self:
+            raise ValueError("dataset %s already exists" % name)
+        self._meta['datasets'][name] = {
+            'dtype': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            'shape': list(shape), 'ragged': ragged, 'rows': 0,
+            'keys': [] if ragged else None, 'attrs': attrs or {}}
+        for filename in _files(self.path, name):
+            open(filename, 'wb').close()
+        self.flush()
+        return self[name]
+
+    def put(self, name, values, attrs=None):
+        """Stores a whole array as a new (appendable) dataset."""
+        values = np.asarray(values)
+        self.create_dataset(name, values.dtype, values.shape[1:],
+                            attrs=attrs)
+        self[name].append(values)
+        return self[name]
+
+    def flush(self):
+        """Writes the metadata (atomically)."""
+        self._check_writable()
+        meta_file = os.path.join(self.path, _META)
+        with open(meta_file + '.tmp', 'w') as f:
+            json.dump(self._meta, f)
+        os.replace(meta_file + '.tmp', meta_file)
+
+    def _check_writable(self):
+        if self.mode == 'r':
+            raise IOError("store opened as read only")
+
+
+class Dataset:
+    """Dataset of a Store. Indexing returns memory-mapped views:
+
+    - rows (ragged=False): dataset[i], dataset[i:j], dataset[:]
+    - records (ragged=True): dataset[i] (position) or dataset[key] (keys
+      are strings); len is the number of records
+    """
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self._data_file, self._index_file = _files(store.path, name)
+        self._cache = None
+        self._key_index = None
+
+    @property
+    def _info(self):
+        return self.store._meta['datasets'][self.name]
+
+    @property
+    def dtype(self):
+        return np.lib.format.descr_to_dtype(_descr(self._info['dtype']))
+
+    @property
+    def attrs(self):
+        return self._info['attrs']
+
+    @property
+    def ragged(self):
+        return self._info['ragged']
+
+    def keys(self):
+        return list(self._info['keys'] or [])
+
+    def __len__(self):
+        if self.ragged:
+            return len(self._info['keys'])
+        return self._info['rows']
+
+    def __getitem__(self, index):
+        data, ends = self._arrays()
+        if not self.ragged:
+            return data[index]
+        if not isinstance(index, (int, np.integer)):
+            index = self._key_to_index(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = ends[index-1] if index > 0 else 0
+        return data[start:ends[index]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, values, key=None):
+        """Appends rows (or one record if ragged) at the end of the files
+           and updates the metadata."""
+        self.store._check_writable()
+        info = self._info
+        values = np.asarray(values, dtype=self.dtype)
+        shape = tuple(info['shape'])
+        if values.shape[1:] != shape:
+            values = values.reshape((-1,) + shape)
+        if self.ragged:
+            if key is None:
+                key = len(self)
+            key = _json_key(key)
+            if key in self._keys():
+                raise KeyError("record %s already exists" % key)
+        # the maps of the files are dropped before they are resized (a
+        # mapped file cannot be truncated on Windows); they are opened
+        # again by the next read
+        self._cache = None
+        _write_at(self._data_file, info['rows']*_row_size(self.dtype, shape),
+                  values)
+        rows = info['rows'] + len(values)
+        if self.ragged:
+            _write_at(self._index_file, 8*len(self),
+                      np.array([rows], dtype='<i8'))
+            info['keys'].append(key)
+            self._keys()[key] = len(info['keys']) - 1
+        info['rows'] = rows
+        self.store.flush()
+
+    def _keys(self):
+        if self._key_index is None:
+            self._key_index = dict((key, i) for i, key in
+                                   enumerate(self._info['keys']))
+        return self._key_index
+
+    def _key_to_index(self, key):
+        try:
+            return self._keys()[_json_key(key)]
+        except KeyError:
+            raise KeyError("no record %s in %s" % (key, self.name))
+
+    def _arrays(self):
+        info = self._info
+        if self._cache is None or self._cache[0] != info['rows']:
+            shape = (info['rows'],) + tuple(info['shape'])
+            data = _memmap(self._data_file, self.dtype, shape)
+            ends = None
+            if self.ragged:
+                ends = _memmap(self._index_file, np.dtype('<i8'),
+                               (len(info['keys']),))
+            self._cache = (info['rows'], data, ends)
+        return self._cache[1:]
+
+
+def _files(path, name):
+    base = os.path.join(path, name.replace('/', '_').replace('\\', '_'))
+    return base + '.bin', base + '.index'
+
+
+def _read_json(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def _descr(descr):
+    # json turns the tuples of structured descriptions into lists
+    if isinstance(descr, list):
+        return [tuple(_descr(d) if isinstance(d, list) else d for d in field)
+                for field in descr]
+    return descr
+
+
+def _json_key(key):
+    return str(key)
+
+
+def _row_size(dtype, shape):
+    return dtype.itemsize*int(np.prod(shape, dtype=np.int64))
+
+
+def _memmap(filename, dtype, shape):
+    if not np.prod(shape):
+        return np.zeros(shape, dtype)
+    return np.memmap(filename, dtype, 'r', shape=shape)
+
+
+def _write_at(filename, position, values):
+    # anything after position (from an interrupted append) is overwritten.
+    # The file is only truncated in that case, so views returned before
+    # the append (which keep the file mapped) do not block it on Windows
+    with open(filename, 'r+b') as f:
+        f.seek(position)
+        np.ascontiguousarray(values).tofile(f)
+        if f.tell() < os.fstat(f.fileno()).st_size:
+            f.truncate()
@@ -9,6 +9,7 @@ from __future__ import print_function
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 import subprocess as sp
 import os  # To check for already existing files and delete them
+import io
 import numpy as np
 import math
 import shutil  # Modules necessary for saving multiple plots
@@ -352,7 +353,7 @@ def call(airfoil, alfas=None, output='Cp', Reynolds=0, Mach=0,  # noqa C901
     ps.wait()
 
 
-def create_input(x, y_u, y_l=None,
+def create_input(x, y_u=None, y_l=None,
                  filename='test', different_x_upper_lower=False):
     """Create a plain file that XFOIL can read.
 
@@ -360,7 +361,9 @@ def create_input(x, y_u, y_l=None,
     first and then from the LE to the TE through the pressure surface.
 
     Inputs:
-        - x: list of coordinates along the chord
+        - x: list of coordinates along the chord. It can also be a
+          (n, 2) array of coordinates already in XFOIL order, which is
+          then written as is (y_u and y_l are not needed)
 
         - y_u: list of coordinates normal to the chord for the upper
           surface. If y_l is not defined it is the y vector of the whole
@@ -369,30 +372,33 @@ def create_input(x, y_u, y_l=None,
         - y_l: list of coordinates normal to the chord for the lower
           surface
 
-        - file_name: label used for the file created
+        - filename: label used for the file created. It can also be an
+          open file object (e.g. io.StringIO or a pipe) or None, in which
+          case the contents of the file are returned
 
     Created on Thu Feb 27 2014
 
     @author: Pedro Leal
     """
-    if different_x_upper_lower:
-        y = y_u
+    if y_u is None:
+        coordinates = np.asarray(x, dtype=float)
+    elif different_x_upper_lower:
+        coordinates = np.column_stack((x, y_u))
     else:
         # XFOIL likes to read the files from the TE to the LE from the
         # upper part first and then from the LE to the TE through the
-        # pressure surface
-        x_upper = x
-        x_under = np.delete(x_upper, -1)[::-1]
-        x = np.append(x_upper, x_under)
-
-        y_l = np.delete(y_l, -1)[::-1]
-        y = np.append(y_u, y_l)
-    # Creating files for xfoil processing
-    DataFile = open(filename, 'w')
-    for i in range(0, len(x)):
-        DataFile.write('     %f    %f\n' % (x[i], y[i]))
-    DataFile.close()
-
+        # pressure surface (without repeating the LE)
+        n = len(x)
+        coordinates = np.empty((2*n - 1, 2))
+        coordinates[:n, 0] = x
+        coordinates[:n, 1] = y_u
+        coordinates[n:, 0] = np.asarray(x)[-2::-1]
+        coordinates[n:, 1] = np.asarray(y_l)[-2::-1]
+    if filename is None:
+        DataFile = io.StringIO()
+        np.savetxt(DataFile, coordinates, fmt='     %f    %f')
+        return DataFile.getvalue()
+    np.savetxt(filename, coordinates, fmt='     %f    %f')
     return 0
 
 
@@ -10,6 +10,7 @@ from sklearn.metrics import pairwise_distances_argmin_min
 import aeropy.xfoil_module as xf
 from aeropy.aero_module import Reynolds
 from aeropy.geometry.airfoil import CST, create_x
+from aeropy.store import Store
 
 import scipy.io
 import numpy as np
@@ -55,14 +56,15 @@ chord = 1
 AOAs = AOAs[0]
 velocities = velocities[0]
 
-# data = {'Names':airfoil_database['names'], 'AOA':AOAs, 'V':velocities,
-#         'L/D':[], 'Expected':[]}
-f = open('aerodynamics_3.p', 'rb')
-data = pickle.load(f)
-f.close()
+# Results are appended airfoil by airfoil, so the sweep can be resumed
+data = Store('aerodynamics', schema_version=1)
+if 'L/D' not in data:
+    data.put('AOA', AOAs)
+    data.put('V', velocities)
+    data.create_dataset('L/D', float, ragged=True)
 
-for j in range(240, len(Au_database)):
-    data['L/D'].append([])
+for j in range(len(data['L/D']), len(Au_database)):
+    lift_drag_ratios = []
     print(j, airfoil_database['names'][j])
     Au = Au_database[j, :]
     Al = Al_database[j, :]
@@ -104,9 +106,9 @@ for j in range(240, len(Au_database)):
                     increment += 0.1
                 conv_counter += 1
         print(airfoil_database['names'][j], AOA, V, lift_drag_ratio)
-        data['L/D'][-1].append(lift_drag_ratio)
-        if data['L/D'][-1].count(None) > 3:
+        lift_drag_ratios.append(lift_drag_ratio)
+        if lift_drag_ratios.count(None) > 3:
             break
-    f = open('aerodynamics_4.p', 'wb')
-    pickle.dump(data,f)
-    f.close()
+    data['L/D'].append([np.nan if r is None else r
+                        for r in lift_drag_ratios],
+                       key=airfoil_database['names'][j])
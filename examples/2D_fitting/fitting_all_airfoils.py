@@ -4,65 +4,55 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pickle
 import math
-import os
 from aeropy.CST_2D import CST
 from aeropy.CST_2D.fitting import fitting_shape_coefficients, shape_parameter_study
 from aeropy.geometry.airfoil import rotate
+from aeropy.filehandling.airfoil_files import iter_airfoils
 
 f = {'names': [], 'upper': [], 'lower': [], 'Au': [], 'Al': [], 'du': [], 'dl': []}
 
 logfile = './log.txt'
 log = open(logfile, 'w')
-directory = "./airfoils/"
+# Selig and Lednicer files are read straight from the archive
 counter = 0
-for file in os.listdir(directory):
-    if file.endswith('.dat'):
-        try:
-            counter += 1
-            print(counter, file[:-4])
-            filename = os.path.join(directory, file)
-            extracted_data = False
-            n_skip = 0
-            while not extracted_data:
-                try:
-                    data = np.genfromtxt(filename, skip_header=1, skip_footer=n_skip,
-                                         encoding="latin1")
-                    extracted_data = True
-                except(ValueError):
-                    n_skip += 1
-            data = rotate({'x': data[:, 0], 'y': data[:, 1]},
-                          move_to_origin=True, both_surfaces=True)
-            data = np.array([data['x'], data['y']]).T
-            i_break = np.where(data[:, 0] == 0.)[0][0]
-            data_upper = data[0:i_break+1, :]
-            data_lower = data[i_break:, :]
+for name, airfoil in iter_airfoils('./airfoils.zip'):
+    try:
+        counter += 1
+        print(counter, name)
+        data = airfoil['coordinates']
+        data = rotate({'x': data[:, 0], 'y': data[:, 1]},
+                      move_to_origin=True, both_surfaces=True)
+        data = np.array([data['x'], data['y']]).T
+        i_break = np.where(data[:, 0] == 0.)[0][0]
+        data_upper = data[0:i_break+1, :]
+        data_lower = data[i_break:, :]
 
-            deltaz_l, Al = fitting_shape_coefficients(data_lower, n=4, surface='lower',
-                                                      solver='differential_evolution',
-                                                      objective='squared_mean',
-                                                      optimize_deltaz=True)
-            deltaz_u, Au = fitting_shape_coefficients(data_upper, n=4, surface='upper',
-                                                      solver='differential_evolution',
-                                                      objective='squared_mean',
-                                                      optimize_deltaz=True)
-            f['names'].append(file[:-4])
-            f['upper'].append(data_upper)
-            f['lower'].append(data_lower)
-            f['Au'].append(Au)
-            f['Al'].append(Al)
-            f['du'].append(deltaz_u)
-            f['dl'].append(deltaz_l)
-            y_u = CST(data_upper[:, 0], 1, deltasz=deltaz_u, Au=Au)
-            y_l = CST(data_lower[:, 0], 1, deltasz=deltaz_l, Al=Al)
-            # plt.figure()
-            # plt.scatter(data_upper[:, 0], data_upper[:, 1], label='raw_upper')
-            # plt.scatter(data_lower[:, 0], data_lower[:, 1], label='raw_lower')
-            # plt.plot(data_upper[:, 0], y_u, label='upper')
-            # plt.plot(data_lower[:, 0], y_l, label='lower')
-            # plt.legend()
-            # plt.show()
-        except:
-            log.write(file[:-4] + '\n')
+        deltaz_l, Al = fitting_shape_coefficients(data_lower, n=4, surface='lower',
+                                                  solver='differential_evolution',
+                                                  objective='squared_mean',
+                                                  optimize_deltaz=True)
+        deltaz_u, Au = fitting_shape_coefficients(data_upper, n=4, surface='upper',
+                                                  solver='differential_evolution',
+                                                  objective='squared_mean',
+                                                  optimize_deltaz=True)
+        f['names'].append(name)
+        f['upper'].append(data_upper)
+        f['lower'].append(data_lower)
+        f['Au'].append(Au)
+        f['Al'].append(Al)
+        f['du'].append(deltaz_u)
+        f['dl'].append(deltaz_l)
+        y_u = CST(data_upper[:, 0], 1, deltasz=deltaz_u, Au=Au)
+        y_l = CST(data_lower[:, 0], 1, deltasz=deltaz_l, Al=Al)
+        # plt.figure()
+        # plt.scatter(data_upper[:, 0], data_upper[:, 1], label='raw_upper')
+        # plt.scatter(data_lower[:, 0], data_lower[:, 1], label='raw_lower')
+        # plt.plot(data_upper[:, 0], y_u, label='upper')
+        # plt.plot(data_lower[:, 0], y_l, label='lower')
+        # plt.legend()
+        # plt.show()
+    except:
+        log.write(name + '\n')
 pickle.dump(f, open("fitting.p", "wb"))
 
 for i in range(5):
@@ -0,0 +1,91 @@
+"""Twist sweep of the wing-body of full_aircraft.py with a cached
+assembly: the fuselage and its interpolating functions are built once and
+only the nodes downstream of the twist are recomputed at every step."""
+import time
+import numpy as np
+
+import aeropy.CST_3D as cst
+import aeropy.CST_3D.mesh_tools as meshtools
+
+aoa = 2.3067
+# wing parameters
+span = 4.578*2.  # meters
+eta_cp = [0., 0.276004, .552007, 1.]
+taper = [1.0, 0.375317, .204817, .080035]
+chord_root = 21.43
+sweep = [0., 14.4476, 19.1612, 24.79405]
+dihedral = [0., 0.095311, 0.172374]
+eta_dihedral = [0., .552007, 1.]
+
+a_mat_upper = np.array([[0.01263563, 0.02351035, 0.01410948, 0.02870071, 0.00672103, 0.01423143],
+                        [0.01493258, 0.02318954, 0.0256106, 0.02404792, 0.0188881, 0.01735003],
+                        [0.01451941, 0.03214948, 0.03073803, 0.03342343, 0.03707097, 0.03925866],
+                        [0.01687441, 0.01973094, 0.05100545, 0.01154137, 0.05669724, 0.02297795]]).T
+
+N_chord = 20
+N_span = 10
+N_nose = 20
+N_tail = 50
+N_circ = 20
+
+model = cst.Assembly()
+
+# wing
+twist = model.parameter('twist', [0.1, -0.05, -0.1, -0.1])
+f_twist = model.node('f_twist', cst.piecewise_linear, eta_cp, twist)
+A_upper = [cst.piecewise_linear(eta_cp, a) for a in a_mat_upper]
+wing_upper = model.component('wing_upper',
+                             rotation=(0., aoa, 0.),
+                             location=(12., 0., -0.535),
+                             XYZ=(chord_root, span/2., chord_root),
+                             sx=cst.BernsteinPolynomial(5, A_upper),
+                             nx=(0.5, 1.),
+                             sy=cst.piecewise_linear(eta_cp, taper),
+                             ny=(0., 0.),
+                             xshear=cst.piecewise_linear(eta_cp, sweep),
+                             zshear=cst.piecewise_linear(eta_dihedral,
+                                                         dihedral),
+                             twist=f_twist)
+
+# fuselage
+fuse_data = np.genfromtxt('./fuselage_raw.txt', skip_header=1)
+fuse_data = fuse_data[np.argsort(fuse_data[:, 0])]
+y_section, x_LE, c, N1, N2, A0, A1, A2, A3, A4, A5, error = fuse_data.T
+length = y_section[-1]
+width = np.max(c)
+eta_f_cp = y_section/length
+A_fuse = [cst.piecewise_linear(eta_f_cp, a) for a in (A0, A1, A2, A3, A4, A5)]
+fuselage = model.component('fuselage',
+                           rotation=(-90., -90.+aoa, 0.),
+                           XYZ=(width, length, width),
+                           sx=cst.BernsteinPolynomial(5, A_fuse),
+                           nx=(cst.piecewise_linear(eta_f_cp, N1),
+                               cst.piecewise_linear(eta_f_cp, N2)),
+                           sy=cst.piecewise_linear(eta_f_cp, 1.001*c/width),
+                           ny=(0., 0.),
+                           xshear=cst.piecewise_linear(eta_f_cp, x_LE))
+
+# intersection, edges, parameter space meshes and networks
+psi_spacing_w = meshtools.cosine_spacing()(0., 1., N_chord)
+cut = model.intersection('intersection_f_wu', wing_upper, fuselage,
+                         psi_spacing_w, 0.3)
+edge_wf = model.node('edge_wf', meshtools.gen_network_edge, wing_upper, cut)
+edge_1 = meshtools.constant_eta_edge(eta_cp[1], N_chord)
+mesh_wu1 = model.node('mesh_wu1', meshtools.meshparameterspace,
+                      (N_chord, N_span), psi_spacing='cosine',
+                      eta_spacing='cosine', eta_limits=(edge_wf, edge_1))
+network_wu1 = model.network('network_wu1', wing_upper, mesh_wu1)
+edge_fu = model.node('edge_fu', meshtools.gen_network_edge, fuselage, cut,
+                     N_b=N_nose, N_t=N_tail, vertical=True)
+mesh_fu = model.node('mesh_fu', meshtools.meshparameterspace,
+                     (N_circ, N_chord+N_nose+N_tail-2), psi_spacing='cosine',
+                     eta_spacing='uniform', psi_limits=(edge_fu, None))
+network_fu = model.network('network_fu', fuselage, mesh_fu)
+
+for root_twist in np.linspace(-1., 1., 5):
+    start = time.time()
+    model.set('twist', [root_twist, -0.05, -0.1, -0.1])
+    wing_network, fuselage_network = model.evaluate('network_wu1',
+                                                    'network_fu')
+    print('root twist %+.2f: %.3f s' % (root_twist, time.time()-start))
+print('evaluations per node:', model.evaluations)
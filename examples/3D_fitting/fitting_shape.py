@@ -2,6 +2,8 @@ import aeropy.CST_3D as cst
 import aeropy.CST_3D.mesh_tools as meshtools
 from aeropy.filehandling.vtk import generate_surface
 from aeropy.geometry.fitting import fitting
+from aeropy.filehandling.point_cloud import (edge_refinement, voxel_downsample,
+                                             PointIndex)
 
 import time
 import pickle
@@ -11,24 +13,10 @@ import matplotlib.pyplot as plt
 from multiprocessing import Pool
 
 
-def x0(Nx, n_cp):
-    '''
-    inputs: [location, XYZ, sy, ny, xshear]'''
-
-    x0 = (1./(Nx+1))*np.ones((Nx+1)*n_cp + n_cp - 2)
-    x0[:n_cp-2] = np.linspace(0, 1., n_cp)[1:-1]
-    return x0
-
-
-def update(fuselage, x, Nx, n_cp):
-    eta_cp = [0] + list(x[:n_cp-2]) + [1]
-    Ax_mat = x[n_cp-2:].reshape(Nx+1, n_cp)
-    Ax = []
-    for i in range(Nx+1):
-        # Ax.append(cst.piecewise_linear(eta_cp, Ax_mat[i]))
-        Ax.append(cst.BernsteinPolynomial(len(eta_cp)-1, Ax_mat[i]))
-    f_sx = cst.BernsteinPolynomial(Nx, Ax)
-    fuselage.sx = f_sx
+def orders(Nx, n_cp):
+    """Bernstein order in psi and eta of the shape coefficients (found with
+       linear least squares)"""
+    return Nx, n_cp-1
 
 
 def calculate_points(fuselage, raw):
@@ -54,7 +42,16 @@ def generate_vtk(fuselage, Nx, n_cp, N_chord=50, N_span=100):
 
 if __name__ == "__main__":
     raw = pickle.load(open('fuselage.p', 'rb'))
-    raw = raw[::80]
+    # Index of the full cloud (built once) to check the final fit
+    try:
+        index = PointIndex.load('fuselage_index.p')
+    except IOError:
+        index = PointIndex(raw)
+        index.save('fuselage_index.p')
+    # Fixed sample for the fitting, twice as dense at the nose and tail
+    x_min, x_max = raw[:, 0].min(), raw[:, 0].max()
+    raw = voxel_downsample(raw, (x_max - x_min)/100.,
+                           edge_refinement(raw[:, 0], x_min, x_max, 2., 0.1))
     x_raw, y_raw, z_raw = raw.T
     fuselage = pickle.load(open('fuselage_object.p', 'rb'))
     Nx = 4
@@ -62,12 +59,11 @@ if __name__ == "__main__":
 
     fuselage.nx = [0.5, 0.5]
     study = fitting(object=fuselage,
-                    update=update,
+                    orders=orders,
                     p1=np.linspace(10, 25, Nx),
                     p2=np.linspace(10, 25, n_cp),
                     p1_name='Berstein order for Ay',
                     p2_name='Berstein order for Sx',
-                    x0=x0,
                     raw=raw,
                     calculate_points=calculate_points,
                     callback=generate_vtk)
@@ -84,3 +80,5 @@ if __name__ == "__main__":
     mesh_f = fuselage(psi_f, eta_f)
     network_f = np.dstack(mesh_f)
     generate_surface(network_f, "fuselage_full")
+    print('maximum distance to the raw points', max(index.distance(
+        network_f.reshape(-1, 3))))
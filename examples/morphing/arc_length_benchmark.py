@@ -0,0 +1,103 @@
+"""Compare the legacy fixed point/fsolve chord matching with the Newton based
+equal arc length solver (iterations and wall time)."""
+import time
+import warnings
+import numpy as np
+from scipy import optimize
+from scipy.integrate import quad
+from scipy.optimize import brentq, fsolve
+
+from aeropy.CST_2D import dxi_u, calculate_c_baseline
+import aeropy.morphing.twist_3D as twist_3D
+
+
+def legacy_c_baseline(c_L, Au_C, Au_L, deltaz, counter):
+    def integrand(psi, Au, delta_xi):
+        return np.sqrt(1 + dxi_u(psi, Au, delta_xi)**2)
+
+    def f(c_C):
+        counter[0] += 1
+        y_C, err = quad(integrand, 0, 1, args=(Au_C, deltaz/c_C))
+        y_L, err = quad(integrand, 0, 1, args=(Au_L, deltaz/c_L))
+        return c_L*y_L/y_C
+    return optimize.fixed_point(f, [c_L])[0]
+
+
+def legacy_A0_moving_LE(psi_spars, psi_goal_0, Au_P, Au_C, deltaz, c_P,
+                        l_LE, eps_LE, counter):
+    def integrand(psi, Au, deltaz, c):
+        return c*np.sqrt(1 + dxi_u(psi, Au, deltaz/c)**2)
+
+    def equation(A0):
+        counter[0] += 1
+        Au_C[0] = A0[0]
+        c = twist_3D.calculate_c_baseline(c_P, Au_C, Au_P, deltaz/c_P, l_LE,
+                                          eps_LE, psi_spars[0])
+        y, err = quad(integrand, 0, psi_goal_0, args=(Au_C, deltaz, c))
+        return y - (1-eps_LE)*(L_baseline - c*l_LE)
+    L_baseline, err = quad(integrand, 0, psi_spars[0],
+                           args=(Au_P, deltaz, c_P))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return fsolve(equation, Au_C[0])[0]
+
+
+def timeit(function, repeat=20):
+    start = time.time()
+    for i in range(repeat):
+        output = function()
+    return output, (time.time() - start)/repeat
+
+
+# Avian wing, order 5
+Au_P = [0.23993240191629417, 0.34468227138908186, 0.18125405377549103,
+        0.35371349126072665, 0.2440815012119143, 0.25724974995738387]
+Au_C = [0.2, 0.25, 0.25, 0.25, 0.25, 0.25]
+c_P = 1.
+deltaz = 0.01
+psi_spars = [0.1, 0.2, 0.3]
+l_LE = 0.05
+eps_LE = 0.1
+
+# ==============================================================================
+# Chord matching
+# ==============================================================================
+counter = [0]
+c_old, t_old = timeit(lambda: legacy_c_baseline(c_P, Au_C, Au_P, deltaz,
+                                                counter))
+(c_new, info), t_new = timeit(lambda: calculate_c_baseline(
+    c_P, Au_C, Au_P, deltaz, full_output=True))
+print('Chord matching')
+print('  fixed_point: c=%.12f\t evaluations=%i\t time=%.2e s' %
+      (c_old, counter[0]/20, t_old))
+print('  Newton:      c=%.12f\t iterations=%i\t time=%.2e s' %
+      (c_new, info['iterations'], t_new))
+
+# ==============================================================================
+# Moving leading edge (choose psi_goal_0 so the solution is A0 = 0.25)
+# ==============================================================================
+A0_goal = 0.25
+
+
+def bay_mismatch(psi_goal_0):
+    Au = [A0_goal] + Au_C[1:]
+    c = twist_3D.calculate_c_baseline(c_P, Au, Au_P, deltaz/c_P, l_LE, eps_LE,
+                                      psi_spars[0])
+    y = twist_3D.calculate_arc_length(0, psi_goal_0, Au, deltaz, c)
+    L = twist_3D.calculate_arc_length(0, psi_spars[0], Au_P, deltaz, c_P)
+    return y - (1-eps_LE)*(L - c*l_LE)
+
+
+psi_goal_0 = brentq(bay_mismatch, 1e-3, 0.5)
+counter = [0]
+A0_old, t_old = timeit(lambda: legacy_A0_moving_LE(
+    psi_spars, psi_goal_0, Au_P, list(Au_C), deltaz, c_P, l_LE, eps_LE,
+    counter), repeat=5)
+(A0_new, info), t_new = timeit(lambda: twist_3D.calculate_A0_moving_LE(
+    psi_spars, psi_goal_0, Au_P, Au_C, deltaz, c_P, l_LE, eps_LE,
+    full_output=True), repeat=5)
+print('Moving leading edge')
+print('  fsolve: A0=%.12f\t evaluations=%i\t time=%.2e s' %
+      (A0_old, counter[0]/5, t_old))
+print('  Newton: A0=%.12f\t iterations=%i\t time=%.2e s' %
+      (A0_new, info['iterations'], t_new))
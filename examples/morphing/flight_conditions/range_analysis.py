@@ -0,0 +1,180 @@
+import os
+import pickle
+
+import aeropy.xfoil_module as xf
+from aeropy.morphing import explore
+from aeropy.morphing.explorer import xfoil_analysis
+from aeropy.aero_module import LLT_calculator
+
+import numpy as np
+import matplotlib.pyplot as plt
+import pandas
+import scipy.integrate
+import scipy.interpolate
+
+def aircraft_range(cl, cd, velocity):
+    # velocity = 0.514444*108 # m/s (113 KTAS)
+    lift_to_drag = cl/cd
+    g = 9.81 # kg/ms
+    span = 10.9728
+    RPM = 1800
+    a = 0.3089 # (lb/hr)/BTU
+    b = 0.008*RPM+19.607 # lb/hr 
+
+    lbhr_to_kgs = 0.000125998
+    BHP_to_watt = 745.7
+
+    eta = 0.85
+
+    initial_weight = 1111
+    fuel = 56*6.01*0.4535
+    final_weight = initial_weight-fuel
+    elliptical_area = 2*np.sqrt(span/2)*3.1415/4.
+    drag = .5*velocity**2*elliptical_area*cd
+    thrust=drag
+
+    power_SI = thrust*velocity/eta
+    power_BHP = power_SI/BHP_to_watt
+    mass_flow = (a*power_BHP + b)
+    mass_flow_SI = mass_flow*lbhr_to_kgs
+
+    SFC = mass_flow_SI/thrust
+    R = velocity/g/SFC*lift_to_drag*np.log(initial_weight/final_weight)
+    return R*0.0005399
+    
+def aircraft_range_NC(cl, cd, velocity):
+    def to_integrate(weight):
+        # velocity = 0.514444*108 # m/s (113 KTAS)
+        lift_to_drag = cl/cd
+
+        span = 10.9728
+        RPM = 1800
+        a = 0.3089 # (lb/hr)/BTU
+        b = 0.008*RPM+19.607 # lb/hr 
+
+        lbhr_to_kgs = 0.000125998
+        BHP_to_watt = 745.7
+
+        eta = 0.85
+
+        thrust=weight/lift_to_drag
+
+        power_SI = thrust*velocity/eta
+        power_BHP = power_SI/BHP_to_watt
+        mass_flow = (a*power_BHP + b)
+        mass_flow_SI = mass_flow*lbhr_to_kgs
+
+        SFC = mass_flow_SI/thrust
+        dR = velocity/g/SFC*lift_to_drag/weight
+        print(power_BHP)
+        return dR*0.0005399
+    g = 9.81 # kg/ms
+    fuel = 56*6.01*0.4535*g
+    initial_weight = 1111*g
+    final_weight = initial_weight-fuel
+    return scipy.integrate.quad(to_integrate, final_weight, initial_weight)[0]
+
+
+def LLT_analysis(airfoil, chord, condition):
+    """XFOIL polar and zero lift angle for the airfoil, extended to the
+       wing via lifting line theory."""
+    Data = xfoil_analysis(airfoil, chord, condition)
+    alpha_L_0 = xf.find_alpha_L_0(airfoil, Reynolds=0, iteration=100, NACA=False)
+    coefficients = LLT_calculator(alpha_L_0, Data['CD'], N=100, b=span, taper=1.,
+                                  chord_root=chord_root,
+                                  alpha_root=condition['alpha'],
+                                  V=condition['velocity'])
+    return {'C_L': coefficients['C_L'], 'C_D': coefficients['C_D']}
+
+
+def aircraft_range_LLT(lift_to_drag, velocity):
+    def to_integrate(weight):
+        # velocity = 0.514444*108 # m/s (113 KTAS)
+
+        span = 10.9728
+        RPM = 1800
+        a = 0.3089 # (lb/hr)/BTU
+        b = 0.008*RPM+19.607 # lb/hr 
+
+        lbhr_to_kgs = 0.000125998
+        BHP_to_watt = 745.7
+
+        eta = 0.85
+
+        thrust=weight/lift_to_drag
+
+        power_SI = thrust*velocity/eta
+        power_BHP = power_SI/BHP_to_watt
+        mass_flow = (a*power_BHP + b)
+        mass_flow_SI = mass_flow*lbhr_to_kgs
+
+        SFC = mass_flow_SI/thrust
+        dR = velocity/g/SFC*lift_to_drag/weight
+        return dR*0.001 #*0.0005399
+
+    g = 9.81 # kg/ms
+    fuel = 56*6.01*0.4535*g
+    initial_weight = 1111*g
+    final_weight = initial_weight-fuel
+    return scipy.integrate.quad(to_integrate, final_weight, initial_weight)[0]
+    
+# ==============================================================================
+# Inputs
+# ==============================================================================
+altitude = 10000 # ft
+span = 11
+chord_root = span/16.2
+parent = {'Au': [0.1828, 0.1179, 0.2079, 0.0850, 0.1874],
+          'Al': [0.1828, 0.1179, 0.2079, 0.0850, 0.1874],
+          'c': 1.0, 'deltaz': 0, 'psi_spars': [0.1, 0.3, 0.6, 0.8]}
+
+
+def performance_table(filename='wing.p', grid='performance_grid.csv',
+                      workers=1):
+    """Lift and drag (LLT) of the performance grid: the candidates (first
+       four columns) at their angle of attack and velocity. They are
+       computed with explore and pickled to filename the first time, and
+       read from it afterwards. workers > 1 needs the calling script to be
+       guarded by if __name__ == '__main__' on Windows."""
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+    data = pandas.read_csv(grid)
+    conditions = [{'alpha': AOA, 'velocity': velocity, 'altitude': altitude}
+                  for AOA, velocity in data.values[:, -5:-3]]
+    table = explore(parent, data.values[:, 0:4], conditions, workers=workers,
+                    analysis=LLT_analysis, paired=True)
+    data.iloc[:, -3] = table['C_L']
+    data.iloc[:, -2] = table['C_D']
+    data.iloc[:, -1] = table['C_L']/table['C_D']
+    data = data.drop_duplicates()
+    with open(filename, 'wb') as f:
+        pickle.dump(data, f)
+    return data
+
+
+if __name__ == '__main__':
+    data = pandas.read_csv('performance_grid.csv')
+    candidates = data.values[:, 0:4]
+    conditions = [{'alpha': AOA, 'velocity': velocity, 'altitude': altitude}
+                  for AOA, velocity in data.values[:, -5:-3]]
+    table = explore(parent, candidates, conditions, workers=4,
+                    analysis=LLT_analysis, paired=True)
+    ranges = [aircraft_range_LLT(CL/CD, velocity) for CL, CD, velocity in
+              zip(table['C_L'], table['C_D'], table['velocity'])]
+    data['Range'] = ranges
+
+    x = data['AOA']
+    y = data['V']
+    z = data['Range']
+    N = 100
+    xi = np.linspace(x.min(), x.max(), N)
+    yi = np.linspace(y.min(), y.max(), N)
+    zi = scipy.interpolate.griddata((x, y), z, (xi[None,:], yi[:,None]), method='cubic')
+
+    fig = plt.figure()
+    plt.contourf(xi, yi, zi)
+    plt.xlabel("Angle of attack ($^{\circ}$)")
+    plt.ylabel("Velocity (m/s)")
+    plt.colorbar(label='Range (km)')
+    plt.show()
@@ -1,55 +1,11 @@
-import aeropy.xfoil_module as xf
-from aeropy.geometry.airfoil import CST, create_x
-from aeropy.morphing.camber_2D import *
-from aeropy.aero_module import air_properties, Reynolds, LLT_calculator
+from aeropy.aero_module import air_properties
+from range_analysis import performance_table
 
 import numpy as np
 import matplotlib.pyplot as plt
-import pandas
-from sklearn.cluster import KMeans
-from sklearn.metrics import pairwise_distances_argmin_min
-import scipy
-
-
-def coefficient_LLT(AC, velocity, AOA):
-    Au_P = [0.1828, 0.1179, 0.2079, 0.0850, 0.1874]
-    Al_P = Au_P
-    deltaz = 0
-
-    # Determine children shape coeffcients
-    AC_u = list(data.values[i, 0:4])
-    Au_C, Al_C, c_C, spar_thicknesses = calculate_dependent_shape_coefficients(
-        AC_u,
-        psi_spars, Au_P, Al_P,
-        deltaz, c_P, morphing=morphing_direction)
-
-    # Calculate aerodynamics for that airfoil
-    airfoil = 'optimal'
-    x = create_x(1., distribution='linear')
-    y = CST(x, 1., [deltaz/2., deltaz/2.], Al=Al_C, Au=Au_C)
-    # Create file for Xfoil to read coordinates
-    xf.create_input(x, y['u'], y['l'], airfoil, different_x_upper_lower=False)
-    Data = xf.find_coefficients(airfoil, AOA, Reynolds=Reynolds(
-        10000, velocity, c_C), iteration=100, NACA=False)
-    deviation = 0.001
-    while Data['CL'] is None:
-        Data_aft = xf.find_coefficients(
-            airfoil, AOA*deviation, Reynolds=Reynolds(10000, velocity, c_C), iteration=100, NACA=False)
-        Data_fwd = xf.find_coefficients(
-            airfoil, AOA*(1-deviation), Reynolds=Reynolds(10000, velocity, c_C), iteration=100, NACA=False)
-        try:
-            for key in Data:
-                Data[key] = (Data_aft[key] + Data_fwd[key])/2.
-        except:
-            deviation += deviation
-    alpha_L_0 = xf.find_alpha_L_0(airfoil, Reynolds=0, iteration=100, NACA=False)
-
-    coefficients = LLT_calculator(alpha_L_0, Data['CD'], N=100, b=span, taper=1.,
-                                  chord_root=chord_root, alpha_root=AOA, V=velocity)
-    lift = coefficients['C_L']
-    drag = coefficients['C_D']
-
-    return lift, drag
+import scipy.integrate
+import scipy.interpolate
+import scipy.optimize
 
 
 def aircraft_range_varying_AOA(f_L, f_LD, velocity):
@@ -104,33 +60,7 @@ altitude = 10000  # ft
 air_props = air_properties(altitude, unit='feet')
 density = air_props['Density']
 
-# data = pandas.read_csv('performance_grid.csv')
-# psi_spars = [0.1, 0.3, 0.6, 0.8]
-# c_P = 1.0
-
-# ranges = []
-
-# for i in range(len(data.values)):
-# AC = data.values[i,0:4]
-# velocity = data.values[i,-4]
-# AOA = data.values[i,-5]
-# cl= data.values[i,-3]
-# cd = data.values[i,-2]
-# CL, CD = coefficient_LLT(AC, velocity, AOA)
-# data.values[i, -3] = CL
-# data.values[i, -2] = CD
-# data.values[i, -1] = CL/CD
-# print(i, CL, CD)
-# data = data.drop_duplicates()
-
-import pickle
-# f = open('wing.p', 'wb')
-# pickle.dump(data, f)
-# f.close()
-
-f = open('wing.p', 'rb')
-data = pickle.load(f)
-f.close()
+data = performance_table()
 
 # print(data)
 # def f_LD(AOA, velocity):
@@ -0,0 +1,99 @@
+"""Leading and trailing edges of airfoil sections (geometry.airfoil)."""
+import math
+import numpy as np
+
+from aeropy.geometry.airfoil import (find_edges, find_edges_sections,
+                                     normalize_sections, rotate)
+
+
+def loop_find_edges(x, y, both_surfaces=False):
+    """Previous find_edges: point by point search of the leading edge."""
+    x = list(x)
+    y = list(y)
+    if both_surfaces:
+        TE_x = (x[0]+x[-1])/2
+        TE_y = (y[0]+y[-1])/2
+    else:
+        TE_x = max(x)
+        TE_index = x.index(TE_x)
+        TE_y = y[TE_index]
+    chord = 0
+    LE_index = 0
+    for i in range(len(x)):
+        distance = math.sqrt((x[i]-TE_x)**2+(y[i]-TE_y)**2)
+        if distance > chord:
+            LE_index = i
+            chord = distance
+    theta = math.atan2(TE_y - y[LE_index], TE_x - x[LE_index])
+    return ({'x': x[LE_index], 'y': y[LE_index]}, {'x': TE_x, 'y': TE_y},
+            theta, chord)
+
+
+def loop_rotate(coordinates, origin, theta, chord, move_to_origin=True):
+    """Previous rotate of one surface: point by point transformation."""
+    T = [[np.cos(theta), np.sin(theta)],
+         [-np.sin(theta), np.cos(theta)]]
+    rotated = {'x': [], 'y': []}
+    for i in range(len(coordinates['x'])):
+        cx = coordinates['x'][i] - origin['x']
+        cy = coordinates['y'][i] - origin['y']
+        rot_x = (T[0][0]*cx + T[0][1]*cy)/chord
+        rot_y = (T[1][0]*cx + T[1][1]*cy)/chord
+        if not move_to_origin:
+            rot_x += origin['x']
+            rot_y += origin['y']
+        rotated['x'].append(rot_x)
+        rotated['y'].append(rot_y)
+    return rotated
+
+
+def sections(n_sections=6, seed=0):
+    """Rotated and scaled airfoils with different numbers of points."""
+    rng = np.random.default_rng(seed)
+    x, y, offsets = [], [], []
+    for k in range(n_sections):
+        n = rng.integers(20, 60)
+        psi = 0.5*(1. - np.cos(np.linspace(0., 2.*np.pi, n)))
+        z = 0.06*np.sin(np.pi*psi)*np.sign(np.linspace(1., -1., n))
+        angle = rng.uniform(-0.3, 0.3)
+        scale = rng.uniform(0.5, 2.)
+        offsets.append(len(x))
+        x.extend(scale*(np.cos(angle)*psi - np.sin(angle)*z) + k)
+        y.extend(scale*(np.sin(angle)*psi + np.cos(angle)*z))
+    return np.array(x), np.array(y), np.array(offsets)
+
+
+def test_sections_agree_with_point_by_point_search():
+    x, y, offsets = sections()
+    ends = list(offsets[1:]) + [len(x)]
+    for both_surfaces in (False, True):
+        LE, TE, theta, chord = find_edges_sections(x, y, offsets,
+                                                   both_surfaces)
+        rot_x, rot_y = normalize_sections(x, y, offsets, LE, theta, chord)
+        for i, (start, end) in enumerate(zip(offsets, ends)):
+            LE_i, TE_i, theta_i, chord_i = loop_find_edges(
+                x[start:end], y[start:end], both_surfaces)
+            assert list(LE[i]) == [LE_i['x'], LE_i['y']]
+            assert np.allclose(TE[i], [TE_i['x'], TE_i['y']], rtol=0,
+                               atol=1e-15)
+            assert abs(theta[i] - theta_i) < 1e-14
+            assert abs(chord[i] - chord_i) < 1e-14
+            expected = loop_rotate({'x': x[start:end], 'y': y[start:end]},
+                                   LE_i, theta_i, chord_i)
+            assert np.allclose(rot_x[start:end], expected['x'], rtol=0,
+                               atol=1e-14)
+            assert np.allclose(rot_y[start:end], expected['y'], rtol=0,
+                               atol=1e-14)
+
+
+def test_single_section_outputs():
+    x, y, offsets = sections(1)
+    LE, TE, theta, chord = find_edges(x, y)
+    expected = loop_find_edges(x, y)
+    assert LE == expected[0] and TE == expected[1]
+    assert type(theta) is float and type(chord) is float
+    upper = {'x': list(x), 'y': list(y)}
+    rotated = rotate(upper, move_to_origin=False)
+    old = loop_rotate(upper, LE, theta, chord, move_to_origin=False)
+    assert np.allclose(rotated['x'], old['x'], rtol=0, atol=1e-14)
+    assert np.allclose(rotated['y'], old['y'], rtol=0, atol=1e-14)
@@ -0,0 +1,80 @@
+"""Readers of airfoil coordinate files (aeropy.filehandling.airfoil_files)."""
+import zipfile
+import numpy as np
+
+from aeropy.filehandling.airfoil_files import (iter_airfoils, parse_airfoil,
+                                               read_airfoil)
+
+SELIG = """NACA 0012 (approx.)
+ 1.0  0.0
+ 0.5  0.06
+ 0.0  0.0
+ 0.5 -0.06
+ 1.0  0.0
+"""
+
+LEDNICER = """NACA 0012 lednicer
+
+       3.       3.
+
+ 0.0  0.0
+ 0.5  0.06
+ 1.0  0.0
+
+ 0.0  0.0
+ 0.5 -0.06
+ 1.0  0.0
+"""
+
+
+def test_selig():
+    airfoil = parse_airfoil(SELIG, 'naca0012')
+    assert airfoil['format'] == 'selig'
+    assert airfoil['title'] == 'NACA 0012 (approx.)'
+    assert airfoil['coordinates'].shape == (5, 2)
+    assert np.array_equal(airfoil['upper'], [[0., 0.], [.5, .06], [1., 0.]])
+    assert np.array_equal(airfoil['lower'], [[0., 0.], [.5, -.06], [1., 0.]])
+
+
+def test_lednicer():
+    airfoil = parse_airfoil(LEDNICER)
+    selig = parse_airfoil(SELIG)
+    assert airfoil['format'] == 'lednicer'
+    assert np.array_equal(airfoil['coordinates'], selig['coordinates'])
+    assert np.array_equal(airfoil['upper'], selig['upper'])
+    assert np.array_equal(airfoil['lower'], selig['lower'])
+
+
+def test_several_airfoils_in_one_file():
+    # Regression: the points of both airfoils were returned as one
+    # polyline (e.g. s1221.dat, with and without flap)
+    text = ("S1221  w/o flap\n" + SELIG.split('\n', 1)[1] +
+            "\n\nS1221  w/ 4 deg flap\n 1.0 -0.01\n 0.0 0.0\n 1.0 -0.02\n")
+    airfoil = parse_airfoil(text)
+    assert airfoil['coordinates'].shape == (5, 2)
+    assert np.array_equal(airfoil['coordinates'],
+                          parse_airfoil(SELIG)['coordinates'])
+
+
+def test_title_lines_and_trailing_text():
+    text = "Ornithopter airfoil.\nS1020\n" + SELIG.split('\n', 1)[1] + \
+        "\nCoordinates from the UIUC database\n"
+    assert parse_airfoil(text)['coordinates'].shape == (5, 2)
+
+
+def test_folder_and_zip(tmp_path):
+    (tmp_path/'a.dat').write_text(SELIG)
+    (tmp_path/'b.dat').write_text(LEDNICER)
+    (tmp_path/'c.dat').write_text('no coordinates\n')
+    (tmp_path/'notes.txt').write_text(SELIG)
+    archive = str(tmp_path/'airfoils.zip')
+    with zipfile.ZipFile(archive, 'w') as f:
+        for name in ('a.dat', 'b.dat', 'c.dat', 'notes.txt'):
+            f.write(str(tmp_path/name), 'airfoils/' + name)
+
+    for source in (str(tmp_path), archive):
+        airfoils = dict(iter_airfoils(source))
+        assert sorted(airfoils) == ['a', 'b']
+        assert np.array_equal(airfoils['a']['coordinates'],
+                              airfoils['b']['coordinates'])
+    assert read_airfoil(str(tmp_path/'a.dat'))['name'] == 'a'
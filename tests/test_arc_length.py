@@ -0,0 +1,94 @@
+"""Equal arc length solvers and arc length based strains of CST_2D."""
+import numpy as np
+import pytest
+from scipy import optimize
+from scipy.integrate import quad
+
+from aeropy.CST_2D import core
+from aeropy.morphing.camber_2D import calculate_dependent_shape_coefficients
+
+Au_L = [0.1828, 0.1179, 0.2079, 0.0850, 0.1874]
+Au_C = [0.2168, 0.1242, 0.1957, 0.0936, 0.1512]
+
+
+def fixed_point_c_baseline(c_L, Au_C, Au_L, deltaz):
+    """Previous implementation: fixed point iterations on adaptive
+       quadratures."""
+    def integrand(psi, Au, delta_xi):
+        return np.sqrt(1 + core.dxi_u(psi, Au, delta_xi)**2)
+
+    def f(c_C):
+        y_C, err = quad(integrand, 0, 1, args=(Au_C, deltaz/c_C))
+        y_L, err = quad(integrand, 0, 1, args=(Au_L, deltaz/c_L))
+        return c_L*y_L/y_C
+    return optimize.fixed_point(f, [c_L])[0]
+
+
+def test_same_shape_returns_the_chord():
+    for deltaz in (0., 0.01):
+        c_C, info = core.calculate_c_baseline(0.7, Au_L, Au_L, deltaz,
+                                              full_output=True)
+        assert c_C == 0.7
+        assert info['converged']
+
+
+def test_agrees_with_fixed_point_solution():
+    for deltaz in (0., 0.01):
+        expected = fixed_point_c_baseline(1., Au_C, Au_L, deltaz)
+        c_C, info = core.calculate_c_baseline(1., Au_C, Au_L, deltaz,
+                                              full_output=True)
+        assert info['converged']
+        assert abs(c_C - expected) < 1e-8
+        assert abs(core.calculate_c_baseline_vectorized(
+            1., Au_C, Au_L, deltaz)[0] - c_C) < 1e-12
+
+
+def spar_by_spar_strains(Au_P, Al_P, c_P, Au_C, Al_C, c_C, deltaz, psi_spars,
+                         spar_thicknesses):
+    """Previous calculate_strains: one root solve and adaptive quadrature
+       per spar and segment."""
+    psi_flats = []
+    for j in range(len(psi_spars)):
+        psi_children_j = core.calculate_psi_goal(psi_spars[j], Au_P, Au_C,
+                                                 deltaz, c_P, c_C)
+        s = core.calculate_spar_direction(psi_spars[j], Au_P, Au_C, deltaz,
+                                          c_C)
+        psi_flats.append(psi_children_j*c_C - spar_thicknesses[j]*s[0])
+    psi_list = [0.] + psi_spars + [c_P]
+    initial = [core.calculate_arc_length(psi_list[i], psi_list[i+1], Al_P,
+                                         deltaz, c_P)
+               for i in range(len(psi_list)-1)]
+    psi_list = [0.] + psi_flats + [c_C]
+    final = [core.calculate_arc_length(psi_list[i]*c_P/c_C,
+                                       psi_list[i+1]*c_P/c_C, Al_C, deltaz,
+                                       c_C)
+             for i in range(len(psi_list)-1)]
+    strains = [(f - i)/i for f, i in zip(final, initial)]
+    return strains, (sum(final) - sum(initial))/sum(initial)
+
+
+def test_strains_agree_with_spar_by_spar_solution():
+    psi_spars = [0.1, 0.3, 0.6, 0.8]
+    for deltaz in (0., 0.002):
+        children = [calculate_dependent_shape_coefficients(
+            AC, psi_spars, Au_L, Au_L, deltaz, 1., morphing='forwards')
+            for AC in ([0.19, 0.12, 0.20, 0.09], [0.16, 0.11, 0.22, 0.07])]
+        Au_C, Al_C, c_C, thicknesses = [list(x) for x in zip(*children)]
+        strains, av_strain = core.calculate_strains_vectorized(
+            Au_L, Au_L, 1., Au_C, Al_C, c_C, deltaz, psi_spars, thicknesses)
+        for i in range(len(children)):
+            expected = spar_by_spar_strains(Au_L, Au_L, 1., Au_C[i], Al_C[i],
+                                            c_C[i], deltaz, psi_spars,
+                                            thicknesses[i])
+            assert np.allclose(strains[i], expected[0], rtol=0, atol=1e-8)
+            assert abs(av_strain[i] - expected[1]) < 1e-10
+
+
+def test_inverse_arc_length_warns_without_convergence():
+    table = core._arc_length_table([Au_C], 0., 1.)
+    L_goal = np.array([[0.3, 0.8]])
+    psi = core._inverse_arc_length_table(table, L_goal)
+    assert np.allclose(core._evaluate_arc_length_table(table, psi), L_goal,
+                       rtol=0, atol=1e-12)
+    with pytest.warns(UserWarning):
+        core._inverse_arc_length_table(table, L_goal, tol=0.)
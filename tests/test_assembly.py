@@ -0,0 +1,72 @@
+"""Cached assembly of CST3D components (CST_3D.Assembly)."""
+import numpy as np
+import pytest
+
+import aeropy.CST_3D as cst
+import aeropy.CST_3D.mesh_tools as meshtools
+
+eta_cp = [0., 1.]
+psi_w = np.linspace(0.05, 0.95, 8)
+wing_params = dict(location=(1.5, 0., 0.), XYZ=(1.5, 1., .2),
+                   sx=cst.BernsteinPolynomial(5, [0.172802, 0.167353,
+                                                  0.130747, 0.172053,
+                                                  0.112797, 0.168891]),
+                   nx=(1., 1.), sy=cst.piecewise_linear(eta_cp, [1., .3]),
+                   ny=(0., 0.),
+                   xshear=cst.piecewise_linear(eta_cp, [0., 1.5]))
+fuselage_params = dict(rotation=(0., -90., -90.), XYZ=(.4, 4., .2),
+                       nx=(.5, .5), ref=(0.5, 0., 0.), ny=(1., 1.))
+
+
+def direct_mesh(twist):
+    """The same mesh built step by step, without the assembly."""
+    wing = cst.CST3D(twist=cst.piecewise_linear(eta_cp, twist),
+                     **wing_params)
+    fuselage = cst.CST3D(**fuselage_params)
+    cut = cst.intersection(wing, fuselage, psi_w, 0.3)
+    psi, eta = meshtools.meshparameterspace((8, 6), psi_spacing='cosine')
+    return cut, wing.points(psi, eta), fuselage.points(psi, eta)
+
+
+def assembly(twist):
+    model = cst.Assembly()
+    twist = model.parameter('twist', twist)
+    f_twist = model.node('f_twist', cst.piecewise_linear, eta_cp, twist)
+    wing = model.component('wing', twist=f_twist, **wing_params)
+    fuselage = model.component('fuselage', **fuselage_params)
+    model.intersection('cut', wing, fuselage, psi_w, 0.3)
+    mesh = model.node('mesh', meshtools.meshparameterspace, (8, 6),
+                      psi_spacing='cosine')
+    model.network('network_w', wing, mesh)
+    model.network('network_f', fuselage, mesh)
+    return model
+
+
+def test_assembly_agrees_with_direct_construction():
+    model = assembly([0., 0.])
+    for twist in ([0., 0.], [2., -1.]):
+        model.set('twist', twist)
+        cut, network_w, network_f = direct_mesh(twist)
+        for a, b in zip(model['cut'], cut):
+            assert np.array_equal(a, b)
+        assert np.array_equal(model['network_w'], network_w)
+        assert np.array_equal(model['network_f'], network_f)
+
+
+def test_only_dependent_nodes_are_recomputed():
+    model = assembly([0., 0.])
+    model.evaluate('cut', 'network_w', 'network_f')
+    fuselage = model['fuselage']
+    model.set('twist', [0., 0.])
+    assert model.is_cached('cut')
+    model.set('twist', [1., 0.])
+    assert model.dependents('twist') == {'f_twist', 'wing', 'cut',
+                                         'network_w'}
+    assert model.is_cached('network_f') and not model.is_cached('cut')
+    model.evaluate('cut', 'network_w', 'network_f')
+    assert model['fuselage'] is fuselage
+    assert model.evaluations == {'f_twist': 2, 'wing': 2, 'fuselage': 1,
+                                 'cut': 2, 'mesh': 1, 'network_w': 2,
+                                 'network_f': 1}
+    with pytest.raises(KeyError):
+        model.set('wing', None)
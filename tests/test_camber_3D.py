@@ -0,0 +1,61 @@
+"""3-D camber morphing solver (morphing.camber_3D)."""
+import numpy as np
+import pytest
+
+from aeropy.morphing import camber_2D, camber_3D
+
+# Two stations at eta = 0 and 1 with a first order Bernstein polynomial in
+# eta: each station is exactly one column of the shape coefficients
+BP_p = np.array([[0.1828, 0.1179, 0.2079, 0.0850, 0.1874],
+                 [0.17, 0.12, 0.19, 0.09, 0.16]]).T
+BA_p = BP_p.copy()
+BP_c = np.array([[0.1828, 0.19, 0.12, 0.20, 0.09],
+                 [0.17, 0.15, 0.13, 0.20, 0.08]]).T
+psi_spars = [0.1, 0.3, 0.6, 0.8]
+# linear chord from 0.8 (eta = 0) to 1 and constant trailing edge thickness
+chord_p = {'eta': [0., 1.], 'initial': 0.8, 'final': 1., 'A': [0.],
+           'N1': 1., 'N2': 1.}
+delta_TE_p = {'eta': [0., 1.], 'initial': 0.002, 'final': 0.002, 'A': [0.],
+              'N1': 1., 'N2': 1.}
+
+
+def children():
+    return [list(row) for row in BP_c]
+
+
+def test_stations_agree_with_2D_solution():
+    BP_c = children()
+    BA_c, chord_c, info = camber_3D.calculate_dependent_shape_coefficients(
+        BP_p, BA_p, BP_c, chord_p, delta_TE_p, [0., 1.], psi_spars,
+        full_output=True)
+    assert info['converged']
+    for l, c_P in enumerate([0.8, 1.]):
+        Au_C, Al_C, c_C, thicknesses = \
+            camber_2D.calculate_dependent_shape_coefficients(
+                [row[l] for row in BP_c[1:]], psi_spars, list(BP_p[:, l]),
+                list(BA_p[:, l]), 0.002, c_P, morphing='forwards')
+        assert abs(chord_c[l] - c_C) < 1e-10
+        assert abs(BP_c[0][l] - Au_C[0]) < 1e-10
+        assert np.allclose(BA_c[:, l], Al_C, rtol=0, atol=1e-8)
+
+
+def test_candidates_in_parallel():
+    candidates = [children(), [[0.9*a for a in row] for row in children()]]
+    serial = camber_3D.calculate_candidates(
+        BP_p, BA_p, candidates, chord_p, delta_TE_p, [0., 1.], psi_spars)
+    parallel = camber_3D.calculate_candidates(
+        BP_p, BA_p, candidates, chord_p, delta_TE_p, [0., 1.], psi_spars,
+        workers=2)
+    for a, b in zip(serial, parallel):
+        assert np.array_equal(a[0], b[0])
+        assert np.array_equal(a[1], b[1])
+        assert a[2] == b[2]
+
+
+def test_leading_edge_iterations_are_bounded():
+    with pytest.warns(UserWarning):
+        info = camber_3D.calculate_dependent_shape_coefficients(
+            BP_p, BA_p, children(), chord_p, delta_TE_p, [0., 1.], psi_spars,
+            maxiter=1, full_output=True)[2]
+    assert not info['converged']
+    assert info['iterations'] == 1
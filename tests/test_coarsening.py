@@ -0,0 +1,50 @@
+"""Coarsening of polylines (aeropy.CST_3D.coarsening)."""
+import numpy as np
+
+from aeropy.CST_3D.coarsening import (ramer_douglas_peucker,
+                                      visvalingam_whyatt)
+
+
+def deviation(x, y, kept):
+    """Largest distance of the points to their segment of the coarse
+       polyline."""
+    segment = np.clip(np.searchsorted(kept, np.arange(len(x)), 'right') - 1,
+                      0, len(kept) - 2)
+    x0, y0 = x[kept[segment]], y[kept[segment]]
+    dx, dy = x[kept[segment + 1]] - x0, y[kept[segment + 1]] - y0
+    return np.max(np.abs(dx*(y - y0) - dy*(x - x0))/np.hypot(dx, dy))
+
+
+def test_rdp_removed_points_within_tol():
+    x = np.linspace(0., 1., 10001)
+    y = x**3
+    kept = ramer_douglas_peucker(x, y, 1e-4)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert deviation(x, y, kept) <= 1e-4
+
+
+def test_vw_large_smooth_curve():
+    # Regression: removing only local minima of the significance took one
+    # pass per point on smooth profiles (O(n^2), 42 s for 1e5 points)
+    x = np.linspace(0., 1., 200001)
+    y = x**3
+    kept = visvalingam_whyatt(x, y, 1e-4)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert len(kept) == 80
+    assert deviation(x, y, kept) < 5e-4
+
+
+def test_vw_max_length():
+    x = np.linspace(0., 1., 10001)
+    y = np.zeros_like(x)
+    kept = visvalingam_whyatt(x, y, 1e-4, max_length=0.01)
+    assert np.max(np.diff(x[kept])) <= 0.01
+    assert len(kept) < 300
+
+
+def test_short_polylines():
+    for n in (0, 1, 2):
+        x = np.arange(n, dtype=float)
+        assert len(visvalingam_whyatt(x, x, 1.)) == n
+        assert len(ramer_douglas_peucker(x, x, 1.)) == n
@@ -0,0 +1,94 @@
+"""Projection of points on CST3D surfaces (CST3D.inverse)."""
+import warnings
+import numpy as np
+from scipy.spatial import cKDTree
+
+import aeropy.CST_3D as cst
+
+eta_cp = [0., 0.276004, .552007, 1.]
+A = np.array([[0.0126, 0.0235, 0.0141, 0.0287, 0.0067, 0.0142],
+              [0.0149, 0.0232, 0.0256, 0.0240, 0.0189, 0.0174],
+              [0.0145, 0.0321, 0.0307, 0.0334, 0.0371, 0.0393],
+              [0.0169, 0.0197, 0.0510, 0.0115, 0.0567, 0.0230]]).T
+
+
+def wing():
+    return cst.CST3D(rotation=(0., 2.3, 0.), location=(12., 0., -0.5),
+                     XYZ=(21.43, 4.578, 21.43),
+                     sx=cst.BernsteinPolynomial(
+                         5, [cst.piecewise_linear(eta_cp, a) for a in A]),
+                     nx=(0.5, 1.),
+                     sy=cst.piecewise_linear(eta_cp, [1., .375, .205, .08]),
+                     ny=(0., 0.),
+                     xshear=cst.piecewise_linear(eta_cp,
+                                                 [0., 14.45, 19.16, 24.79]),
+                     twist=cst.piecewise_linear(eta_cp, [.1, -.05, -.1, -.1]))
+
+
+def test_points_on_surface_are_recovered():
+    surface = wing()
+    rng = np.random.default_rng(0)
+    psi, eta = rng.uniform(0., 1., (2, 500))
+    psi[:20] = 0.
+    eta[20:40] = 1.
+    psi_i, eta_i = surface.inverse(*surface.points(psi, eta).T)
+    assert np.allclose(psi_i, psi, atol=1e-9)
+    assert np.allclose(eta_i, eta, atol=1e-9)
+
+
+def test_points_outside_the_domain_stop_on_the_bounds():
+    surface = wing()
+    psi = np.linspace(0.1, 0.9, 9)
+    # beyond the root (eta < 0) along -y
+    root = surface.points(psi, 0.) - np.array([0., 0.5, 0.])
+    psi_i, eta_i, info = surface.inverse(*root.T, full_output=True)
+    assert info['converged'].all()
+    assert np.allclose(eta_i, 0.)
+    assert np.allclose(psi_i, psi, atol=1e-6)
+
+
+def test_noisy_points_are_not_worse_than_a_dense_grid():
+    # Regression: clipped Gauss-Newton steps stopped points on the bounds
+    # far from the closest point of the surface
+    surface = wing()
+    rng = np.random.default_rng(1)
+    psi, eta = rng.uniform(-0.1, 1.1, (2, 2000))
+    raw = surface.points(np.clip(psi, 0., 1.), np.clip(eta, 0., 1.))
+    raw += 0.3*rng.standard_normal(raw.shape)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        psi_i, eta_i, info = surface.inverse(*raw.T, full_output=True)
+    distance = np.linalg.norm(surface.points(psi_i, eta_i) - raw, axis=1)
+    assert np.allclose(distance, info['distance'])
+
+    grid = np.linspace(0., 1., 300)
+    P, E = np.meshgrid(0.5*(1. - np.cos(np.pi*grid)), grid)
+    nearest = cKDTree(surface.points(P.ravel(), E.ravel())).query(raw)[0]
+    # other local minima near the leading edge are within the noise
+    assert np.max(distance - nearest) < 0.02
+    assert np.mean(distance > nearest + 1e-9) < 0.01
+
+
+def test_non_finite_points():
+    surface = wing()
+    psi, eta = surface.inverse(np.array([np.nan, 20.]), np.array([0., 1.]),
+                               np.array([0., 0.]))
+    assert np.isnan(psi[0]) and np.isnan(eta[0])
+    assert np.isfinite(psi[1]) and np.isfinite(eta[1])
+
+
+def test_refitted_coefficients_rebuild_the_tree():
+    surface = wing()
+    tree = surface._inverse_tree()[2]
+    # coefficients changed in place, as done by the fitting routines
+    surface.sx.set_coefficients([cst.piecewise_linear(eta_cp, 5.*a)
+                                 for a in A])
+    psi_grid, eta_grid, new_tree = surface._inverse_tree()
+    assert new_tree is not tree
+    assert np.allclose(new_tree.data, surface.points(psi_grid, eta_grid))
+
+    rng = np.random.default_rng(1)
+    psi, eta = rng.uniform(0., 1., (2, 200))
+    psi_i, eta_i = surface.inverse(*surface.points(psi, eta).T)
+    assert np.allclose(psi_i, psi, atol=1e-9)
+    assert np.allclose(eta_i, eta, atol=1e-9)
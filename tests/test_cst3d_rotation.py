@@ -0,0 +1,37 @@
+"""Cached rotation matrices of CST3D against the quaternion products."""
+import numpy as np
+
+import aeropy.CST_3D as cst
+from aeropy.CST_3D.core import (Body2Fixed, Euler2Quat, Fixed2Body,
+                                NormalizeQuaternion)
+
+rotations = [(0., 0., 0.), (0., -90., -90.), (12., 2.3, -41.), (90., 45., 0.)]
+
+
+def test_matrices_match_quaternion_products():
+    rng = np.random.default_rng(0)
+    x, y, z = rng.uniform(-2., 2., (3, 100))
+    for rotation in rotations:
+        surface = cst.CST3D(rotation=rotation, location=(1., -2., 0.5))
+        q = NormalizeQuaternion(Euler2Quat(rotation))
+        expected = np.array(Body2Fixed((x, y, z), q)) + \
+            np.array(surface.location)[:, None]
+        assert np.allclose(surface._local_to_global(x, y, z), expected,
+                           rtol=0, atol=1e-14)
+        expected = Fixed2Body((x - 1., y + 2., z - 0.5), q)
+        assert np.allclose(surface._global_to_local(x, y, z), expected,
+                           rtol=0, atol=1e-14)
+
+
+def test_cache_follows_the_rotation():
+    surface = cst.CST3D(rotation=rotations[1])
+    R = surface._rotation_matrices()[0]
+    assert surface._rotation_matrices()[0] is R
+    surface.rotation = rotations[2]
+    R = surface._rotation_matrices()[0]
+    q = NormalizeQuaternion(Euler2Quat(rotations[2]))
+    assert np.allclose(R.dot([1., 2., 3.]), Body2Fixed((1., 2., 3.), q))
+    # a single entry, replaced when the rotation changes
+    assert surface._rotation_cache[0] == tuple(rotations[2])
+    # scalar points keep scalar coordinates
+    assert np.ndim(surface._local_to_global(1., 2., 3.)[0]) == 0
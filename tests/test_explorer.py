@@ -0,0 +1,79 @@
+"""Design-space exploration of morphing airfoils (morphing.explore)."""
+import numpy as np
+import pytest
+
+from aeropy.morphing import explore, clear_cache
+
+parent = {'Au': [0.1828, 0.1179, 0.2079, 0.0850, 0.1874],
+          'Al': [0.1828, 0.1179, 0.2079, 0.0850, 0.1874],
+          'c': 1.0, 'deltaz': 0, 'psi_spars': [0.1, 0.3, 0.6, 0.8]}
+candidates = [[0.19, 0.12, 0.20, 0.09], [0.18, 0.12, 0.21, 0.08]]
+conditions = [{'alpha': 2., 'velocity': 30.}, {'alpha': 4., 'velocity': 30.}]
+calls = []
+
+
+def analysis(airfoil, chord, condition):
+    """Replaces XFOIL: reads the input file written by explore."""
+    calls.append(airfoil)
+    points = np.loadtxt(airfoil)
+    return {'CL': 0.1*condition['alpha']*chord, 'points': len(points),
+            'status': 'converged'}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clear_cache()
+    del calls[:]
+
+
+def test_every_candidate_at_every_condition(tmp_path):
+    table = explore(parent, candidates, conditions, analysis=analysis,
+                    filename='table.csv')
+    assert list(table['candidate']) == [0, 0, 1, 1]
+    assert list(table['alpha']) == [2., 4., 2., 4.]
+    assert np.allclose(table['CL'], 0.1*table['alpha']*table['chord'])
+    assert list(table['status']) == 4*['converged']
+    assert len(calls) == 4
+    # the input files are removed
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['table.csv']
+
+    with open('table.csv') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == ('candidate,chord,AC_u1,AC_u2,AC_u3,AC_u4,alpha,'
+                        'velocity,CL,points,status')
+    assert len(lines) == 5
+    assert lines[1].endswith(',converged')
+
+
+def test_results_are_memoized():
+    explore(parent, candidates, conditions, analysis=analysis)
+    table = explore(parent, candidates[::-1] + candidates, conditions[:1],
+                    analysis=analysis, paired=False)
+    assert len(calls) == 4
+    assert list(table['AC_u1']) == [0.18, 0.19, 0.19, 0.18]
+    clear_cache()
+    explore(parent, candidates, conditions[:1], analysis=analysis)
+    assert len(calls) == 6
+
+
+def test_paired_and_parallel():
+    table = explore(parent, candidates, conditions, analysis=analysis,
+                    paired=True)
+    assert list(table['alpha']) == [2., 4.]
+    clear_cache()
+    parallel = explore(parent, candidates, conditions, analysis=analysis,
+                       paired=True, workers=2)
+    for name in table:
+        assert np.array_equal(table[name], parallel[name])
+    with pytest.raises(ValueError):
+        explore(parent, candidates, conditions[:1], analysis=analysis,
+                paired=True)
+
+
+def test_no_candidates():
+    table = explore(parent, [], conditions, analysis=analysis,
+                    filename='table.csv')
+    assert len(table['candidate']) == 0
+    assert len(table['alpha']) == 0
+    assert not calls
@@ -0,0 +1,126 @@
+"""Convergence studies and shape coefficient fits (geometry.fitting)."""
+import os
+import pickle
+import numpy as np
+import pytest
+
+import aeropy.CST_3D as cst
+from aeropy.geometry.fitting import (fitting, fit_shape_coefficients,
+                                     shape_coefficients_least_squares,
+                                     shape_function)
+
+raw = np.linspace(0., 1., 15).reshape(1, 5, 3)
+solved = []
+
+
+def update(surface, x, p1, p2):
+    if p1 == 4:
+        raise RuntimeError('failed fit')
+    surface['scale'] = x[0]
+    surface['power'] = p1 + 0.1*p2
+
+
+def x0(p1, p2):
+    return [0.5]
+
+
+def calculate_points(surface, raw):
+    return surface['scale']*raw**surface['power']
+
+
+def callback(surface, p1, p2):
+    solved.append((p1, p2))
+
+
+def study(p1=(1, 2, 3), p2=(1, 2)):
+    return fitting(object={}, update=update, x0=x0, p1=np.array(p1),
+                   p2=np.array(p2), calculate_points=calculate_points,
+                   raw=raw, callback=callback)
+
+
+@pytest.fixture(autouse=True)
+def no_solutions():
+    del solved[:]
+
+
+def test_parallel_and_serial_studies_agree():
+    serial = study()
+    serial.convergence_study(parallel=False)
+    parallel = study()
+    parallel.convergence_study(workers=2)
+    assert len(solved) == 6
+    assert serial.error.shape == (2, 3)
+    assert np.array_equal(serial.error, parallel.error)
+    for a, b in zip(serial.solutions, parallel.solutions):
+        assert np.array_equal(a['x'], b['x'])
+
+
+def test_resume(tmp_path):
+    filename = str(tmp_path / 'study.p')
+    first = study(p1=(1, 2))
+    first.convergence_study(parallel=False, filename=filename)
+    assert len(solved) == 4
+    # A record interrupted while being written is solved again
+    with open(filename, 'rb+') as f:
+        f.truncate(os.path.getsize(filename) - 5)
+    del solved[:]
+    resumed = study()
+    resumed.convergence_study(parallel=False, filename=filename)
+    assert sorted(solved) == [(2, 2), (3, 1), (3, 2)]
+    assert np.array_equal(resumed.error[:, :2], first.error)
+    with open(filename, 'rb') as f:
+        records = [pickle.load(f) for i in range(6)]
+    assert sorted(r[0] for r in records) == sorted(
+        (p1, p2) for p1 in (1, 2, 3) for p2 in (1, 2))
+
+
+def test_raw_file_is_removed_when_a_worker_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    with pytest.raises(RuntimeError):
+        study(p1=(1, 4)).convergence_study(workers=2)
+    assert not list(tmp_path.iterdir())
+
+
+def shape_study_surface(nx1=0.5):
+    return cst.CST3D(XYZ=(2., 1., 1.), nx=(nx1, 1.), ny=(0., 0.),
+                     sy=cst.piecewise_linear([0., 1.], [1., .5]))
+
+
+A = np.array([[0.20, 0.15, 0.10],
+              [0.18, 0.12, 0.11],
+              [0.25, 0.20, 0.12],
+              [0.10, 0.08, 0.05]])
+
+
+def synthetic_points(Ny, nx1=0.5):
+    surface = shape_study_surface(nx1)
+    surface.sx = shape_function(A, Ny)
+    rng = np.random.default_rng(2)
+    psi, eta = rng.uniform(0., 1., (2, 300))
+    return surface.points(psi, eta), psi, eta
+
+
+def test_least_squares_recovers_the_coefficients():
+    for Ny in (2, [0., 0.4, 1.]):
+        raw, psi, eta = synthetic_points(Ny)
+        fitted = shape_coefficients_least_squares(shape_study_surface(),
+                                                  raw, 3, Ny, psi, eta)
+        assert np.allclose(fitted, A, rtol=0, atol=1e-10)
+
+
+def test_fit_recovers_coefficients_and_parameters():
+    raw = synthetic_points(2)[0]
+    surface = shape_study_surface()
+    solution = fit_shape_coefficients(surface, raw, 3, 2)
+    assert np.allclose(solution['A'], A, rtol=0, atol=1e-6)
+    assert solution['fun'] < 1e-12
+
+    def update(surface, x):
+        surface.nx = (x[0], 1.)
+
+    raw = synthetic_points(2, nx1=0.6)[0]
+    solution = fit_shape_coefficients(surface, raw, 3, 2, update, [0.5])
+    assert abs(solution['x'][0] - 0.6) < 1e-4
+    assert np.allclose(solution['A'], A, rtol=0, atol=1e-3)
+    with pytest.raises(ValueError):
+        fit_shape_coefficients(surface, raw, 3, 2, x0=[0.5])
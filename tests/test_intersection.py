@@ -0,0 +1,71 @@
+"""Intersection curve between two CST3D components."""
+import numpy as np
+import pytest
+
+import aeropy.CST_3D as cst
+
+eta_cp = [0., 1.]
+
+
+def wing():
+    return cst.CST3D(location=(1.5, 0., 0.),
+                     XYZ=(1.5, 1., .2),
+                     sx=cst.BernsteinPolynomial(5, [0.172802, 0.167353,
+                                                    0.130747, 0.172053,
+                                                    0.112797, 0.168891]),
+                     nx=(1., 1.),
+                     sy=cst.piecewise_linear(eta_cp, [1., .3]),
+                     ny=(0., 0.),
+                     xshear=cst.piecewise_linear(eta_cp, [0., 1.5]))
+
+
+def fuselage():
+    return cst.CST3D(rotation=(0., -90., -90.),
+                     XYZ=(.4, 4., .2),
+                     nx=(.5, .5),
+                     ref=(0.5, 0., 0.),
+                     ny=(1., 1.))
+
+
+def test_points_lie_on_both_surfaces():
+    psi = np.linspace(0., 1., 11)
+    x, y, z, info = cst.intersection(wing(), fuselage(), psi, 0.3,
+                                     full_output=True)
+    assert info['converged'].all()
+    assert np.allclose(info['psi_w'], psi)
+    P = np.stack([x, y, z], axis=-1)
+    assert np.allclose(fuselage().points(info['psi_f'], info['eta_f']), P,
+                       atol=1e-10)
+
+
+def test_fixed_eta_recovers_the_fixed_psi_curve():
+    psi = np.linspace(0.5, 0.95, 10)
+    info = cst.intersection(wing(), fuselage(), psi, 0.3,
+                            full_output=True)[3]
+    for eta_w0 in (0., 0.3, 0.9):
+        # eta_w0 is not a guess of psi
+        fixed_eta = cst.intersection(wing(), fuselage(), info['eta_w'],
+                                     eta_w0, fixed='eta', full_output=True)[3]
+        assert fixed_eta['converged'].all()
+        assert np.allclose(fixed_eta['psi_w'], psi, atol=1e-9)
+
+
+def test_invalid_fixed_parameter():
+    with pytest.raises(ValueError):
+        cst.intersection(wing(), fuselage(), [0.5], 0.3, fixed='x')
+
+
+def test_analytic_psi_derivative():
+    psi = np.array([0., 0.2, 0.5, 0.9, 1.])
+    eta = np.array([0.1, 0.4, 0.6, 1., 0.])
+    step = 1e-6
+    for surface in (wing(), fuselage()):
+        dpsi = surface.jacobian(psi, eta)[0]
+        psi_p = np.minimum(psi + step, 1.)
+        psi_m = np.maximum(psi - step, 0.)
+        expected = (surface.points(psi_p, eta) - surface.points(psi_m, eta)) \
+            / (psi_p - psi_m)[:, None]
+        # differences replace the singular derivative at the round leading
+        # edge of the fuselage (psi = 0)
+        assert np.all(np.isfinite(dpsi))
+        assert np.allclose(dpsi[1:], expected[1:], rtol=0, atol=1e-7)
@@ -0,0 +1,171 @@
+"""Panair networks built by CST_3D.mesh_tools."""
+from math import sin, cos
+import numpy as np
+import pytest
+
+from aeropy.CST_3D import mesh_tools
+
+
+def loop_axisymmetric_surf(data_x, data_r, N_theta):
+    """Previous axisymmetric_surf: point by point revolution and split
+       networks copied out of the surface."""
+    data_t = np.linspace(np.pi, np.pi/2., N_theta)
+    surf_coords = np.zeros([len(data_t), len(data_x), 3])
+    for i, t in enumerate(data_t):
+        for j, x in enumerate(data_x):
+            surf_coords[i, j, 0] = x
+            surf_coords[i, j, 1] = data_r[j]*sin(t)
+            surf_coords[i, j, 2] = data_r[j]*cos(t)
+
+    num_points = len(data_x)
+    max_axial = 200
+    num_network = int(num_points/max_axial)
+    if not (num_points % max_axial) == 0:
+        num_network += 1
+    nn = int(num_points/num_network)
+    network_list = []
+    if num_network > 1:
+        for i in range(num_network):
+            if i == num_network-1:
+                network_list.append(surf_coords[:, i*nn:])
+            else:
+                network_list.append(surf_coords[:, i*nn:(i+1)*nn+1])
+    else:
+        network_list.append(surf_coords)
+    return network_list
+
+
+def test_axisymmetric_surf_agrees_with_point_by_point_revolution():
+    for n in (150, 200, 601, 1001):
+        data_x = np.linspace(0., 10., n)
+        data_r = np.sqrt(data_x*(10. - data_x))
+        expected = loop_axisymmetric_surf(data_x, data_r, 20)
+        networks = mesh_tools.axisymmetric_surf(data_x, data_r, 20)
+        assert len(networks) == len(expected)
+        for network, old in zip(networks, expected):
+            assert np.array_equal(network, old)
+            assert network.base is networks[-1].base
+
+
+def test_full_revolution_closes_on_itself():
+    data_x = np.linspace(0., 1., 5)
+    network = mesh_tools.axisymmetric_surf(data_x, 1. + data_x, 9,
+                                           full=True)[0]
+    assert np.array_equal(network[0], network[-1])
+    assert np.allclose(np.hypot(network[..., 1], network[..., 2]),
+                       1. + data_x)
+    angles = np.linspace(0., np.pi, 4)
+    network = mesh_tools.axisymmetric_surf(data_x, data_x, angles)[0]
+    assert np.allclose(network[:, -1, 1:], np.stack((np.sin(angles),
+                                                     np.cos(angles)), -1))
+
+
+def test_split_network_along_another_axis():
+    network = np.arange(450*2*3, dtype=float).reshape(450, 2, 3)
+    networks = mesh_tools.split_network(network, axis=0)
+    assert [len(n) for n in networks] == [151, 151, 150]
+    assert np.array_equal(np.concatenate([networks[0], networks[1][1:],
+                                          networks[2][1:]]), network)
+
+
+def loop_mesh_curvilinear(x_lower, x_upper, y_lower, y_upper, x_spacing,
+                          y_spacing):
+    """Previous mesh_curvilinear: every interior row and column spaced
+       between the corresponding points of the edges."""
+    n_x = y_lower.shape[0]
+    n_y = x_lower.shape[0]
+    grid = np.zeros((n_x, n_y, 2))
+    grid[0, :] = x_lower
+    grid[-1, :] = x_upper
+    grid[:, 0] = y_lower
+    grid[:, -1] = y_upper
+    for i in range(1, n_x-1):
+        grid[i, 1:-1, 1] = y_spacing(y_lower[i, 1], y_upper[i, 1], n_y)[1:-1]
+    for j in range(1, n_y-1):
+        grid[1:-1, j, 0] = x_spacing(x_lower[j, 0], x_upper[j, 0], n_x)[1:-1]
+    return grid
+
+
+def straight_edges(x_spacing, y_spacing, n_x, n_y):
+    x_lower = np.zeros((n_y, 2))
+    x_upper = np.ones((n_y, 2))
+    x_lower[:, 1] = x_upper[:, 1] = y_spacing(0., 1., n_y)
+    y_lower = np.zeros((n_x, 2))
+    y_upper = np.ones((n_x, 2))
+    y_lower[:, 0] = y_upper[:, 0] = x_spacing(0., 1., n_x)
+    return x_lower, x_upper, y_lower, y_upper
+
+
+def test_coons_patch_agrees_with_previous_mesh_on_straight_edges():
+    spacings = {'linear': np.linspace, 'cosine': mesh_tools.cosine_spacing()}
+    for psi_spacing in spacings:
+        for eta_spacing in spacings:
+            x_spacing, y_spacing = spacings[psi_spacing], spacings[eta_spacing]
+            edges = straight_edges(x_spacing, y_spacing, 30, 20)
+            expected = loop_mesh_curvilinear(*edges + (x_spacing, y_spacing))
+            grid = mesh_tools.mesh_curvilinear(*edges + (x_spacing,
+                                                         y_spacing))
+            assert np.allclose(grid, expected, rtol=0, atol=1e-15)
+            psi, eta = mesh_tools.meshparameterspace(
+                (30, 20), psi_spacing=psi_spacing, eta_spacing=eta_spacing)
+            assert np.array_equal(psi, expected[:, :, 0])
+            assert np.array_equal(eta, expected[:, :, 1])
+
+
+def test_coons_patch_reproduces_affine_edges():
+    u = mesh_tools.cosine_spacing()(0., 1., 15)
+    v = np.linspace(0., 1., 10)
+    U, V = np.meshgrid(u, v, indexing='ij')
+    # a skewed quadrilateral inside the parameter space
+    grid = np.stack((0.1 + 0.6*U + 0.2*V, 0.2 + 0.1*U + 0.7*V), axis=-1)
+    patch = mesh_tools.mesh_curvilinear(grid[0], grid[-1], grid[:, 0],
+                                        grid[:, -1], u, v)
+    assert np.allclose(patch, grid, rtol=0, atol=1e-15)
+
+
+def loop_generate_wake(te_points, x_end, n_points=10, angle_of_attack=0.,
+                       user_spacing=None):
+    """Previous generate_wake: one wake line per trailing edge point."""
+    spacing = np.linspace if user_spacing is None else user_spacing
+    wake = np.zeros((n_points, te_points.shape[0], 3))
+    aoa_r = angle_of_attack*np.pi/180.
+    for j, p in enumerate(te_points):
+        x_te, y_te, z_te = p
+        length = (x_end-x_te)/np.cos(aoa_r)
+        X_0 = spacing(0., length, n_points)
+        wake[:, j, 0] = x_te+X_0*np.cos(aoa_r)
+        wake[:, j, 1] = y_te
+        wake[:, j, 2] = z_te+X_0*np.sin(aoa_r)
+    return wake
+
+
+def trailing_edge(n=50):
+    y = np.linspace(0., 5., n)
+    return np.stack((1. + 0.3*y, y, 0.05*y**2), axis=-1)
+
+
+def test_wake_agrees_with_line_by_line_wake():
+    te_points = trailing_edge()
+    for aoa in (0., 4., -7.5):
+        for spacing in (None, mesh_tools.cosine_spacing()):
+            expected = loop_generate_wake(te_points, 20., 12, aoa, spacing)
+            wake = mesh_tools.generate_wake(te_points, 20., 12, aoa, spacing)
+            assert np.allclose(wake, expected, rtol=0, atol=1e-13)
+            assert np.all(wake[-1, :, 0] == 20.)
+
+
+def test_wake_per_point_angles_and_output_buffer():
+    te_points = trailing_edge(5)
+    aoa = np.linspace(0., 4., 5)
+    buffer = np.zeros((8, 6, 3))
+    wake = mesh_tools.generate_wake(te_points, 20., 8, aoa, sideslip=3.,
+                                    out=buffer[:, 1:])
+    assert np.shares_memory(wake, buffer)
+    assert np.array_equal(buffer[:, 1:], wake)
+    for j in range(5):
+        d = wake[-1, j] - te_points[j]
+        assert np.isclose(np.degrees(np.arctan2(d[2], np.hypot(d[0], d[1]))),
+                          aoa[j])
+        assert np.isclose(np.degrees(np.arctan2(d[1], d[0])), 3.)
+    with pytest.raises(ValueError):
+        mesh_tools.generate_wake(te_points, 20., 8, out=buffer)
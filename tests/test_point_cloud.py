@@ -0,0 +1,57 @@
+"""Downsampling and KD-tree index of point clouds."""
+import numpy as np
+
+from aeropy.filehandling.point_cloud import (PointIndex, edge_refinement,
+                                             poisson_disk_downsample,
+                                             voxel_downsample)
+
+
+def cloud(n=20000):
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0., 1., (2, n))
+    return np.stack([x, y, 0.1*np.sin(np.pi*x)], axis=-1)
+
+
+def test_voxel_downsample_keeps_one_point_per_cell():
+    points = cloud()
+    sample, index = voxel_downsample(points, 0.1, return_index=True)
+    assert np.array_equal(sample, points[index])
+    cells = np.floor(sample/0.1).astype(int)
+    assert len(np.unique(cells, axis=0)) == len(sample)
+    assert len(np.unique(np.floor(points/0.1), axis=0)) == len(sample)
+
+
+def test_voxel_downsample_refined_at_the_edges():
+    points = cloud()
+    refinement = edge_refinement(points[:, 0], 0., 1.)
+    sample = voxel_downsample(points, 0.1, refinement)
+    # samples per unit of chord at the leading edge and in the middle
+    leading_edge = np.sum(sample[:, 0] < 0.02)/0.02
+    middle = np.sum(np.abs(sample[:, 0] - 0.5) < 0.2)/0.4
+    assert leading_edge > 4.*middle
+
+
+def test_poisson_disk_minimum_distance():
+    points = cloud()
+    sample = poisson_disk_downsample(points, 0.05, seed=1)
+    distance = PointIndex(sample).query(sample, 2)[0][:, 1]
+    assert distance.min() >= 0.05
+    # every point is within the radius of a sample
+    assert PointIndex(sample).distance(points).max() <= 0.05
+    assert np.array_equal(sample,
+                          poisson_disk_downsample(points, 0.05, seed=1))
+
+
+def test_empty_cloud():
+    points = np.empty((0, 3))
+    assert voxel_downsample(points, 0.1).shape == (0, 3)
+    assert poisson_disk_downsample(points, 0.1).shape == (0, 3)
+
+
+def test_index_is_saved_with_the_tree(tmp_path):
+    points = cloud(100)
+    index = PointIndex(points)
+    index.save(str(tmp_path / 'cloud.p'))
+    loaded = PointIndex.load(str(tmp_path / 'cloud.p'))
+    assert len(loaded) == 100
+    assert np.allclose(loaded.distance(points), 0.)
@@ -0,0 +1,82 @@
+"""Pressure fields for Abaqus (aero_module.pressure_shell)."""
+import numpy as np
+import pytest
+
+from aeropy.aero_module import (pressure_shell, pressure_shell_2D,
+                                write_pressure_field)
+
+x = list(np.linspace(0., 1., 21))
+y = list(0.05*np.sin(np.pi*np.linspace(0., 1., 21)))
+Cp = list(1. - 4.*np.linspace(0., 1., 21)*(1. - np.linspace(0., 1., 21)))
+
+
+def loop_pressure_shell(Data, half_span, chord, air_density, Velocity, N,
+                        thickness, distribution, filename):
+    """Previous pressure_shell (lists instead of the Python 2 maps): one
+       tuple and one file write per point."""
+    Pressure = [Cp*0.5*air_density*Velocity**2*chord for Cp in Data['Cp']]
+    x = [(chord - 2.*thickness)*x + thickness for x in Data['x']]
+    y = [(chord - 2.*thickness)*y for y in Data['y']]
+    z = np.linspace(0, half_span, N)
+    if distribution == 'Elliptical':
+        distribution = np.sqrt(1. - (z/half_span)**2)
+    else:
+        distribution = np.ones(N)
+    PressureDistribution = ()
+    DataFile = open(filename, 'w')
+    for j in range(N):
+        for i in range(len(x)):
+            DataFile.write('%f\t%f\t%f\t%f\n' % (x[i], y[i], z[j],
+                                                 distribution[j]*Pressure[i]))
+            PressureDistribution = PressureDistribution + (
+                (x[i], y[i], z[j], distribution[j]*Pressure[i]), )
+    DataFile.close()
+    return PressureDistribution
+
+
+def data():
+    return {'x': list(x), 'y': list(y), 'Cp': list(Cp)}
+
+
+def test_agrees_with_point_by_point_field(tmp_path):
+    for distribution in ('Uniform', 'Elliptical'):
+        old = str(tmp_path / 'old.txt')
+        expected = loop_pressure_shell(data(), 2., 0.5, 1.2, 30., 7, 0.01,
+                                       distribution, old)
+        field = pressure_shell(data(), 2., 0.5, 1.2, 30., 7, 0.01,
+                               distribution=distribution)
+        assert type(field) is tuple and type(field[0]) is tuple
+        assert len(field) == len(expected)
+        assert np.allclose(field, expected, rtol=1e-14, atol=0)
+
+        new = str(tmp_path / 'new.txt')
+        assert pressure_shell(data(), 2., 0.5, 1.2, 30., 7, 0.01, txt=True,
+                              distribution=distribution, filename=new) == 0
+        with open(old) as f_old, open(new) as f_new:
+            assert f_new.read() == f_old.read()
+
+
+def test_2D_shell_field():
+    field = pressure_shell_2D(data(), 0.5, 0.01, 2., 1000., 30., 4)
+    assert type(field) is tuple and len(field) == 4*len(x)
+    assert np.allclose([p[2] for p in field[::len(x)]],
+                       np.linspace(0., 2., 4))
+
+
+def test_abaqus_and_npy_files(tmp_path):
+    field = np.array(pressure_shell(data(), 2., 0.5, 1.2, 30., 5, 0.01))
+    abaqus = str(tmp_path / 'field.csv')
+    pressure_shell(data(), 2., 0.5, 1.2, 30., 5, 0.01, txt=True,
+                   filename=abaqus, file_format='abaqus')
+    with open(abaqus) as f:
+        assert f.readline().count(', ') == 3
+    assert np.allclose(np.loadtxt(abaqus, delimiter=','), field, rtol=1e-9,
+                       atol=0)
+
+    binary = str(tmp_path / 'field.npy')
+    pressure_shell(data(), 2., 0.5, 1.2, 30., 5, 0.01, txt=True,
+                   filename=binary, file_format='npy')
+    assert np.array_equal(np.load(binary), field)
+
+    with pytest.raises(ValueError):
+        write_pressure_field(field, str(tmp_path / 'field.vtk'), 'vtk')
@@ -0,0 +1,70 @@
+"""Sections of triangulated surfaces (aeropy.filehandling.slicing)."""
+import numpy as np
+
+from aeropy.filehandling.slicing import slice_mesh
+
+
+def cylinder(n=16, rings=(0., 1., 2.)):
+    """Triangulated open cylinder along x (n-gon sections)."""
+    theta = 2.*np.pi*np.arange(n)/n
+    vertices = np.array([[x, np.cos(t), np.sin(t)] for x in rings
+                         for t in theta])
+    faces = []
+    for i in range(len(rings) - 1):
+        for j in range(n):
+            a, b = i*n + j, i*n + (j + 1) % n
+            faces += [[a, b, b + n], [a, b + n, a + n]]
+    return vertices, np.array(faces)
+
+
+def cone(n=16):
+    """Cylinder from x=0 to 1 closed by an apex at x=2."""
+    vertices, faces = cylinder(n, (0., 1.))
+    apex = len(vertices)
+    cap = [[n + j, n + (j + 1) % n, apex] for j in range(n)]
+    return (np.vstack((vertices, [[2., 0., 0.]])),
+            np.vstack((faces, cap)))
+
+
+def test_section_between_vertices():
+    vertices, faces = cylinder()
+    section, = slice_mesh(vertices, [0.5], faces)
+    assert len(section) == 1
+    # one point per edge of the n-gon and one per diagonal
+    assert section[0].shape == (33, 3)
+    assert np.array_equal(section[0][0], section[0][-1])
+    assert np.allclose(section[0][:, 0], 0.5)
+
+
+def test_section_through_vertices():
+    # Regression: each edge through a vertex on the plane created its own
+    # copy of the vertex (33 points with zero length segments)
+    vertices, faces = cylinder()
+    section, = slice_mesh(vertices, [1.], faces)
+    assert len(section) == 1
+    polyline = section[0]
+    assert polyline.shape == (17, 3)
+    assert np.all(np.linalg.norm(np.diff(polyline, axis=0), axis=1) > 0.)
+    assert len(np.unique(polyline[:-1], axis=0)) == 16
+
+
+def test_planes_that_miss_the_mesh():
+    # Regression: no crossing triangle at all raised an IndexError
+    vertices, faces = cylinder()
+    assert slice_mesh(vertices, [5.], faces) == [[]]
+    assert slice_mesh(vertices, [-1., 5.], faces) == [[], []]
+    sections = slice_mesh(vertices, [-1., 0.5, 5.], faces)
+    assert sections[0] == [] and sections[2] == []
+    assert len(sections[1]) == 1
+    # only touches the apex of a cone
+    vertices, faces = cone()
+    sections = slice_mesh(vertices, [2., 1.5], faces)
+    assert sections[0] == []
+    assert len(sections[1]) == 1 and sections[1][0].shape == (17, 3)
+
+
+def test_triangle_soup_input():
+    vertices, faces = cylinder()
+    sections = slice_mesh(vertices[faces], [0.25, 1.5])
+    assert [len(section) for section in sections] == [1, 1]
+    assert all(section[0].shape == (33, 3) for section in sections)
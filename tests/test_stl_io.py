@@ -0,0 +1,67 @@
+"""STL reading and vertex merging (aeropy.filehandling.stl_io)."""
+import numpy as np
+
+from aeropy.filehandling.stl_io import (STL_DTYPE, merge_vertices,
+                                        mesh_from_stl, read_stl, unique_rows)
+
+
+def write_binary(filename, vertices):
+    triangles = np.zeros(len(vertices), STL_DTYPE)
+    triangles['vertices'] = vertices
+    with open(filename, 'wb') as f:
+        f.write(b'\0'*80)
+        f.write(np.array([len(triangles)], '<u4').tobytes())
+        f.write(triangles.tobytes())
+
+
+def test_unique_rows():
+    columns = (np.array([1, 0, 1, 0]), np.array([2., 5., 2., 3.]))
+    first, inverse = unique_rows(columns)
+    assert list(first) == [3, 1, 0]
+    assert list(inverse) == [2, 1, 2, 0]
+
+
+def test_unique_rows_empty():
+    first, inverse = unique_rows((np.zeros(0), np.zeros(0)))
+    assert len(first) == 0 and len(inverse) == 0
+
+
+def test_shared_vertices_are_merged(tmp_path):
+    square = np.array([[[0, 0, 0], [1, 0, 0], [1, 1, 0]],
+                       [[0, 0, 0], [1, 1, 0], [0, 1, 0]]], dtype='<f4')
+    filename = str(tmp_path/'square.stl')
+    write_binary(filename, square)
+    assert len(read_stl(filename)) == 2
+    vertices, faces = mesh_from_stl(filename)
+    assert vertices.shape == (4, 3)
+    assert np.array_equal(vertices[faces], square)
+
+
+def test_empty_stl(tmp_path):
+    # Regression: unique_rows failed on empty input
+    filename = str(tmp_path/'empty.stl')
+    write_binary(filename, np.zeros((0, 3, 3)))
+    vertices, faces = mesh_from_stl(filename)
+    assert vertices.shape == (0, 3) and faces.shape == (0, 3)
+
+    filename = str(tmp_path/'empty_ascii.stl')
+    with open(filename, 'w') as f:
+        f.write('solid empty\nendsolid empty\n')
+    vertices, faces = mesh_from_stl(filename)
+    assert vertices.shape == (0, 3) and faces.shape == (0, 3)
+
+
+def test_degenerate_stl(tmp_path):
+    filename = str(tmp_path/'degenerate.stl')
+    write_binary(filename, np.ones((3, 3, 3)))
+    vertices, faces = mesh_from_stl(filename)
+    assert vertices.shape == (1, 3)
+    assert np.all(faces == 0)
+
+
+def test_merge_vertices_grid_snapping():
+    points = np.array([[0.09, 0., 0.], [0.11, 0., 0.], [0.12, 0., 0.]])
+    unique, index = merge_vertices(points, tol=0.1)
+    # 0.09 and 0.11 are closer than tol but in different cells
+    assert len(unique) == 2
+    assert list(index) == [0, 1, 1]
@@ -0,0 +1,79 @@
+"""Spanwise sections of STL point clouds (filehandling.stl_processing)."""
+import numpy as np
+
+from aeropy.filehandling.stl_processing import (filter_geometry,
+                                                group_by_station,
+                                                high_density_eta)
+
+
+def loop_filter_geometry(data, parts, min_repetitions=5, tol=1e-1):
+    """Previous filter_geometry: full scans per candidate and per point."""
+    def _high_density_eta(data, min_repetitions=100, tol=1e-3):
+        a = data[:, 1]
+        b = a.copy()
+        b.sort()
+        d = np.append(True, np.diff(b))
+        eta_unique = b[d > tol]
+        eta_dense = []
+        for eta in eta_unique:
+            c = np.abs(a - eta)
+            r = c[c <= tol]
+            if len(r) >= min_repetitions:
+                eta_dense.append(eta)
+        return eta_dense
+
+    data_sampled = {}
+    eta_sampled = {}
+    for part in parts:
+        eta_sampled[part] = _high_density_eta(data[part], min_repetitions,
+                                              tol)
+        data_sampled[part] = {}
+        for eta in eta_sampled[part]:
+            data_sampled[part][eta] = []
+        for i in range(len(data[part])):
+            diff = min(np.abs(np.array(eta_sampled[part])-data[part][i][1]))
+            index_sampled = np.where(np.abs(np.array(eta_sampled[part]) -
+                                            data[part][i][1]) == diff)[0][0]
+            if diff < tol:
+                data_sampled[part][eta_sampled[part][index_sampled]].append(
+                    data[part][i])
+        for eta in eta_sampled[part]:
+            data_sampled[part][eta] = np.array(data_sampled[part][eta])
+    return data_sampled, eta_sampled
+
+
+def wing_cloud(seed=0):
+    """Dense sections at some stations plus sparse points in between."""
+    rng = np.random.default_rng(seed)
+    sections = []
+    for y in np.linspace(0., 5., 11):
+        n = 200
+        x = rng.uniform(0., 1., n)
+        sections.append(np.stack((x, y + rng.normal(0., 0.01, n),
+                                  0.1*np.sin(np.pi*x)), axis=-1))
+    sparse = rng.uniform(0., 5., (150, 3))
+    # a point exactly half way between two stations
+    sparse[0, 1] = 0.25
+    data = np.concatenate(sections + [sparse])
+    return data[rng.permutation(len(data))]
+
+
+def test_filter_geometry_agrees_with_previous_scan():
+    data = {'wing': wing_cloud(0), 'tail': wing_cloud(1)[::3]}
+    for tol in (0.05, 0.1):
+        expected = loop_filter_geometry(data, ['wing', 'tail'], 5, tol)
+        sampled = filter_geometry(data, ['wing', 'tail'], 5, tol)
+        for part in data:
+            assert sampled[1][part] == expected[1][part]
+            assert list(sampled[0][part]) == list(expected[0][part])
+            for eta in expected[1][part]:
+                assert np.array_equal(sampled[0][part][eta],
+                                      expected[0][part][eta])
+
+
+def test_ties_go_to_the_lower_station():
+    data = np.array([[0., 0.5, 0.], [1., 1.5, 0.], [2., 3., 0.]])
+    groups = group_by_station(data, [0., 1., 2.], 0.6)
+    assert [list(g[:, 0]) for g in groups] == [[0.], [1.], []]
+    assert group_by_station(data, [], 0.6) == []
+    assert high_density_eta(np.array([0., 0.01, 0.02, 1.]), 3, 0.05) == [0.]
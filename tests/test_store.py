@@ -0,0 +1,54 @@
+"""Append-only storage of results (aeropy.store)."""
+import os
+import numpy as np
+import pytest
+
+from aeropy.store import Store
+
+
+def test_rows_and_records_are_read_back(tmp_path):
+    store = Store(str(tmp_path), schema_version=2)
+    store.put('L/D', np.arange(5.))
+    store.create_dataset('coordinates', float, (2,), ragged=True)
+    store['coordinates'].append(np.ones((3, 2)), key='naca0012')
+    store['coordinates'].append(np.zeros((4, 2)), key='naca4412')
+
+    store = Store(str(tmp_path), 'r', schema_version=2)
+    assert np.array_equal(store['L/D'][:], np.arange(5.))
+    assert store['coordinates'].keys() == ['naca0012', 'naca4412']
+    assert np.array_equal(store['coordinates']['naca4412'], np.zeros((4, 2)))
+    with pytest.raises(ValueError):
+        Store(str(tmp_path), schema_version=3)
+
+
+def test_append_after_reading(tmp_path):
+    dataset = Store(str(tmp_path)).create_dataset('x', float, ragged=True)
+    dataset.append([1., 2.], key='a')
+    view = dataset['a']
+    # the maps are released before the files are written and opened again
+    dataset.append([3., 4., 5.], key='b')
+    assert dataset._cache is None
+    assert np.array_equal(view, [1., 2.])
+    assert np.array_equal(dataset['b'], [3., 4., 5.])
+    with pytest.raises(KeyError):
+        dataset.append([6.], key='a')
+
+
+def test_interrupted_append_is_overwritten(tmp_path):
+    store = Store(str(tmp_path))
+    dataset = store.put('x', np.arange(3.))
+    # rows written without updating the metadata
+    with open(dataset._data_file, 'ab') as f:
+        np.arange(10.).tofile(f)
+    assert len(Store(str(tmp_path))['x']) == 3
+
+    dataset.append([7.])
+    assert os.path.getsize(dataset._data_file) == 4*8
+    assert np.array_equal(Store(str(tmp_path), 'r')['x'][:],
+                          [0., 1., 2., 7.])
+
+
+def test_empty_dataset(tmp_path):
+    dataset = Store(str(tmp_path)).create_dataset('x', float, (3,))
+    assert len(dataset) == 0
+    assert dataset[:].shape == (0, 3)
@@ -0,0 +1,94 @@
+"""VTK XML writers, checked with a minimal reader of the appended data."""
+import os
+import re
+import base64
+import struct
+import zlib
+import numpy as np
+import pytest
+
+from aeropy.filehandling import vtk
+
+_TYPES = dict((v, k) for k, v in vtk._VTK_TYPES.items())
+
+
+def read_arrays(filename):
+    """Name -> (n, components) array of every DataArray of a VTK file."""
+    with open(filename, 'rb') as f:
+        content = f.read()
+    start = content.index(b'<AppendedData')
+    encoding = re.search(b'encoding="(\\w+)"', content[start:]).group(1)
+    data = content[content.index(b'_', start) + 1:]
+    compressed = b'vtkZLibDataCompressor' in content[:start]
+
+    def read(position, nbytes):
+        if encoding == b'raw':
+            return data[position:position+nbytes], position + nbytes
+        n = -(-nbytes//3)*4
+        return base64.b64decode(data[position:position+n]), position + n
+
+    arrays = {}
+    for match in re.finditer(b'<DataArray type="(\\w+)" Name="(\\w+)" '
+                             b'NumberOfComponents="(\\d+)" format="appended" '
+                             b'offset="(\\d+)"', content[:start]):
+        dtype = np.dtype(_TYPES[match.group(1).decode()]).newbyteorder('<')
+        position = int(match.group(4))
+        if compressed:
+            header, _ = read(position, 24)
+            n_blocks = struct.unpack('<3Q', header)[0]
+            header, position = read(position, 8*(3 + n_blocks))
+            sizes = struct.unpack('<%iQ' % (3 + n_blocks), header)[3:]
+            blocks, _ = read(position, sum(sizes))
+            raw = b''
+            for size in sizes:
+                raw += zlib.decompress(blocks[:size])
+                blocks = blocks[size:]
+        else:
+            header, position = read(position, 8)
+            raw, _ = read(position, struct.unpack('<Q', header)[0])
+        components = int(match.group(3))
+        arrays[match.group(2).decode()] = \
+            np.frombuffer(raw, dtype).reshape(-1, components)
+    return arrays
+
+
+def network(n_i, n_j):
+    psi, eta = np.meshgrid(np.linspace(0., 1., n_i), np.linspace(0., 1., n_j),
+                           indexing='ij')
+    return np.stack([psi, eta, psi*eta], axis=-1)
+
+
+@pytest.mark.parametrize('encoding, compress, n', [('raw', False, 7),
+                                                   ('base64', False, 7),
+                                                   ('raw', True, 7),
+                                                   ('base64', True, 300)])
+def test_structured_grid(tmp_path, encoding, compress, n):
+    points = network(n, n + 3)
+    pressure = points[..., 2]**2
+    filename = vtk.write_structured_grid(
+        str(tmp_path / 'wing'), points, point_data={'Cp': pressure},
+        encoding=encoding, compress=compress)
+    assert filename.endswith('.vts')
+    arrays = read_arrays(filename)
+    # first index fastest
+    assert np.array_equal(arrays['Points'],
+                          points.transpose(1, 0, 2).reshape(-1, 3))
+    assert np.array_equal(arrays['Cp'][:, 0], pressure.T.ravel())
+
+
+def test_multiblock(tmp_path):
+    networks = {'upper': network(4, 5), 'lower': network(6, 2)}
+    filename = vtk.write_multiblock(str(tmp_path / 'wing'), networks)
+    with open(filename) as f:
+        files = re.findall('file="([^"]+)"', f.read())
+    assert files == ['wing/upper.vts', 'wing/lower.vts']
+    for name, path in zip(networks, files):
+        points = read_arrays(os.path.join(str(tmp_path), path))['Points']
+        assert len(points) == networks[name][..., 0].size
+
+
+def test_points(tmp_path):
+    points = np.random.default_rng(0).random((10, 3))
+    arrays = read_arrays(vtk.generate_points(points, str(tmp_path / 'cloud')))
+    assert np.array_equal(arrays['Points'], points)
+    assert np.array_equal(arrays['connectivity'][:, 0], np.arange(10))
@@ -0,0 +1,62 @@
+"""Geometry files written for XFOIL (xfoil_module.create_input)."""
+import io
+import numpy as np
+
+from aeropy.xfoil_module import create_input
+
+
+def loop_create_input(x, y_u, y_l=None, filename='test',
+                      different_x_upper_lower=False):
+    """Previous create_input: one write per point."""
+    if different_x_upper_lower:
+        y = y_u
+    else:
+        x_upper = x
+        x_under = np.delete(x_upper, -1)[::-1]
+        x = np.append(x_upper, x_under)
+        y_l = np.delete(y_l, -1)[::-1]
+        y = np.append(y_u, y_l)
+    DataFile = open(filename, 'w')
+    for i in range(0, len(x)):
+        DataFile.write('     %f    %f\n' % (x[i], y[i]))
+    DataFile.close()
+    return 0
+
+
+x = 0.5*(1. + np.cos(np.linspace(0., np.pi, 81)))
+y_u = 0.6*(0.2969*np.sqrt(x) - 0.126*x - 0.3516*x**2 + 0.2843*x**3 -
+           0.1015*x**4)
+y_l = -y_u
+
+
+def test_file_is_identical_to_point_by_point_writer(tmp_path):
+    old, new = str(tmp_path / 'old'), str(tmp_path / 'new')
+    loop_create_input(x, y_u, y_l, old)
+    assert create_input(x, y_u, y_l, new) == 0
+    with open(old) as f_old, open(new) as f_new:
+        text = f_new.read()
+        assert text == f_old.read()
+
+    coordinates = np.loadtxt(new)
+    assert len(coordinates) == 2*len(x) - 1
+    assert np.allclose(coordinates[:len(x)], np.column_stack((x, y_u)),
+                       rtol=0, atol=1e-6)
+    assert np.allclose(coordinates[len(x)-1:],
+                       np.column_stack((x, y_l))[::-1], rtol=0, atol=1e-6)
+
+    # the same text for ordered coordinates, buffers and no target
+    assert create_input(coordinates, filename=None) == text
+    buffer = io.StringIO()
+    create_input(x, y_u, y_l, buffer)
+    assert buffer.getvalue() == text
+
+
+def test_different_x_upper_lower(tmp_path):
+    x_all = np.append(x, x[-2::-1])
+    y_all = np.append(y_u, y_l[-2::-1])
+    old, new = str(tmp_path / 'old'), str(tmp_path / 'new')
+    loop_create_input(x_all, y_all, filename=old,
+                      different_x_upper_lower=True)
+    create_input(x_all, y_all, filename=new, different_x_upper_lower=True)
+    with open(old) as f_old, open(new) as f_new:
+        assert f_new.read() == f_old.read()